@@ -0,0 +1,102 @@
+# agents/batch.py
+from __future__ import annotations
+
+import atexit
+import multiprocessing
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, as_completed
+from typing import Iterable, Iterator, List, Optional
+
+from core.models import PlanJob, PlanResult
+from core.energy import energy_curve_for
+from core.profiles import curve_from_blob
+from core.config import BATCH_WORKERS
+from agents.scheduler import greedy_schedule
+from agents.summarizer import summarize
+
+
+def plan_job(job: PlanJob, use_llm: Optional[bool] = False) -> PlanResult:
+    """
+    Schedule + summarize one user's day. Never raises: failures come back as
+    `PlanResult.error` so one bad payload can't sink a whole batch.
+    """
+    try:
+        if job.energy is not None:
+            curve = curve_from_blob(job.energy, job.day)
+        else:
+            # curve values are memoized per profile, so every job shares one array
+            curve = energy_curve_for(job.day, job.profile)  # type: ignore[arg-type]
+        plan = greedy_schedule(
+            job.tasks,
+            job.day,
+            energy_curve=curve,
+            work_start_h=job.work_start_h,
+            work_end_h=job.work_end_h,
+            use_llm=use_llm,
+            packed=True,
+        )
+        summary = summarize(
+            plan,
+            completed_titles=job.completed,
+            profile=job.profile,
+            work_start_h=job.work_start_h,
+            work_end_h=job.work_end_h,
+            energy_curve=curve,
+        )
+        return PlanResult(user_id=job.user_id, plan=plan.to_day_plan(), summary=summary)
+    except Exception as e:
+        return PlanResult(user_id=job.user_id, error=str(e))
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def batch_executor() -> Optional[Executor]:
+    """
+    Shared process pool for batch planning (BATCH_WORKERS processes). Workers come
+    from a forkserver (spawn where that's unavailable) rather than fork, so they never
+    inherit the API's event loop, threads or open SQLite handles. Returns None when
+    disabled (BATCH_WORKERS=0) or when processes can't be started here; callers then
+    plan without a pool (`plan_many` inline, the API on its thread pool).
+    """
+    global _pool
+    if BATCH_WORKERS <= 0:
+        return None
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                try:
+                    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                    _pool = ProcessPoolExecutor(
+                        max_workers=BATCH_WORKERS,
+                        mp_context=multiprocessing.get_context(method),
+                    )
+                    atexit.register(_pool.shutdown, wait=False, cancel_futures=True)
+                except (OSError, NotImplementedError):
+                    return None
+    return _pool
+
+
+def plan_many(
+    jobs: Iterable[PlanJob],
+    *,
+    use_llm: Optional[bool] = False,
+    executor: Optional[Executor] = None,
+) -> Iterator[PlanResult]:
+    """
+    Plan many users' days across the process pool, yielding each `PlanResult` as
+    soon as that user completes (completion order, not input order).
+    """
+    jobs: List[PlanJob] = list(jobs)
+    pool = executor or batch_executor()
+    if pool is None:
+        for job in jobs:
+            yield plan_job(job, use_llm)
+        return
+    futures = {pool.submit(plan_job, job, use_llm): job for job in jobs}
+    for fut in as_completed(futures):
+        try:
+            yield fut.result()
+        except Exception as e:  # worker died (e.g. BrokenProcessPool)
+            yield PlanResult(user_id=futures[fut].user_id, error=str(e))
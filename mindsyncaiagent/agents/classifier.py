@@ -1,15 +1,21 @@
 # agents/classifier.py
+import re
+from typing import Dict, List, Optional, Set, Tuple
+
 try:
     from langchain_core.prompts import ChatPromptTemplate
-    from langchain_google_genai import ChatGoogleGenerativeAI
 except Exception:
     ChatPromptTemplate = None
-    ChatGoogleGenerativeAI = None
 from core.models import Task
-from core.config import MODEL
-import os
-
-_GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+from core.config import (
+    MODEL,
+    CACHE_DB,
+    CLASSIFIER_SHORT_CIRCUIT,
+    CLASSIFY_CACHE_SIZE,
+    CLASSIFY_CACHE_TTL_S,
+)
+from core.llm import get_llm, call_llm, acall_llm
+from core.cache import TieredCache, make_key
 
 _CLASSIFIER_PROMPT = None
 if ChatPromptTemplate is not None:
@@ -25,48 +31,140 @@ if ChatPromptTemplate is not None:
          ("human", "Tasks: {title}\n Notes: {notes}\n")
     ])
 
-_llm = None
-if ChatGoogleGenerativeAI is not None and _GOOGLE_API_KEY:
-    try:
-        _llm = ChatGoogleGenerativeAI(
-            model=MODEL,
-            temperature=0,
-            google_api_key=_GOOGLE_API_KEY,
-        )
-    except Exception:
-        _llm = None
+# Substring keywords that settle effort without the LLM. "high" always wins;
+# "low" applies unless the LLM said high (or outright in short-circuit mode).
+EFFORT_KEYWORDS: Dict[str, List[str]] = {
+    "high": ["report", "analysis", "prototype", "research", "design", "study"],
+    "low": ["email", "call", "text", "schedule", "calendar", "meeting"],
+}
+_keyword_re: Optional[re.Pattern] = None
 
-def classify_effort(task: Task) -> Task:
-    # --- Step 1: Optionally get initial classification from the LLM ---
-    effort, conf = "medium", 0.6
-    if _llm is not None and _CLASSIFIER_PROMPT is not None:
-        try:
-            out = _llm.invoke(
-                _CLASSIFIER_PROMPT.format_messages(
-                    title=task.title,
-                    notes=task.notes or ""
-                )
-            )
-            text = (out.content or "").lower()
-            if "high" in text:
-                effort, conf = "high", 0.8
-            elif "low" in text:
-                effort, conf = "low", 0.7
-            elif "medium" in text:
-                effort, conf = "medium", 0.7
-        except Exception:
-            # fall back to deterministic classification below
-            effort, conf = "medium", 0.6
 
-    # --- Step 3: Refine with rule-based keywords ---
-    hi_kw = ["report", "analysis", "prototype", "research", "design", "study"]
-    lo_kw = ["email", "call", "text", "schedule", "calendar", "meeting"]
+def _compile_keywords() -> None:
+    """One regex for the whole table; the lookahead reports overlapping hits too."""
+    global _keyword_re
+    parts = []
+    for effort, words in EFFORT_KEYWORDS.items():
+        alts = sorted({w.lower() for w in words if w}, key=len, reverse=True)
+        if alts:
+            parts.append(f"(?P<{effort}>" + "|".join(re.escape(w) for w in alts) + ")")
+    _keyword_re = re.compile("(?=" + "|".join(parts) + ")") if parts else None
+
+
+def add_keywords(effort: str, words: List[str]) -> None:
+    """Extend the keyword table (effort is "high" or "low") and recompile."""
+    if effort not in ("high", "low"):
+        raise ValueError(f"unsupported effort for keywords: {effort}")
+    EFFORT_KEYWORDS.setdefault(effort, []).extend(w.lower() for w in words if w)
+    _compile_keywords()
+
+
+_compile_keywords()
+
+
+def _keyword_hits(task: Task) -> Set[str]:
+    if _keyword_re is None:
+        return set()
     txt = (task.title + " " + (task.notes or "")).lower()
-    if any(k in txt for k in hi_kw):
+    return {m.lastgroup for m in _keyword_re.finditer(txt)}
+
+
+def _decided_by_keywords(hits: Set[str]) -> bool:
+    return "high" in hits or (CLASSIFIER_SHORT_CIRCUIT and "low" in hits)
+
+
+# LLM verdicts keyed on (title, notes)
+_verdict_cache = TieredCache(
+    "classify", CLASSIFY_CACHE_SIZE, db_path=CACHE_DB or None, ttl_s=CLASSIFY_CACHE_TTL_S
+)
+
+
+def _verdict_key(task: Task) -> str:
+    return make_key("classify", MODEL, task.title, task.notes or "")
+
+
+def clear_classify_cache() -> None:
+    _verdict_cache.clear()
+
+
+def _effort_from_reply(out, effort: str, conf: float) -> tuple[str, float]:
+    text = (out.content or "").lower()
+    if "high" in text:
+        return "high", 0.8
+    if "low" in text:
+        return "low", 0.7
+    if "medium" in text:
+        return "medium", 0.7
+    return effort, conf
+
+
+_DEFAULT = ("medium", 0.6)
+
+
+def _known_verdict(task: Task, hits: Set[str]) -> Optional[Tuple[str, float]]:
+    """(effort, conf) to refine without an LLM call: keyword-decided or cached; None otherwise."""
+    if _decided_by_keywords(hits):
+        return _DEFAULT
+    cached = _verdict_cache.get(_verdict_key(task))
+    return tuple(cached) if cached is not None else None
+
+
+def _classifier_llm():
+    return get_llm(MODEL, temperature=0) if _CLASSIFIER_PROMPT is not None else None
+
+
+def _messages(task: Task):
+    return _CLASSIFIER_PROMPT.format_messages(title=task.title, notes=task.notes or "")
+
+
+def _store_verdict(task: Task, out) -> Tuple[str, float]:
+    verdict = _effort_from_reply(out, *_DEFAULT)
+    _verdict_cache.set(_verdict_key(task), list(verdict))
+    return verdict
+
+
+def _refine_with_keywords(task: Task, effort: str, conf: float, hits: Optional[Set[str]] = None) -> Task:
+    # --- Step 3: Refine with rule-based keywords ---
+    if hits is None:
+        hits = _keyword_hits(task)
+    if "high" in hits:
         effort, conf = "high", max(conf, 0.85)
-    elif effort != "high" and any(k in txt for k in lo_kw):
+    elif effort != "high" and "low" in hits:
         effort, conf = "low", max(conf, 0.75)
 
 
     task.effort, task.confidence = effort, conf
-    return task
\ No newline at end of file
+    return task
+
+
+def classify_effort(task: Task) -> Task:
+    """
+    Effort for one task:
+      • keyword hits that decide the answer skip the LLM entirely,
+      • otherwise a cached LLM verdict for (title, notes), or a fresh LLM call,
+      • then rule-based keyword refinement.
+    """
+    hits = _keyword_hits(task)
+    verdict = _known_verdict(task, hits)
+    llm = _classifier_llm() if verdict is None else None
+    if llm is not None:
+        try:
+            out = call_llm("classifier", lambda: llm.invoke(_messages(task)))
+            verdict = _store_verdict(task, out)
+        except Exception:
+            pass  # fall back to deterministic classification below
+    return _refine_with_keywords(task, *(verdict or _DEFAULT), hits)
+
+
+async def aclassify_effort(task: Task) -> Task:
+    """Async `classify_effort` (LLM via `ainvoke`, same shortcuts and refinement)."""
+    hits = _keyword_hits(task)
+    verdict = _known_verdict(task, hits)
+    llm = _classifier_llm() if verdict is None else None
+    if llm is not None:
+        try:
+            out = await acall_llm("classifier", lambda: llm.ainvoke(_messages(task)))
+            verdict = _store_verdict(task, out)
+        except Exception:
+            pass
+    return _refine_with_keywords(task, *(verdict or _DEFAULT), hits)
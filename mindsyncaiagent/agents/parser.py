@@ -1,68 +1,32 @@
 from __future__ import annotations
-import os
+import asyncio
 import re
-from datetime import datetime, timedelta
+from datetime import date, datetime, time, timedelta
 from typing import Optional
 
 from pydantic import BaseModel
 try:
     from langchain_core.prompts import ChatPromptTemplate
-    from langchain_google_genai import ChatGoogleGenerativeAI
 except Exception:
     ChatPromptTemplate = None
-    ChatGoogleGenerativeAI = None
 
 from core.models import Task
-from core.config import MODEL
-try:
-    from dateutil import parser as dtp
-except Exception:
-    # Provide a minimal fallback that supports ISO-like strings. This keeps
-    # the library importable in environments where python-dateutil isn't
-    # installed. The fallback raises on unsupported formats.
-    from types import SimpleNamespace
-    from datetime import datetime
-
-    def _fallback_parse(s: str, default: datetime | None = None) -> datetime:
-        # try native ISO parser first
-        try:
-            # handle cases like '2024-03-15T14:30:00' or '2024-03-15'
-            return datetime.fromisoformat(s)
-        except Exception:
-            if default is not None:
-                # return default when parse fails, mirroring dateutil's behavior in some cases
-                return default
-            raise
-
-    dtp = SimpleNamespace(parse=_fallback_parse)
-
+from core.config import (
+    MODEL,
+    CACHE_DB,
+    PARSE_CACHE_SIZE,
+    PARSE_CACHE_TTL_S,
+    PARSER_SHORT_CIRCUIT,
+    PARSER_MIN_CONFIDENCE,
+)
+from core.grammar import parse_line
+from core.llm import get_llm, call_llm, acall_llm, LLMUnavailable
+from core.cache import TieredCache, make_key
+from core import telemetry
 
-_DUE_PAT = re.compile(r"\bdue\b([^;,.]*)", re.IGNORECASE)
-def _extract_due_deadline(raw_text: str, plan_day: datetime) -> datetime | None:
-    m = _DUE_PAT.search(raw_text or "")
-    if not m:
-        return None
-    frag = m.group(1).strip()
-    try:
-        dt = dtp.parse(frag, default=plan_day.replace(hour=0, minute=0, second=0, microsecond=0))
-        return dt
-    except Exception:
-        return None
 def _get_llm():
-    # Return an LLM instance when available and configured, else None.
-    if ChatGoogleGenerativeAI is None:
-        return None
-    key = os.getenv("GOOGLE_API_KEY")
-    if not key:
-        return None
-    try:
-        return ChatGoogleGenerativeAI(
-            model=MODEL,
-            temperature=0,
-            google_api_key=key,
-        )
-    except Exception:
-        return None
+    # Return the shared LLM client when available and configured, else None.
+    return get_llm(MODEL, temperature=0)
 
 class TaskDraft(BaseModel):
     title: str
@@ -73,6 +37,9 @@ class TaskDraft(BaseModel):
     fixed_start: Optional[str] = None      
     fixed_end: Optional[str] = None
 
+class TaskDraftBatch(BaseModel):
+    items: list[TaskDraft] = []
+
 _BASE_RULES = (
     "Return only the fields defined by the schema"
     "Convert durations like '2h', '1.5 hours', '45m' into total minutes"
@@ -106,51 +73,35 @@ if ChatPromptTemplate is not None:
          "If a relative day has no time, use 17:00 as the default time.",
         ("human", "{raw_text}")
     ])
+    PARSER_PROMPT_BATCH = ChatPromptTemplate.from_messages([
+        ("system",
+         "Each numbered input line is one task. Extract one Task JSON per line, in the same "
+         "order, as items[] using this schema: "
+         "title (string), est_minutes (int), deadline (string|null), tags(list[str]),"
+         "notes (string|null), fixed_start (string|null), fixed_end (string|null). "
+         "Return exactly {count} items; never merge or split lines. "
+         + _BASE_RULES),
+         ("human", "{numbered_lines}")
+    ])
 else:
     PARSER_PROMPT_LENIENT = None
     PARSER_PROMPT_STRICT = None
+    PARSER_PROMPT_BATCH = None
 
 
-_TIME_RE = re.compile(
-    r'(?<!\d)(?P<h1>\d{1,2})(?::(?P<m1>\d{2}))?\s*(?P<ampm1>am|pm)?'
-    r'\s*[-–—]\s*'
-    r'(?P<h2>\d{1,2})(?::(?P<m2>\d{2}))?\s*(?P<ampm2>am|pm)?',
-    re.IGNORECASE,
-)
-_SINGLE_TIME_RE = re.compile(
-    r'(?<!\d)(?P<h>\d{1,2})(?::(?P<m>\d{2}))?\s*(?P<ampm>am|pm)?',
-    re.IGNORECASE,
-)
+def _grammar(raw_text: str) -> tuple[Task, float]:
+    return parse_line(raw_text, datetime.now().date())
 
-def _to_24h(h: int, ampm: str | None) -> int:
-    if ampm is None:
-        return h if 0 <= h <= 23 else h % 24
-    ampm = ampm.lower()
-    if ampm == "am":
-        return 0 if h == 12 else h
-    return 12 if h == 12 else h + 12
-
-def _parse_time_window_from_text(raw_text: str, base: datetime) -> tuple[datetime | None, datetime | None]:
-    m = _TIME_RE.search(raw_text)
-    if not m:
-        return (None, None)
-    h1 = _to_24h(int(m.group("h1")), m.group("ampm1"))
-    m1 = int(m.group("m1") or 0)
-    h2 = _to_24h(int(m.group("h2")), m.group("ampm2"))
-    m2 = int(m.group("m2") or 0)
-    start = base.replace(hour=h1, minute=m1, second=0, microsecond=0)
-    end = base.replace(hour=h2, minute=m2, second=0, microsecond=0)
-    if end <= start:
-        end += timedelta(days=1)
-    return (start, end)
-
-def _parse_single_time_from_text(raw_text: str, base: datetime) -> datetime | None:
-    m = _SINGLE_TIME_RE.search(raw_text)
-    if not m:
+
+def _confident_parse(raw_text: str) -> Task | None:
+    """Grammar result when it accounts for the whole line, so no LLM call is needed."""
+    if not PARSER_SHORT_CIRCUIT:
+        return None
+    task, conf = _grammar(raw_text)
+    if conf < PARSER_MIN_CONFIDENCE:
         return None
-    h = _to_24h(int(m.group("h")), m.group("ampm"))
-    mm = int(m.group("m") or 0)
-    return base.replace(hour=h, minute=mm, second=0, microsecond=0)
+    telemetry.count("parse_short_circuit")
+    return task
 
 def _normalize_rel_word(s: Optional[str], default_hour=17) -> datetime | None:
     if not s:
@@ -169,30 +120,24 @@ def _normalize_rel_word(s: Optional[str], default_hour=17) -> datetime | None:
         return None
 
 def _finalize_task(raw_text: str, d: TaskDraft) -> Task:
-    base = _infer_base_from_text(raw_text)
+    """LLM draft -> Task; windows, start times and due phrases in the raw text come from the grammar."""
+    g, _conf = _grammar(raw_text)
 
     fs_dt = _normalize_rel_word(d.fixed_start)
     fe_dt = _normalize_rel_word(d.fixed_end)
     if fs_dt is None and fe_dt is None:
-        fs_dt, fe_dt = _parse_time_window_from_text(raw_text, base)
-    if fs_dt is None and fe_dt is None:
-        fs_dt = _parse_single_time_from_text(raw_text, base)
+        fs_dt, fe_dt = g.fixed_start, g.fixed_end
     if fs_dt is not None and fe_dt is None:
         fe_dt = fs_dt + timedelta(minutes=d.est_minutes or 30)
 
     dl_dt = _normalize_rel_word(d.deadline)
     if dl_dt is None and d.deadline:
-        maybe = _parse_single_time_from_text(d.deadline, base)
-        dl_dt = maybe or dl_dt
-
-    extra_due = _extract_due_deadline(raw_text, base)
-    if extra_due:
-        dl_dt = extra_due if (dl_dt is None or extra_due < dl_dt) else dl_dt
+        dl_dt = _grammar(f"due {d.deadline}")[0].deadline
 
-        tlow = raw_text.lower()
-        has_window = _TIME_RE.search(raw_text) is not None
-        has_explicit_start_words = any(w in tlow for w in (" at ", " start ", " from "))
-        if not has_window and not has_explicit_start_words:
+    if g.deadline:
+        dl_dt = g.deadline if (dl_dt is None or g.deadline < dl_dt) else dl_dt
+        # a due phrase is never a fixed window unless the line also names a start
+        if g.fixed_start is None:
             fs_dt, fe_dt = None, None
 
     return Task(
@@ -205,74 +150,242 @@ def _finalize_task(raw_text: str, d: TaskDraft) -> Task:
         fixed_end=fe_dt,
     )
 
+# --- result cache ---
+# LLM parses are cached by normalized text. Datetimes are stored as (day offset, time)
+# relative to the reference date and re-anchored on hit, so "Standup 9:30-9:45" or
+# "report due Fri" parsed last week still resolves against today. Lines naming a
+# calendar date (or week/month/year) are additionally keyed on the full date;
+# everything else only on the weekday, since "Fri"/"tomorrow" depend on nothing else.
+_parse_cache = TieredCache("parse", PARSE_CACHE_SIZE, db_path=CACHE_DB or None, ttl_s=PARSE_CACHE_TTL_S)
+
+_DATE_FIELDS = ("deadline", "fixed_start", "fixed_end")
+# real date shapes only: a year, a month name, or m/d with '/' (or m-d not part of an
+# h:mm window), so "9:30-9:45", "14:00-14:30" and "1.5 hours" stay weekday-scoped
+_CALENDAR_RE = re.compile(
+    r"\b(?:19|20)\d\d\b"
+    r"|(?<![\d:.])\d{1,2}/\d{1,2}(?:/\d{2,4})?(?![\d:])"
+    r"|(?<![\d:.])\d{1,2}-\d{1,2}-\d{2,4}(?![\d:])"
+    r"|\b(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)"
+    r"(?:uary|ruary|ch|il|e|y|ust|tember|ober|ember)?\b"
+    r"|\b(?:week|month|year)",
+    re.IGNORECASE,
+)
+
+
+def _cache_key(raw_text: str, ref: date) -> str:
+    text = " ".join(raw_text.split())
+    scope = ref.isoformat() if _CALENDAR_RE.search(text) else ref.weekday()
+    return make_key("parse", MODEL, text, scope)
+
+
+def _encode_task(task: Task, ref: date) -> dict:
+    data = task.model_dump(mode="json")
+    for f in _DATE_FIELDS:
+        dt = getattr(task, f)
+        data[f] = None if dt is None else [(dt.date() - ref).days, dt.timetz().isoformat()]
+    return data
+
+
+def _decode_task(data: dict, ref: date) -> Task:
+    data = dict(data)
+    for f in _DATE_FIELDS:
+        v = data.get(f)
+        if v is not None:
+            days, tod = v
+            data[f] = datetime.combine(ref + timedelta(days=days), time.fromisoformat(tod))
+    return Task(**data)
+
+
+def _cache_get(raw_text: str) -> Task | None:
+    ref = datetime.now().date()
+    data = _parse_cache.get(_cache_key(raw_text, ref))
+    if data is None:
+        return None
+    try:
+        return _decode_task(data, ref)
+    except Exception:
+        return None
+
+
+def _cache_put(raw_text: str, task: Task) -> Task:
+    ref = datetime.now().date()
+    _parse_cache.set(_cache_key(raw_text, ref), _encode_task(task, ref))
+    return task
+
+
+def clear_parse_cache() -> None:
+    _parse_cache.clear()
+
+
+def _known(raw_text: str) -> Task | None:
+    """Grammar result when it parses the whole line confidently, else a cached LLM result."""
+    return _confident_parse(raw_text) or _cache_get(raw_text)
+
+
+def _draft_prompts() -> list:
+    """(llm, prompt) attempts in order: lenient, then strict; empty without an LLM."""
+    llm = _get_llm()
+    if llm is None or ChatPromptTemplate is None:
+        return []
+    return [(llm, PARSER_PROMPT_LENIENT), (llm, PARSER_PROMPT_STRICT)]
+
+
 def parse_task(raw_text: str) -> Task:
     """
     Parse raw text into a Task.
     Strategy:
+      0) Grammar result when it parses the whole line confidently (no LLM call),
+         else a cached result for the same line (re-anchored to today), if any.
       1) Lenient pass (times as strings) -> Python normalization.
       2) If conversion fails, strict pass (ISO-only).
+    Only LLM results are cached; the deterministic fallback is cheap to recompute.
     """
+    known = _known(raw_text)
+    if known is not None:
+        return known
+    for llm, prompt in _draft_prompts():
+        try:
+            chain = prompt | llm.with_structured_output(TaskDraft)
+            draft = call_llm("parser", lambda: chain.invoke({"raw_text": raw_text}))
+            return _cache_put(raw_text, _finalize_task(raw_text, draft))
+        except (LLMUnavailable, TimeoutError):
+            break  # no time or capacity for a strict retry either
+        except Exception:
+            continue
+    return _parse_deterministic(raw_text)
+
+
+async def aparse_task(raw_text: str) -> Task:
+    """Async `parse_task`: same grammar/cache -> lenient -> strict -> deterministic ladder via `ainvoke`."""
+    known = _known(raw_text)
+    if known is not None:
+        return known
+    for llm, prompt in _draft_prompts():
+        try:
+            chain = prompt | llm.with_structured_output(TaskDraft)
+            draft = await acall_llm("parser", lambda: chain.ainvoke({"raw_text": raw_text}))
+            return _cache_put(raw_text, _finalize_task(raw_text, draft))
+        except (LLMUnavailable, TimeoutError):
+            break  # no time or capacity for a strict retry either
+        except Exception:
+            continue
+    return _parse_deterministic(raw_text)
+
+
+def _parse_deterministic(raw_text: str) -> Task:
+    # Deterministic fallback parser (no LLM): the grammar's best reading of the line.
+    return _grammar(raw_text)[0]
+
+
+def _batch_input(texts: list[str]) -> dict:
+    return {
+        "count": len(texts),
+        "numbered_lines": "\n".join(f"{i + 1}. {t}" for i, t in enumerate(texts)),
+    }
+
+
+def _batch_items(batch, texts: list[str]) -> list[TaskDraft] | None:
+    items = list(getattr(batch, "items", None) or [])
+    return items if len(items) == len(texts) else None
+
+
+def _batch_chain():
     llm = _get_llm()
+    if llm is None or PARSER_PROMPT_BATCH is None:
+        return None
+    return PARSER_PROMPT_BATCH | llm.with_structured_output(TaskDraftBatch)
+
+
+def _batch_drafts(texts: list[str]) -> list[TaskDraft] | None:
+    """One structured-output call for all lines; None unless it returns one draft per line."""
+    try:
+        chain = _batch_chain()
+        if chain is None:
+            return None
+        batch = call_llm("parser_batch", lambda: chain.invoke(_batch_input(texts)))
+    except Exception:
+        return None
+    return _batch_items(batch, texts)
+
 
-    # If an LLM is available and prompts are configured, try the lenient/strict chains.
-    if llm is not None and ChatPromptTemplate is not None:
+async def _abatch_drafts(texts: list[str]) -> list[TaskDraft] | None:
+    try:
+        chain = _batch_chain()
+        if chain is None:
+            return None
+        batch = await acall_llm("parser_batch", lambda: chain.ainvoke(_batch_input(texts)))
+    except Exception:
+        return None
+    return _batch_items(batch, texts)
+
+
+def _finalize_drafts(texts: list[str], drafts: list[TaskDraft] | None) -> list[Task | None]:
+    """
+    Finalize (and cache) each draft; None marks lines that need an individual
+    re-parse, which is every line when there are no drafts.
+    """
+    if drafts is None:
+        return [None] * len(texts)
+    out: list[Task | None] = []
+    for raw, draft in zip(texts, drafts):
         try:
-            draft_chain = PARSER_PROMPT_LENIENT | llm.with_structured_output(TaskDraft)
-            draft = draft_chain.invoke({"raw_text": raw_text})
-            return _finalize_task(raw_text, draft)
+            if not (draft.title or "").strip():
+                raise ValueError("empty title")
+            out.append(_cache_put(raw, _finalize_task(raw, draft)))
         except Exception:
-            try:
-                strict_chain = PARSER_PROMPT_STRICT | llm.with_structured_output(TaskDraft)
-                draft2 = strict_chain.invoke({"raw_text": raw_text})
-                return _finalize_task(raw_text, draft2)
-            except Exception:
-                # fall through to deterministic fallback
-                pass
-
-    # Deterministic fallback parser (no LLM): simple semicolon-splitting and regex heuristics.
-    parts = [p.strip() for p in re.split(r";|\n", raw_text) if p.strip()]
-    title = parts[0] if parts else raw_text.strip()
-
-    # duration: look for patterns like '2h', '1.5 hours', '45m'
-    est_minutes = 30
-    dur_match = re.search(r"(\d+(?:\.\d+)?)\s*h", raw_text, re.IGNORECASE)
-    if dur_match:
-        hours = float(dur_match.group(1))
-        est_minutes = int(hours * 60)
-    else:
-        min_match = re.search(r"(\d+)\s*m", raw_text, re.IGNORECASE)
-        if min_match:
-            est_minutes = int(min_match.group(1))
-
-    base = _infer_base_from_text(raw_text)
-    dl_dt = _extract_due_deadline(raw_text, base)
-    fs_dt, fe_dt = _parse_time_window_from_text(raw_text, base)
-    if fs_dt is None:
-        fs_dt = _parse_single_time_from_text(raw_text, base)
-    if fs_dt is not None and fe_dt is None:
-        fe_dt = fs_dt + timedelta(minutes=est_minutes)
+            out.append(None)
+    return out
 
-    return Task(
-        title=title,
-        est_minutes=est_minutes,
-        deadline=dl_dt,
-        tags=[],
-        notes=None,
-        fixed_start=fs_dt,
-        fixed_end=fe_dt,
-    )
 
-    # --- END OF THE CODING EXERCISE ---
+def _split_known(texts: list[str]) -> tuple[list[Task | None], list[int]]:
+    """Known results per line (None = still to parse) and the indices still to parse."""
+    out = [_known(t) for t in texts]
+    return out, [i for i, t in enumerate(out) if t is None]
+
+
+def _fill(out: list[Task | None], todo: list[int], parsed: list[Task]) -> list[Task]:
+    for i, t in zip(todo, parsed):
+        out[i] = t
+    return out  # type: ignore[return-value]
+
 
 def parse_tasks(texts: list[str]) -> list[Task]:
-    return [parse_task(t) for t in texts]
+    """
+    Parse many task lines with a single LLM call, then finalize each draft locally.
+    Lines the grammar parses confidently and cached lines are served first and left
+    out of the batch. Lines whose draft fails
+    validation fall back to `parse_task` individually; without an LLM (or if the batch
+    is unusable) every line goes through `parse_task`.
+    """
+    out, todo = _split_known(texts)
+    misses = [texts[i] for i in todo]
+    drafts = _batch_drafts(misses) if len(misses) >= 2 else None
+    parsed = _finalize_drafts(misses, drafts)
+    return _fill(out, todo, [t or parse_task(raw) for raw, t in zip(misses, parsed)])
 
-def _infer_base_from_text(raw_text: str) -> datetime:
-    t = raw_text.lower()
-    now = datetime.now()
-    
-    if "tomorrow" in t or "tmr" in t:
-        return now + timedelta(days=1)
-    if "today" in t:
-        return now
-    return now
+
+async def aparse_tasks(
+    texts: list[str], concurrency: int = 8, gate: asyncio.Semaphore | None = None
+) -> list[Task]:
+    """
+    Async `parse_tasks`: one batched `ainvoke`, then per-line `aparse_task` fallbacks
+    fanned out with at most `concurrency` in flight. Pass a shared `gate` to bound
+    LLM calls across several concurrent callers instead.
+    """
+    sem = gate or asyncio.Semaphore(max(1, concurrency))
+
+    async def one(raw: str) -> Task:
+        async with sem:
+            return await aparse_task(raw)
+
+    out, todo = _split_known(texts)
+    misses = [texts[i] for i in todo]
+    drafts = None
+    if len(misses) >= 2:
+        async with sem:
+            drafts = await _abatch_drafts(misses)
+    parsed = _finalize_drafts(misses, drafts)
+    missing = [j for j, t in enumerate(parsed) if t is None]
+    for j, t in zip(missing, await asyncio.gather(*(one(misses[j]) for j in missing))):
+        parsed[j] = t
+    return _fill(out, todo, parsed)  # type: ignore[arg-type]
@@ -1,50 +1,69 @@
 
 from __future__ import annotations
 
+import asyncio
 import os
+import threading
+import time as _time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from contextvars import copy_context
 from datetime import datetime, timedelta, date, time
-from typing import List, Tuple, Dict, Optional
+from typing import List, Tuple, Dict, Optional, Sequence
 
-from pydantic import BaseModel, Field, ValidationError
+from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 
-from core.models import Task, DayPlan, Block
+from core.models import Task, DayPlan, Block, HorizonPlan, PlanDelta
+from core.plan import PackedPlan, AnyPlan
+from core.metrics import metrics_for
+from core.slots import SlotGrid, Slot
+from core.calendar import Busy, BusyCalendar
+from core.llm import get_llm, call_llm, acall_llm
+from core.energy import EnergyCurve, curve_values
+from core.cache import TieredCache, make_key
+from core.config import (
+    CACHE_DB,
+    SCHEDULER_USE_LLM,
+    SCHEDULER_ADVICE_WAIT_S,
+    ADVICE_CACHE_SIZE,
+    ADVICE_CACHE_TTL_S,
+)
+from core import telemetry
 
 try:
-    from langchain_google_genai import ChatGoogleGenerativeAI
     from langchain_core.prompts import ChatPromptTemplate
 except Exception:
-    ChatGoogleGenerativeAI = None  
     ChatPromptTemplate = None     
 
+try:
+    import numpy as np
+except Exception:
+    np = None
+
 load_dotenv()
 
 LLM_MODEL = os.getenv("LC_MODEL", "gemini-2.5-flash-lite")
 
-Slot = Tuple[datetime, datetime]
+def _mock_energy(hour: float) -> float:
+    e = 0.3
+    if 9 <= hour <= 11:
+        e = 0.9
+    if 16 <= hour <= 18:
+        e = max(e, 0.8)
+    if 13 <= hour <= 14:
+        e = 0.2
+    return e
 
-def mock_energy_curve(day: date) -> List[Tuple[datetime, float]]:
+
+def mock_energy_curve(day: date) -> EnergyCurve:
     """
-    Returns 96 (15-min) points across the day with simple peaks:
+    Returns 96 (15-min) points across the day (from 06:00) with simple peaks:
       • High:        09:00–11:00
       • Post-lunch:  13:00–14:00 dip
       • Medium-high: 16:00–18:00
     Values in [0..1].
     """
-    base = datetime.combine(day, time(6, 0))
-    curve: List[Tuple[datetime, float]] = []
-    for i in range(96):
-        t = base + timedelta(minutes=15 * i)
-        hour = t.hour + t.minute / 60.0
-        e = 0.3
-        if 9 <= hour <= 11:
-            e = 0.9
-        if 16 <= hour <= 18:
-            e = max(e, 0.8)
-        if 13 <= hour <= 14:
-            e = 0.2
-        curve.append((t, e))
-    return curve
+    return EnergyCurve(curve_values(_mock_energy), day)
 
 
 def mock_busy(day: date) -> List[Slot]:
@@ -58,6 +77,21 @@ def mock_busy(day: date) -> List[Slot]:
     return [(s1, e1), (s2, e2)]
 
 
+def _as_calendar(busy: Optional[Busy]) -> Optional[Busy]:
+    """Lists holding BusyInterval/dict entries (possibly recurring) become a BusyCalendar."""
+    if busy and not isinstance(busy, BusyCalendar) and not all(isinstance(b, tuple) for b in busy):
+        return BusyCalendar.from_intervals(busy)
+    return busy
+
+
+def _busy_for(busy: Optional[Busy], grid: SlotGrid) -> List[Slot]:
+    """Busy intervals for one grid: a calendar lookup, the explicit list, or the mock meetings."""
+    busy = _as_calendar(busy)
+    if isinstance(busy, BusyCalendar):
+        return busy.between(grid.origin, grid.end)
+    return list(busy or mock_busy(grid.day))
+
+
 def _clamp_to_workday(dt: datetime, day: date, start_h: int, end_h: int) -> datetime:
     """Clamp any datetime to [start_h, end_h] on the given day."""
     start = datetime.combine(day, time(start_h, 0))
@@ -65,25 +99,49 @@ def _clamp_to_workday(dt: datetime, day: date, start_h: int, end_h: int) -> date
     return max(min(dt, end), start)
 
 
-def _workday_slots(day: date, start_h=9, end_h=18, step_min=15) -> List[Slot]:
-    start = datetime.combine(day, time(start_h, 0))
-    end = datetime.combine(day, time(end_h, 0))
-    slots: List[Slot] = []
-    t = start
-    while t < end:
-        nxt = t + timedelta(minutes=step_min)
-        slots.append((t, nxt))
-        t = nxt
-    return slots
-
-
-def _overlaps(a: Slot, b: Slot) -> bool:
-    return not (a[1] <= b[0] or b[1] <= a[0])
+def _energy_by_index(grid: SlotGrid, curve: List[Tuple[datetime, float]]) -> List[float]:
+    """Energy of each grid slot (by start time), 0.5 where the curve has no point."""
+    if isinstance(curve, EnergyCurve):
+        return curve.values_for(grid.origin, grid.step_min, grid.n)
+    energy_lookup = {t: e for t, e in curve}
+    return [energy_lookup.get(grid.time_of(i), 0.5) for i in range(grid.n)]
 
 
-def _slot_scores(free: List[Slot], curve: List[Tuple[datetime, float]]) -> Dict[Slot, float]:
-    energy_lookup = {t: e for t, e in curve}
-    return {s: energy_lookup.get(s[0], 0.5) for s in free}
+def _effort_scores(grid: SlotGrid, energy: List[float], work_start_h: int) -> Dict[str, Sequence[float]]:
+    """
+    Per-slot score vectors for each effort level:
+      • high:   energy
+      • medium: 0.5 + 0.5 * energy
+      • low:    (1 - energy), minus 0.2 before max(work_start_h + 1, 9)
+    """
+    early_h = max(work_start_h + 1, 9)
+    if np is not None:
+        e = np.asarray(energy, dtype=float)
+        minute_of_day = grid.origin.hour * 60 + grid.origin.minute + grid.step_min * np.arange(grid.n)
+        early = (minute_of_day // 60) % 24 < early_h
+        return {
+            "high": e,
+            "medium": 0.5 + 0.5 * e,
+            "low": (1.0 - e) - np.where(early, 0.2, 0.0),
+        }
+
+    hours = [grid.time_of(i).hour for i in range(grid.n)]
+    return {
+        "high": list(energy),
+        "medium": [0.5 + 0.5 * e for e in energy],
+        "low": [(1.0 - e) - (0.2 if h < early_h else 0.0) for e, h in zip(energy, hours)],
+    }
+
+
+def _effort_orders(grid: SlotGrid, energy: List[float], work_start_h: int) -> Dict[str, Sequence[int]]:
+    """
+    Slot indices ranked best-first for each effort level, computed once per request.
+    Ties keep chronological order (stable sort), so per-task ordering is a lookup.
+    """
+    scores = _effort_scores(grid, energy, work_start_h)
+    if np is not None:
+        return {k: np.argsort(-v, kind="stable").tolist() for k, v in scores.items()}
+    return {k: sorted(range(grid.n), key=lambda i, v=v: -v[i]) for k, v in scores.items()}
 
 
 def _chunk_minutes_for_effort(effort: Optional[str]) -> int:
@@ -101,16 +159,6 @@ def _chunk_minutes_for_effort(effort: Optional[str]) -> int:
     return 45
 
 
-def _contiguous_slots(start: datetime, minutes: int) -> List[Slot]:
-    """Return the list of 15-min slots covering [start, start+minutes]."""
-    steps = max(1, minutes // 15)
-    return [
-        (start + timedelta(minutes=15 * i),
-         start + timedelta(minutes=15 * (i + 1)))
-        for i in range(steps)
-    ]
-
-
 def _snap_down_15(dt: datetime) -> datetime:
     minutes = (dt.minute // 15) * 15
     return dt.replace(minute=minutes, second=0, microsecond=0)
@@ -124,16 +172,124 @@ def _snap_up_15(dt: datetime) -> datetime:
     return out.replace(second=0, microsecond=0)
 
 
-def _merge_adjacent(plan: DayPlan) -> DayPlan:
-    """Fuse adjacent blocks of the same task to reduce fragmentation."""
-    merged: List[Block] = []
-    for b in sorted(plan.blocks, key=lambda x: (x.start, x.task_title)):
-        if merged and merged[-1].task_title == b.task_title and merged[-1].end == b.start:
-            merged[-1].end = b.end
+def _normalize_fixed(t: Task, day: date) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """
+    Snap a task's fixed window outward to 15-min slots (end defaults to start + estimate).
+    The window is dropped when it would end after a deadline falling on `day`.
+    """
+    fs = getattr(t, "fixed_start", None)
+    fe = getattr(t, "fixed_end", None)
+    if fs and not fe:
+        fe = fs + timedelta(minutes=int(max(15, t.est_minutes)))
+    fs = _snap_down_15(fs) if fs else None
+    fe = _snap_up_15(fe) if fe else None
+    if t.deadline and t.deadline.date() == day and fe and fe > t.deadline:
+        fs, fe = None, None
+    return fs, fe
+
+
+def _pack_task(
+    grid: SlotGrid,
+    order: Sequence[int],
+    out: PackedPlan,
+    title: str,
+    remaining: int,
+    chunk: int,
+    latest_end: Optional[datetime] = None,
+) -> int:
+    """
+    Place up to `remaining` minutes as contiguous chunks on `grid`, trying slots in
+    `order` (best first), appending the blocks to `out`. Returns the minutes left unplaced.
+    """
+    tid = base = None  # resolved on the first placement; most misses never need them
+    latest = out.minute_of(latest_end) if latest_end else None
+    examined = 0
+    while remaining > 0:
+        minutes = min(chunk, remaining)
+        if minutes < 30 and remaining >= 30:
+            minutes = 30
+        k = grid.slots_for(minutes)
+        starts = grid.run_starts(k)
+
+        placed_any = False
+        for pos, i in enumerate(order):
+            if not (starts >> i) & 1:
+                continue
+
+            if base is None:
+                tid, base = out.task_id(title), out.minute_of(grid.origin)
+            start = base + i * grid.step_min
+            end = start + minutes
+            if latest is not None and end > latest:
+                continue
+
+            grid.occupy(i, k)
+            out.append(tid, start, end)
+            remaining -= minutes
+            placed_any = True
+            examined += pos + 1
+            break
+
+        if not placed_any:
+            examined += len(order)
+            break
+    telemetry.count("slots_examined", examined)
+    return remaining
+
+
+def _prepare_day(
+    tasks: List[Task],
+    day: date,
+    *,
+    energy_curve: List[Tuple[datetime, float]],
+    busy: Optional[Busy],
+    work_start_h: int,
+    work_end_h: int,
+    step_min: int,
+) -> Tuple[SlotGrid, Dict[str, Sequence[int]], PackedPlan, List[Task]]:
+    """
+    Shared single-day setup: slot grid with busy time, per-effort slot rankings,
+    and a plan holding the fixed-time reservations. Returns the flexible tasks left to pack.
+    """
+    grid = SlotGrid(day, start_h=work_start_h, end_h=work_end_h, step_min=step_min)
+    grid.mark_busy(_busy_for(busy, grid))
+    energy = _energy_by_index(grid, energy_curve)
+    orders = _effort_orders(grid, energy, work_start_h)
+
+    plan = PackedPlan(day)
+
+    fixed: List[Tuple[Task, Optional[datetime], Optional[datetime]]] = []
+    flexible: List[Task] = []
+
+    for t in tasks:
+        if getattr(t, "fixed_start", None) or getattr(t, "fixed_end", None):
+            fs, fe = _normalize_fixed(t, day)
+
+            try:
+                t.fixed_start, t.fixed_end = fs, fe 
+            except Exception:
+                pass
+
+            if fs and fe:
+                fixed.append((t, fs, fe))
+            else:
+                flexible.append(t)
         else:
-            merged.append(b)
-    plan.blocks = merged
-    return plan
+            flexible.append(t)
+
+    for t, fs, fe in fixed:
+        if not fs or not fe:
+            continue
+        if fs.date() != day:
+            continue
+        fs = _clamp_to_workday(fs, day, work_start_h, work_end_h)
+        fe = _clamp_to_workday(fe, day, work_start_h, work_end_h)
+        if fe <= fs:
+            continue
+        grid.reserve(fs, fe)
+        plan.add(t.title, fs, fe)
+
+    return grid, orders, plan, flexible
 
 
 class PlanAdvice(BaseModel):
@@ -144,13 +300,7 @@ class PlanAdvice(BaseModel):
 
 
 def _get_llm_for_scheduler():
-    key = os.getenv("GOOGLE_API_KEY")
-    if not key or ChatGoogleGenerativeAI is None:
-        return None
-    try:
-        return ChatGoogleGenerativeAI(model=LLM_MODEL, temperature=0, google_api_key=key)
-    except Exception:
-        return None
+    return get_llm(LLM_MODEL, temperature=0)
 
 
 def _summarize_energy(curve: List[Tuple[datetime, float]]) -> str:
@@ -186,20 +336,13 @@ if ChatPromptTemplate is not None:
          "Return a JSON object with fields: order, chunk_minutes, defer, note.")
     ])
 
-def _llm_plan_advice(
+def _advice_inputs(
     tasks: List[Task],
     day: date,
-    *,
     energy_curve: List[Tuple[datetime, float]],
     work_start_h: int,
     work_end_h: int,
-) -> Optional[PlanAdvice]:
-    """Ask the LLM for suggested order / chunk / deferrals. Fail-soft to None."""
-    llm = _get_llm_for_scheduler()
-    if llm is None or _LLM_SCHED_PROMPT is None:
-        return None
-
-    # --- Input Preparation (Provided) ---
+) -> Dict[str, object]:
     rows = []
     for t in tasks:
         dl = t.deadline.isoformat() if t.deadline else "-"
@@ -207,135 +350,129 @@ def _llm_plan_advice(
         if getattr(t, "fixed_start", None) and getattr(t, "fixed_end", None):
             fx = f"{t.fixed_start.strftime('%H:%M')}-{t.fixed_end.strftime('%H:%M')}"
         rows.append(f"- {t.title} | {int(t.est_minutes)} | {t.effort or 'medium'} | {dl} | {fx or '-'}")
-    task_table = "\n".join(rows)
-    energy_summary = _summarize_energy(energy_curve)
+    return {
+        "day": day.isoformat(),
+        "start_h": work_start_h,
+        "end_h": work_end_h,
+        "energy_summary": _summarize_energy(energy_curve),
+        "task_table": "\n".join(rows),
+    }
+
+
+def _clean_advice(advice: Optional[PlanAdvice]) -> Optional[PlanAdvice]:
+    if advice and advice.chunk_minutes:
+        advice.chunk_minutes = {
+            k: int(max(15, min(120, v))) for k, v in advice.chunk_minutes.items()
+        }
+    return advice
+
+
+# Advice depends only on the prompt inputs, so identical task tables over the same
+# energy summary and work hours reuse one answer.
+_advice_cache = TieredCache("advice", ADVICE_CACHE_SIZE, db_path=CACHE_DB or None, ttl_s=ADVICE_CACHE_TTL_S)
+
+
+def _advice_key(inputs: Dict[str, object]) -> str:
+    return make_key(
+        "advice", LLM_MODEL, inputs["task_table"], inputs["energy_summary"], inputs["start_h"], inputs["end_h"]
+    )
+
+
+def _cached_advice(inputs: Dict[str, object]) -> Optional[PlanAdvice]:
+    data = _advice_cache.get(_advice_key(inputs))
+    return None if data is None else PlanAdvice(**data)
+
+
+def clear_advice_cache() -> None:
+    _advice_cache.clear()
 
-    try:
 
-        # Build and run the LCEL chain only if the prompt and LLM are available.
-        if _LLM_SCHED_PROMPT is None:
-            return None
-
-        llm = _get_llm_for_scheduler()
-        if llm is None:
-            return None
-
-        # Chain the prompt to the LLM and request a structured PlanAdvice output.
-        try:
-            chain = _LLM_SCHED_PROMPT | llm.with_structured_output(PlanAdvice)
-            advice: PlanAdvice = chain.invoke({
-                "day": day.isoformat(),
-                "start_h": work_start_h,
-                "end_h": work_end_h,
-                "energy_summary": energy_summary,
-                "task_table": task_table,
-            })
-        except Exception:
-            return None
-        
-        # --- End of Coding Section ---
-
-        if advice and advice.chunk_minutes:
-            advice.chunk_minutes = {
-                k: int(max(15, min(120, v))) for k, v in advice.chunk_minutes.items()
-            }
-        return advice
-    except ValidationError:
+def _fetch_advice(inputs: Dict[str, object]) -> Optional[PlanAdvice]:
+    """One LLM advice call for prepared inputs (cached on success). Fail-soft to None."""
+    llm = _get_llm_for_scheduler()
+    if llm is None or _LLM_SCHED_PROMPT is None:
         return None
+    try:
+        chain = _LLM_SCHED_PROMPT | llm.with_structured_output(PlanAdvice)
+        advice = _clean_advice(call_llm("scheduler", lambda: chain.invoke(inputs)))
     except Exception:
         return None
+    if advice is not None:
+        _advice_cache.set(_advice_key(inputs), advice.model_dump())
+    return advice
 
 
+async def _afetch_advice(inputs: Dict[str, object]) -> Optional[PlanAdvice]:
+    llm = _get_llm_for_scheduler()
+    if llm is None or _LLM_SCHED_PROMPT is None:
+        return None
+    try:
+        chain = _LLM_SCHED_PROMPT | llm.with_structured_output(PlanAdvice)
+        advice = _clean_advice(await acall_llm("scheduler", lambda: chain.ainvoke(inputs)))
+    except Exception:
+        return None
+    if advice is not None:
+        _advice_cache.set(_advice_key(inputs), advice.model_dump())
+    return advice
 
 
-def greedy_schedule(
+def _llm_plan_advice(
     tasks: List[Task],
     day: date,
     *,
-    energy_curve: Optional[List[Tuple[datetime, float]]] = None,
-    busy: Optional[List[Slot]] = None,
-    work_start_h: int = 9,
-    work_end_h: int = 18,
-    step_min: int = 15,
-    use_llm: Optional[bool] = None,  # enable LLM layer (env or explicit)
-) -> DayPlan:
-    """
-    Greedy packer with:
-      • fixed-time reservations (+ safety valve vs deadline),
-      • work-hours clamp,
-      • same-day deadline guard (no chunk ends after deadline),
-      • mild energy-aware scoring (high→peaks, low→dips),
-      • optional LLM pre-advice (order / chunk / deferrals),
-      • contiguous chunk packing + merge.
-    """
-    curve = energy_curve or mock_energy_curve(day)
-    busy_list = busy or mock_busy(day)
+    energy_curve: List[Tuple[datetime, float]],
+    work_start_h: int,
+    work_end_h: int,
+) -> Optional[PlanAdvice]:
+    """Suggested order / chunk / deferrals (cached, else one LLM call). Fail-soft to None."""
+    inputs = _advice_inputs(tasks, day, energy_curve, work_start_h, work_end_h)
+    return _cached_advice(inputs) or _fetch_advice(inputs)
 
-    use_llm = True
-    all_work_slots = _workday_slots(day, start_h=work_start_h, end_h=work_end_h, step_min=step_min)
-    free = [s for s in all_work_slots if not any(_overlaps(s, b) for b in busy_list)]
-    scores = _slot_scores(free, curve)
 
-    plan = DayPlan(date=day, blocks=[])
-    used: set[Slot] = set()
+_advice_pool: Optional[ThreadPoolExecutor] = None
+_advice_pool_lock = threading.Lock()
 
-    fixed: List[Tuple[Task, Optional[datetime], Optional[datetime]]] = []
-    flexible: List[Task] = []
 
-    for t in tasks:
-        fs = getattr(t, "fixed_start", None)
-        fe = getattr(t, "fixed_end", None)
-        if fs or fe:
-            if fs and not fe:
-                fe = fs + timedelta(minutes=int(max(15, t.est_minutes)))
-            fs = _snap_down_15(fs) if fs else None
-            fe = _snap_up_15(fe) if fe else None
-            if t.deadline and t.deadline.date() == day and fe and fe > t.deadline:
-                fs, fe = None, None
+def _advice_executor() -> ThreadPoolExecutor:
+    """Background threads that fetch advice while the caller packs deterministically."""
+    global _advice_pool
+    if _advice_pool is None:
+        with _advice_pool_lock:
+            if _advice_pool is None:
+                _advice_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="advice")
+    return _advice_pool
 
-            try:
-                t.fixed_start, t.fixed_end = fs, fe 
-            except Exception:
-                pass
 
-            if fs and fe:
-                fixed.append((t, fs, fe))
-            else:
-                flexible.append(t)
-        else:
-            flexible.append(t)
+def _is_flexible(t: Task, day: date) -> bool:
+    """True when the packer (not a fixed reservation) will place this task on `day`."""
+    if not (getattr(t, "fixed_start", None) or getattr(t, "fixed_end", None)):
+        return True
+    fs, fe = _normalize_fixed(t, day)
+    return not (fs and fe)
 
-    for t, fs, fe in fixed:
-        if not fs or not fe:
-            continue
-        if fs.date() != day:
-            continue
-        fs = _clamp_to_workday(fs, day, work_start_h, work_end_h)
-        fe = _clamp_to_workday(fe, day, work_start_h, work_end_h)
-        if fe <= fs:
-            continue
-        minutes = int((fe - fs).total_seconds() // 60)
-        needed = _contiguous_slots(fs, minutes)
-        for ns in needed:
-            used.add(ns)
-        plan.blocks.append(Block(task_title=t.title, start=fs, end=fe))
-
-   
-    free = [s for s in free if s not in used]
-    if not free and len(plan.blocks) == 0:
-        return plan
 
- 
-    advice: Optional[PlanAdvice] = None
-    if use_llm:
-        # Only ask LLM about flexible tasks
-        advice = _llm_plan_advice(
-            tasks=flexible,
-            day=day,
-            energy_curve=curve,
-            work_start_h=work_start_h,
-            work_end_h=work_end_h,
-        )
+def _pack_day(
+    tasks: List[Task],
+    day: date,
+    curve: List[Tuple[datetime, float]],
+    busy: Optional[Busy],
+    work_start_h: int,
+    work_end_h: int,
+    step_min: int,
+    advice: Optional[PlanAdvice],
+) -> PackedPlan:
+    """One deterministic packing pass, optionally steered by `advice`."""
+    grid, orders, plan, flexible = _prepare_day(
+        tasks, day,
+        energy_curve=curve,
+        busy=busy,
+        work_start_h=work_start_h,
+        work_end_h=work_end_h,
+        step_min=step_min,
+    )
+
+    if not grid.free and len(plan) == 0:
+        return plan
 
     by_title: Dict[str, Task] = {t.title: t for t in flexible}
     defer_titles: set[str] = set()
@@ -379,85 +516,399 @@ def greedy_schedule(
         tasks_sorted = tasks_sorted_default
 
 
-    def score_for_task(slot: Slot, effort: Optional[str]) -> float:
-        e = scores.get(slot, 0.5)
-        h = slot[0].hour
-        eff = (effort or "medium").lower()
-        if eff == "high":
-            return e                      
-        if eff == "low":
-            early_penalty = 0.2 if h < max(work_start_h + 1, 9) else 0.0
-            return (1.0 - e) - early_penalty
-        return 0.5 + 0.5 * e            
+    with telemetry.span("pack"):
+        for t in tasks_sorted:
+            remaining = max(15, int(t.est_minutes))
 
-    for t in tasks_sorted:
-        remaining = max(15, int(t.est_minutes))
+            chunk = _chunk_minutes_for_effort(t.effort)
+            if advice and t.title in chunk_override:
+                chunk = chunk_override[t.title]
+
+            latest_end: Optional[datetime] = None
+            if t.deadline and t.deadline.date() == day:
+                latest_end = t.deadline
 
-        chunk = _chunk_minutes_for_effort(t.effort)
-        if advice and t.title in chunk_override:
-            chunk = chunk_override[t.title]
+            eff = (t.effort or "medium").lower()
+            order = orders.get(eff, orders["medium"])
 
-        latest_end: Optional[datetime] = None
-        if t.deadline and t.deadline.date() == day:
-            latest_end = t.deadline
+            _pack_task(grid, order, plan, t.title, remaining, chunk, latest_end)
 
-        free_sorted = sorted(free, key=lambda x: -score_for_task(x, t.effort))
+    return plan.merge_adjacent()
 
-        while remaining > 0:
-            placed_any = False
 
-            for s in free_sorted:
-                if s in used:
-                    continue
+def greedy_schedule(
+    tasks: List[Task],
+    day: date,
+    *,
+    energy_curve: Optional[List[Tuple[datetime, float]]] = None,
+    busy: Optional[Busy] = None,
+    work_start_h: int = 9,
+    work_end_h: int = 18,
+    step_min: int = 15,
+    use_llm: Optional[bool] = None,  # enable LLM layer (None = SCHEDULER_USE_LLM)
+    advice: Optional[PlanAdvice] = None,  # precomputed advice; skips the LLM call
+    advice_wait_s: Optional[float] = None,  # None = SCHEDULER_ADVICE_WAIT_S
+    packed: bool = False,  # return the internal PackedPlan (no pydantic conversion)
+) -> AnyPlan:
+    """
+    Greedy packer with:
+      • fixed-time reservations (+ safety valve vs deadline),
+      • work-hours clamp,
+      • same-day deadline guard (no chunk ends after deadline),
+      • mild energy-aware scoring (high→peaks, low→dips),
+      • optional LLM pre-advice (order / chunk / deferrals),
+      • contiguous chunk packing on a bitmask slot grid + merge.
+    With the LLM on, advice is fetched in the background while the deterministic plan
+    is packed; advice arriving within `advice_wait_s` re-packs the day, otherwise the
+    deterministic plan is returned (late advice still lands in the advice cache).
+    """
+    curve = energy_curve or mock_energy_curve(day)
+    use_llm = SCHEDULER_USE_LLM if use_llm is None else use_llm
+    args = (tasks, day, curve, busy, work_start_h, work_end_h, step_min)
+    plan = _race_advice(args, use_llm, advice, advice_wait_s)
+    return plan if packed else plan.to_day_plan()
+
+
+def _race_advice(
+    args: tuple,
+    use_llm: bool,
+    advice: Optional[PlanAdvice],
+    advice_wait_s: Optional[float],
+) -> PackedPlan:
+    """The deterministic pack, re-packed with LLM advice when it is cached or arrives in time."""
+    tasks, day, curve, _busy, work_start_h, work_end_h, _step = args
+    flexible = [t for t in tasks if _is_flexible(t, day)]
+    if advice is not None or not use_llm or not flexible:
+        return _pack_day(*args, advice)
+
+    inputs = _advice_inputs(flexible, day, curve, work_start_h, work_end_h)
+    cached = _cached_advice(inputs)
+    if cached is not None:
+        return _pack_day(*args, cached)
+
+    t0 = _time.monotonic()
+    pending = _advice_executor().submit(copy_context().run, _fetch_advice, inputs)
+    plan = _pack_day(*args, None)
+    wait_s = SCHEDULER_ADVICE_WAIT_S if advice_wait_s is None else advice_wait_s
+    try:
+        advice = pending.result(timeout=max(0.0, wait_s - (_time.monotonic() - t0)))
+    except FutureTimeout:
+        telemetry.count("advice_late")
+        return plan
+    return _pack_day(*args, advice) if advice else plan
+
+async def agreedy_schedule(
+    tasks: List[Task],
+    day: date,
+    *,
+    energy_curve: Optional[List[Tuple[datetime, float]]] = None,
+    busy: Optional[Busy] = None,
+    work_start_h: int = 9,
+    work_end_h: int = 18,
+    step_min: int = 15,
+    use_llm: Optional[bool] = None,
+    advice: Optional[PlanAdvice] = None,
+    advice_wait_s: Optional[float] = None,
+    packed: bool = False,
+) -> AnyPlan:
+    """
+    Async `greedy_schedule`: advice via `ainvoke` races the deterministic pack, which
+    runs in a worker thread so the advice request is in flight while packing.
+    """
+    curve = energy_curve or mock_energy_curve(day)
+    use_llm = SCHEDULER_USE_LLM if use_llm is None else use_llm
+    args = (tasks, day, curve, busy, work_start_h, work_end_h, step_min)
+    plan = await _arace_advice(args, use_llm, advice, advice_wait_s)
+    return plan if packed else plan.to_day_plan()
+
+
+async def _arace_advice(
+    args: tuple,
+    use_llm: bool,
+    advice: Optional[PlanAdvice],
+    advice_wait_s: Optional[float],
+) -> PackedPlan:
+    """Async `_race_advice`."""
+    tasks, day, curve, _busy, work_start_h, work_end_h, _step = args
+    flexible = [t for t in tasks if _is_flexible(t, day)]
+    if advice is not None or not use_llm or not flexible:
+        return _pack_day(*args, advice)
+
+    inputs = _advice_inputs(flexible, day, curve, work_start_h, work_end_h)
+    cached = _cached_advice(inputs)
+    if cached is not None:
+        return _pack_day(*args, cached)
+
+    loop = asyncio.get_running_loop()
+    t0 = loop.time()
+    pending = asyncio.ensure_future(_afetch_advice(inputs))
+    # packing off the loop: the advice task starts now and runs while the day is packed
+    plan = await asyncio.to_thread(_pack_day, *args, None)
+    wait_s = SCHEDULER_ADVICE_WAIT_S if advice_wait_s is None else advice_wait_s
+    try:
+        # shielded: late advice keeps going and fills the cache for the next request
+        advice = await asyncio.wait_for(asyncio.shield(pending), max(0.0, wait_s - (loop.time() - t0)))
+    except asyncio.TimeoutError:
+        telemetry.count("advice_late")
+        return plan
+    return _pack_day(*args, advice) if advice else plan
+
+
+def plan_horizon(
+    tasks: List[Task],
+    start_day: date,
+    days: int = 7,
+    *,
+    energy_curve: Optional[List[Tuple[datetime, float]]] = None,
+    busy: Optional[Busy] = None,
+    work_start_h: int = 9,
+    work_end_h: int = 18,
+    step_min: int = 15,
+    use_llm: Optional[bool] = False,  # None = SCHEDULER_USE_LLM
+) -> HorizonPlan:
+    """
+    Multi-day packer over `days` consecutive days starting at `start_day`:
+      • one slot grid per day; `energy_curve` is a time-of-day template ranked once,
+      • fixed-time tasks are reserved on their own day,
+      • deadline tasks fill the earliest days up to their deadline (no chunk ends after it),
+      • tasks without a deadline go to the least-loaded day first and spill over,
+      • at most one LLM advice call for the whole window (deferred → not on day one),
+      • minutes that fit nowhere are reported in `unscheduled`.
+    """
+    days = max(1, int(days))
+    day_list = [start_day + timedelta(days=d) for d in range(days)]
+    curve = energy_curve or mock_energy_curve(start_day)
+    busy = _as_calendar(busy)
+
+    grids: List[SlotGrid] = []
+    for d in day_list:
+        g = SlotGrid(d, start_h=work_start_h, end_h=work_end_h, step_min=step_min)
+        g.mark_busy(_busy_for(busy, g))
+        grids.append(g)
+
+    template = grids[0]
+    if isinstance(curve, EnergyCurve):
+        energy = curve.values_for(template.origin, template.step_min, template.n, anchored=False)
+    else:
+        by_time = {(t.hour, t.minute): e for t, e in curve}
+        energy = [
+            by_time.get((template.time_of(i).hour, template.time_of(i).minute), 0.5)
+            for i in range(template.n)
+        ]
+    orders = _effort_orders(template, energy, work_start_h)
+
+    plans = [PackedPlan(d) for d in day_list]
+    unscheduled: Dict[str, int] = {}
+    flexible: List[Task] = []
+
+    for t in tasks:
+        anchor = getattr(t, "fixed_start", None) or getattr(t, "fixed_end", None)
+        if not anchor:
+            flexible.append(t)
+            continue
+        fs, fe = _normalize_fixed(t, anchor.date())
+        if not fs or not fe:
+            flexible.append(t)
+            continue
+        idx = (fs.date() - start_day).days
+        if not 0 <= idx < days:
+            unscheduled[t.title] = unscheduled.get(t.title, 0) + max(15, int(t.est_minutes))
+            continue
+        fs = _clamp_to_workday(fs, day_list[idx], work_start_h, work_end_h)
+        fe = _clamp_to_workday(fe, day_list[idx], work_start_h, work_end_h)
+        if fe <= fs:
+            unscheduled[t.title] = unscheduled.get(t.title, 0) + max(15, int(t.est_minutes))
+            continue
+        grids[idx].reserve(fs, fe)
+        plans[idx].add(t.title, fs, fe)
 
-                minutes = min(chunk, remaining)
-                if minutes < 30 and remaining >= 30:
-                    minutes = 30
+    advice: Optional[PlanAdvice] = None
+    use_llm = SCHEDULER_USE_LLM if use_llm is None else use_llm
+    if use_llm and flexible:
+        advice = _llm_plan_advice(
+            tasks=flexible,
+            day=start_day,
+            energy_curve=curve,
+            work_start_h=work_start_h,
+            work_end_h=work_end_h,
+        )
 
-                start = s[0]
-                end = start + timedelta(minutes=minutes)
+    by_title: Dict[str, Task] = {t.title: t for t in flexible}
+    defer_titles: set[str] = set()
+    chunk_override: Dict[str, int] = {}
+    if advice:
+        defer_titles = {t for t in advice.defer if t in by_title}
+        for k, v in (advice.chunk_minutes or {}).items():
+            if k in by_title:
+                chunk_override[k] = int(max(15, min(120, v)))
 
-                start = _clamp_to_workday(start, day, work_start_h, work_end_h)
-                end = _clamp_to_workday(end, day, work_start_h, work_end_h)
-                if end <= start:
-                    continue
+    horizon_end = datetime.combine(day_list[-1], time(23, 59))
 
-                if latest_end and end > latest_end:
-                    continue
+    def task_key(t: Task):
+        eff_rank = {"high": 0, "medium": 1, "low": 2}.get((t.effort or "medium").lower(), 1)
+        return (t.deadline or horizon_end, eff_rank)
 
-                needed = _contiguous_slots(start, minutes)
-                if not all(ns in free and ns not in used for ns in needed):
-                    continue
+    tasks_sorted = sorted(flexible, key=task_key)
+    if advice and advice.order:
+        rank = {title: i for i, title in enumerate(advice.order)}
+        tasks_sorted.sort(key=lambda t: rank.get(t.title, len(rank)))
 
-                for ns in needed:
-                    used.add(ns)
-                plan.blocks.append(Block(task_title=t.title, start=start, end=end))
-                remaining -= minutes
-                placed_any = True
+    for t in tasks_sorted:
+        remaining = max(15, int(t.est_minutes))
+        chunk = chunk_override.get(t.title) or _chunk_minutes_for_effort(t.effort)
+        order = orders.get((t.effort or "medium").lower(), orders["medium"])
+
+        last = days - 1
+        if t.deadline:
+            if t.deadline.date() < start_day:
+                # already overdue: no day in the window can meet it
+                unscheduled[t.title] = unscheduled.get(t.title, 0) + remaining
+                continue
+            last = min(last, (t.deadline.date() - start_day).days)
+        first = 1 if t.title in defer_titles and last > 0 else 0
+        candidates = list(range(first, last + 1))
+        if not t.deadline:
+            candidates.sort(key=lambda d: grids[d].load())
+
+        for d in candidates:
+            latest_end = t.deadline if t.deadline and t.deadline.date() == day_list[d] else None
+            remaining = _pack_task(grids[d], order, plans[d], t.title, remaining, chunk, latest_end)
+            if remaining <= 0:
                 break
 
-            if not placed_any:
-                break
+        if remaining > 0:
+            unscheduled[t.title] = unscheduled.get(t.title, 0) + remaining
+
+    return HorizonPlan(
+        start=start_day,
+        days=[p.merge_adjacent().to_day_plan() for p in plans],
+        unscheduled=unscheduled,
+    )
+
+
+def _block_minutes(b: Block) -> int:
+    return int((b.end - b.start).total_seconds() // 60)
 
-   
-    plan.blocks.sort(key=lambda b: b.start)
-    _merge_adjacent(plan)
-    return plan
-
-def energy_alignment(plan: DayPlan) -> float:
-    """Fraction of planned minutes landing in high-energy slots (>= 0.75)."""
-    if not plan.blocks:
-        return 0.0
-    curve = dict(mock_energy_curve(plan.date))
-    hi_thresh = 0.75
-    hi = 0
-    total = 0
+
+def replan(
+    plan: DayPlan,
+    tasks: List[Task],
+    delta: PlanDelta,
+    *,
+    energy_curve: Optional[List[Tuple[datetime, float]]] = None,
+    busy: Optional[Busy] = None,
+    work_start_h: int = 9,
+    work_end_h: int = 18,
+    step_min: int = 15,
+) -> DayPlan:
+    """
+    Repair an existing plan after a small edit, leaving unaffected blocks where they are:
+      • removed tasks lose their blocks,
+      • flexible blocks hit by new busy time are evicted and their minutes re-packed,
+      • a shorter estimate trims the task's latest blocks, a longer one packs the difference,
+      • added tasks are reserved (fixed) or packed into the remaining free slots.
+    `tasks` is the task list the plan was built from; a block whose task is missing
+    from it is treated as a flexible task of its planned minutes. No LLM call is made.
+    """
+    day = plan.date
+    curve = energy_curve or mock_energy_curve(day)
+    new_busy: List[Slot] = BusyCalendar.from_intervals(delta.busy).on(day)
+    removed = set(delta.remove)
+
+    by_title: Dict[str, Task] = {t.title: t for t in tasks if t.title not in removed}
+    # blocks whose task isn't in `tasks` keep their planned minutes, so eviction re-packs them
+    planned: Dict[str, int] = {}
     for b in plan.blocks:
-        t = b.start.replace(second=0, microsecond=0)
-        while t < b.end:
-            total += 15
-            if curve.get(t, 0.0) >= hi_thresh:
-                hi += 15
-            t += timedelta(minutes=15)
-    return 0.0 if total == 0 else round(hi / total, 2)
+        if b.task_title not in removed and b.task_title not in by_title:
+            planned[b.task_title] = planned.get(b.task_title, 0) + _block_minutes(b)
+    for title, minutes in planned.items():
+        by_title[title] = Task(title=title, est_minutes=minutes)
+    for t in delta.add:
+        by_title[t.title] = t
+    dirty: set[str] = {t.title for t in delta.add}
+    for title, est in delta.estimates.items():
+        if title in by_title:
+            by_title[title] = by_title[title].model_copy(update={"est_minutes": int(est)})
+            dirty.add(title)
+
+    def is_fixed(title: str) -> bool:
+        t = by_title.get(title)
+        return bool(t and (t.fixed_start or t.fixed_end))
+
+    kept: List[Block] = []
+    for b in plan.blocks:
+        if b.task_title in removed:
+            continue
+        if b.task_title in dirty and is_fixed(b.task_title):
+            continue  # re-reserved below from the updated task
+        if not is_fixed(b.task_title) and any(b.start < e and s < b.end for s, e in new_busy):
+            dirty.add(b.task_title)
+            continue
+        kept.append(b.model_copy())
+
+    grid = SlotGrid(day, start_h=work_start_h, end_h=work_end_h, step_min=step_min)
+    grid.mark_busy(_busy_for(busy, grid) + new_busy)
+    for b in kept:
+        grid.occupy_span(b.start, b.end)
+
+    # shrink over-estimated tasks from their latest blocks
+    for title in dirty:
+        t = by_title.get(title)
+        if t is None or is_fixed(title):
+            continue
+        own = sorted((b for b in kept if b.task_title == title), key=lambda b: b.start, reverse=True)
+        excess = sum(_block_minutes(b) for b in own) - max(15, int(t.est_minutes))
+        for b in own:
+            if excess <= 0:
+                break
+            grid.release_span(b.start, b.end)
+            if _block_minutes(b) <= excess:
+                excess -= _block_minutes(b)
+                kept.remove(b)
+            else:
+                b.end = b.end - timedelta(minutes=excess)
+                grid.occupy_span(b.start, b.end)
+                excess = 0
+
+    out = PackedPlan(day)
+    for b in kept:
+        out.add(b.task_title, b.start, b.end)
+    for title in sorted(dirty):
+        if not is_fixed(title):
+            continue
+        fs, fe = _normalize_fixed(by_title[title], day)
+        if not fs or not fe or fs.date() != day:
+            continue
+        fs = _clamp_to_workday(fs, day, work_start_h, work_end_h)
+        fe = _clamp_to_workday(fe, day, work_start_h, work_end_h)
+        if fe <= fs:
+            continue
+        grid.reserve(fs, fe)
+        out.add(title, fs, fe)
+
+    energy = _energy_by_index(grid, curve)
+    orders = _effort_orders(grid, energy, work_start_h)
+
+    def task_key(t: Task):
+        d = t.deadline or datetime.combine(day, time(23, 59))
+        eff_rank = {"high": 0, "medium": 1, "low": 2}.get((t.effort or "medium").lower(), 1)
+        return (d, eff_rank)
+
+    to_pack = sorted((by_title[t] for t in dirty if t in by_title and not is_fixed(t)), key=task_key)
+    for t in to_pack:
+        tid = out.task_id(t.title)
+        placed = sum(e - s for s, e, x in zip(out.starts, out.ends, out.tasks) if x == tid)
+        remaining = max(15, int(t.est_minutes)) - placed
+        if remaining <= 0:
+            continue
+        latest_end = t.deadline if t.deadline and t.deadline.date() == day else None
+        order = orders.get((t.effort or "medium").lower(), orders["medium"])
+        _pack_task(grid, order, out, t.title, remaining, _chunk_minutes_for_effort(t.effort), latest_end)
+
+    return out.merge_adjacent().to_day_plan()
+
 
+def energy_alignment(plan: AnyPlan) -> float:
+    """Fraction of planned minutes landing in high-energy slots (>= 0.75) of the mock curve."""
+    day = plan.day if isinstance(plan, PackedPlan) else plan.date
+    return metrics_for(plan, mock_energy_curve(day)).energy_alignment
@@ -0,0 +1,258 @@
+
+from __future__ import annotations
+
+import time as _time
+from datetime import datetime, date, timedelta
+from typing import Dict, List, Tuple, Optional
+
+from core.models import Task, DayPlan, SolverReport
+from core.slots import SlotGrid
+from core.calendar import Busy
+from core import telemetry
+from agents.scheduler import (
+    greedy_schedule,
+    mock_energy_curve,
+    _prepare_day,
+    _energy_by_index,
+    _effort_scores,
+    _chunk_minutes_for_effort,
+)
+from core.metrics import metrics_for
+
+
+W_PLACE = 10.0      # per minute placed: any placement beats leaving work out
+W_DEADLINE = 100.0  # per minute of a task due today: deadline work beats everything else
+
+
+class _BudgetExceeded(Exception):
+    pass
+
+
+class _Chunk:
+    """One chunk of a flexible task; chunks with equal `signature` are interchangeable."""
+    __slots__ = ("title", "minutes", "k", "signature")
+
+    def __init__(self, title: str, minutes: int, k: int, signature: tuple):
+        self.title = title
+        self.minutes = minutes
+        self.k = k
+        self.signature = signature
+
+
+class _ChunkClass:
+    """Interchangeable chunks: same size, same per-slot value, same latest start."""
+    __slots__ = ("k", "minutes", "last", "values", "members")
+
+    def __init__(self, k: int, minutes: int, last: int, values: List[float]):
+        self.k = k
+        self.minutes = minutes
+        self.last = last
+        self.values = values      # value of starting a chunk at slot i
+        self.members: List[_Chunk] = []
+
+
+def _chunk_sizes(est_minutes: int, chunk: int) -> List[int]:
+    """Same chunking as the greedy packer (min 30 while >= 30 remains)."""
+    remaining = max(15, int(est_minutes))
+    sizes: List[int] = []
+    while remaining > 0:
+        m = min(chunk, remaining)
+        if m < 30 and remaining >= 30:
+            m = 30
+        sizes.append(m)
+        remaining -= m
+    return sizes
+
+
+def _build_classes(grid: SlotGrid, flexible: List[Task], scores, day: date) -> List[_ChunkClass]:
+    """
+    Split flexible tasks into chunks and group them into classes. A chunk's value at
+    start slot i is weight * minutes + the sum of its effort scores over its k slots,
+    so a 20-minute chunk counts for 20 minutes, not for the two slots it rounds up to.
+    """
+    prefix = {}
+    for eff, vec in scores.items():
+        acc = [0.0]
+        for v in vec:
+            acc.append(acc[-1] + float(v))
+        prefix[eff] = acc
+
+    def task_key(t: Task):
+        eff_rank = {"high": 0, "medium": 1, "low": 2}.get((t.effort or "medium").lower(), 1)
+        return (t.deadline or datetime.max, eff_rank)
+
+    classes: Dict[tuple, _ChunkClass] = {}
+    for t in sorted(flexible, key=task_key):
+        eff = (t.effort or "medium").lower()
+        if eff not in prefix:
+            eff = "medium"
+        acc = prefix[eff]
+        due_today = t.deadline is not None and t.deadline.date() == day
+        weight = W_PLACE + (W_DEADLINE if due_today else 0.0)
+        for minutes in _chunk_sizes(t.est_minutes, _chunk_minutes_for_effort(t.effort)):
+            k = grid.slots_for(minutes)
+            last = grid.n - k
+            if due_today:
+                last = min(last, grid.index_floor(t.deadline - timedelta(minutes=minutes)))
+            sig = (eff, weight, minutes, last)
+            cls = classes.get(sig)
+            if cls is None:
+                values = [weight * minutes + acc[i + k] - acc[i] for i in range(max(0, last + 1))]
+                cls = classes[sig] = _ChunkClass(k, minutes, last, values)
+            cls.members.append(_Chunk(t.title, minutes, k, sig))
+    return list(classes.values())
+
+
+def _search(grid: SlotGrid, classes: List[_ChunkClass], budget_s: float) -> Tuple[Optional[List[Tuple[int, int]]], int]:
+    """
+    Exact DP over slot indices, scanning left to right. State = (slot i, chunks still
+    unplaced per class); at each free slot either leave it empty or start one chunk of
+    any class that fits there. Interchangeable chunks collapse into counts, so the state
+    space stays small; counts are clamped to what the remaining free slots can hold.
+    Returns ([(start slot, class idx)], states) or (None, states)
+    when the time budget runs out.
+    """
+    n = grid.n
+    free = grid.free
+    starts_by_k = {c.k: grid.run_starts(c.k) for c in classes}
+    fits = [
+        [bool((starts_by_k[c.k] >> i) & 1) and i <= c.last for i in range(n)]
+        for c in classes
+    ]
+    free_after = [0] * (n + 1)
+    next_free = [n] * (n + 1)
+    for i in range(n - 1, -1, -1):
+        is_free = (free >> i) & 1
+        free_after[i] = free_after[i + 1] + is_free
+        next_free[i] = i if is_free else next_free[i + 1]
+    ks = [c.k for c in classes]
+    max_need = max((len(c.members) * c.k for c in classes), default=0)
+    deadline = _time.perf_counter() + budget_s
+    memo: Dict[tuple, Tuple[float, int]] = {}
+    states = 0
+
+    def clamp(i: int, counts: tuple) -> tuple:
+        # no class can place more chunks than the free slots left can hold
+        cap = free_after[i]
+        if cap >= max_need:
+            return counts
+        return tuple(min(c, cap // k) for c, k in zip(counts, ks))
+
+    def best(i: int, counts: tuple) -> float:
+        nonlocal states
+        i = next_free[min(i, n)]
+        if i >= n:
+            return 0.0
+        key = (i, counts)
+        hit = memo.get(key)
+        if hit is not None:
+            return hit[0]
+        clamped = clamp(i, counts)
+        ckey = (i, clamped)
+        hit = memo.get(ckey)
+        if hit is not None:
+            memo[key] = hit
+            return hit[0]
+        if not any(clamped):
+            return 0.0
+        states += 1
+        if states & 1023 == 0 and _time.perf_counter() > deadline:
+            raise _BudgetExceeded()
+
+        top, pick = best(i + 1, clamped), -1
+        for c, cls in enumerate(classes):
+            if clamped[c] and fits[c][i]:
+                nxt = clamped[:c] + (clamped[c] - 1,) + clamped[c + 1:]
+                v = cls.values[i] + best(i + cls.k, nxt)
+                if v > top + 1e-9:
+                    top, pick = v, c
+        memo[key] = memo[ckey] = (top, pick)
+        return top
+
+    counts = tuple(len(c.members) for c in classes)
+    try:
+        best(0, counts)
+    except _BudgetExceeded:
+        return None, states
+
+    placements: List[Tuple[int, int]] = []
+    i = 0
+    while True:
+        i = next_free[min(i, n)]
+        hit = memo.get((i, counts)) if i < n else None
+        if hit is None:
+            break
+        pick = hit[1]
+        counts = clamp(i, counts)
+        if pick < 0:
+            i += 1
+            continue
+        placements.append((i, pick))
+        counts = counts[:pick] + (counts[pick] - 1,) + counts[pick + 1:]
+        i += classes[pick].k
+    return placements, states
+
+
+def optimal_schedule(
+    tasks: List[Task],
+    day: date,
+    *,
+    energy_curve: Optional[List[Tuple[datetime, float]]] = None,
+    busy: Optional[Busy] = None,
+    work_start_h: int = 9,
+    work_end_h: int = 18,
+    step_min: int = 15,
+    time_budget_s: float = 0.25,
+    use_llm: Optional[bool] = None,
+) -> Tuple[DayPlan, SolverReport]:
+    """
+    Bounded-optimal packer run alongside the greedy one:
+      • same fixed reservations, chunk sizes and effort scores as greedy,
+      • objective: deadline work first, then placed minutes, then energy fit,
+      • exact DP over slot indices within `time_budget_s`, otherwise falls back to greedy.
+    Returns the chosen plan and a report with both plans' energy alignment.
+    """
+    curve = energy_curve or mock_energy_curve(day)
+
+    greedy_plan = greedy_schedule(
+        [t.model_copy() for t in tasks], day,
+        energy_curve=curve, busy=busy,
+        work_start_h=work_start_h, work_end_h=work_end_h, step_min=step_min,
+        use_llm=use_llm, packed=True,
+    )
+    greedy_align = metrics_for(greedy_plan, curve).energy_alignment
+
+    t0 = _time.perf_counter()
+    grid, _orders, plan, flexible = _prepare_day(
+        [t.model_copy() for t in tasks], day,
+        energy_curve=curve, busy=busy,
+        work_start_h=work_start_h, work_end_h=work_end_h, step_min=step_min,
+    )
+    scores = _effort_scores(grid, _energy_by_index(grid, curve), work_start_h)
+    classes = _build_classes(grid, flexible, scores, day)
+    with telemetry.span("solve"):
+        placements, states = _search(grid, classes, time_budget_s)
+    elapsed_ms = round((_time.perf_counter() - t0) * 1000, 2)
+
+    optimal_align: Optional[float] = None
+    if placements is not None:
+        taken = [0] * len(classes)
+        for i, c in placements:
+            chunk = classes[c].members[taken[c]]
+            taken[c] += 1
+            start = grid.time_of(i)
+            plan.add(chunk.title, start, start + timedelta(minutes=chunk.minutes))
+        plan.merge_adjacent()
+        optimal_align = metrics_for(plan, curve).energy_alignment
+
+    completed = placements is not None
+    chosen = (plan if completed else greedy_plan).to_day_plan()
+    report = SolverReport(
+        solver="optimal" if completed else "greedy",
+        completed=completed,
+        greedy_alignment=greedy_align,
+        optimal_alignment=optimal_align,
+        elapsed_ms=elapsed_ms,
+        states=states,
+    )
+    return chosen, report
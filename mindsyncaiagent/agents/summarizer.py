@@ -2,20 +2,21 @@
 from __future__ import annotations
 
 import os
-from datetime import datetime, timedelta
-from typing import List, Optional, Tuple, Dict
+from datetime import datetime
+from typing import List, Optional, Tuple
 
 from dotenv import load_dotenv
 from pydantic import BaseModel, Field, ValidationError
 
-from core.models import DayPlan, DailySummary, Block
+from core.models import DailySummary
+from core.plan import AnyPlan, PackedPlan, as_packed
+from core.metrics import metrics_for
+from core.llm import get_llm, call_llm
 
 
 try:
-    from langchain_google_genai import ChatGoogleGenerativeAI
     from langchain_core.prompts import ChatPromptTemplate
 except Exception:
-    ChatGoogleGenerativeAI = None  
     ChatPromptTemplate = None     
 
 load_dotenv()
@@ -23,43 +24,7 @@ LLM_MODEL = os.getenv("LC_MODEL", "gemini-2.5-flash")
 
 
 
-def _minutes(b: Block) -> int:
-    return int((b.end - b.start).total_seconds() // 60)
-
-
-def _energy_alignment(plan: DayPlan, curve: Optional[Dict[datetime, float]] = None) -> float:
-    """
-    Compute the fraction of scheduled minutes that land in 'high energy' slots (>= 0.75).
-    If a curve dict is not provided, treat all slots as neutral (alignment=0.0 when no blocks).
-    """
-    if not plan.blocks:
-        return 0.0
-    if curve is None:
-        total = sum(_minutes(b) for b in plan.blocks)
-        return 0.0 if total == 0 else 0.0
-
-    hi_thresh = 0.75
-    hi = 0
-    total = 0
-    for b in plan.blocks:
-        t = b.start.replace(second=0, microsecond=0)
-        while t < b.end:
-            total += 15
-            if curve.get(t, 0.0) >= hi_thresh:
-                hi += 15
-            t += timedelta(minutes=15)
-    return 0.0 if total == 0 else round(hi / total, 2)
-
-
-def _flow_minutes(plan: DayPlan) -> int:
-    """
-    'Flow' is the sum of minutes in blocks that are >= 45 minutes, favoring deep work.
-    (Simple, explainable metric for v1.)
-    """
-    return sum(_minutes(b) for b in plan.blocks if _minutes(b) >= 45)
-
-
-def _baseline_suggestions(energy_alignment: float, plan: DayPlan) -> List[str]:
+def _baseline_suggestions(energy_alignment: float, plan: PackedPlan) -> List[str]:
     """
     Deterministic suggestions you always have as a fallback.
     Keep concise, actionable, and stable so diffing is trivial.
@@ -73,12 +38,12 @@ def _baseline_suggestions(energy_alignment: float, plan: DayPlan) -> List[str]:
         suggestions.append("Protect one 60–90 minute block in your peak window; move admin out of it.")
 
 
-    short_blocks = [b for b in plan.blocks if _minutes(b) < 30]
+    short_blocks = [m for m in plan.minutes() if m < 30]
     if len(short_blocks) >= 2:
         suggestions.append("Use 30–45 minute focus blocks with 10-minute buffers; group tiny items.")
 
     
-    if any(b.end.hour >= 17 for b in plan.blocks):
+    if any(e % (24 * 60) >= 17 * 60 for e in plan.ends):
         suggestions.append("Trim late-day work; reserve the last 15 minutes for shutdown and tomorrow’s setup.")
 
 
@@ -99,19 +64,14 @@ if ChatPromptTemplate is not None:
 
 
 def _get_llm():
-    key = os.getenv("GOOGLE_API_KEY")
-    if not key or ChatGoogleGenerativeAI is None:
-        return None
-    try:
-        return ChatGoogleGenerativeAI(model=LLM_MODEL, temperature=0, google_api_key=key)
-    except Exception:
-        return None
+    return get_llm(LLM_MODEL, temperature=0)
 
 
-def _blocks_table(plan: DayPlan) -> str:
+def _blocks_table(plan: PackedPlan) -> str:
     lines = []
-    for b in plan.blocks:
-        lines.append(f"- {b.start.strftime('%H:%M')}-{b.end.strftime('%H:%M')} | {b.task_title} | { _minutes(b)}m")
+    for title, start, end in plan.blocks():
+        minutes = int((end - start).total_seconds() // 60)
+        lines.append(f"- {start.strftime('%H:%M')}-{end.strftime('%H:%M')} | {title} | {minutes}m")
     return "\n".join(lines) if lines else "- (no blocks)"
 
 
@@ -123,7 +83,7 @@ def _llm_suggestions(
     work_end_h: int,
     energy_alignment: float,
     flow_minutes: int,
-    plan: DayPlan,
+    plan: PackedPlan,
 ) -> Optional[List[str]]:
     """Ask the LLM to rewrite/augment suggestions; fail-soft to None."""
     llm = _get_llm()
@@ -132,7 +92,7 @@ def _llm_suggestions(
 
     chain = _LLM_SUMMARY_PROMPT | llm.with_structured_output(Advice)
     try:
-        advice: Advice = chain.invoke({
+        inputs = {
             "date": date_str,
             "profile": profile or "-",
             "work_start_h": work_start_h,
@@ -140,7 +100,8 @@ def _llm_suggestions(
             "energy_alignment": energy_alignment,
             "flow_minutes": flow_minutes,
             "blocks_table": _blocks_table(plan),
-        })
+        }
+        advice: Advice = call_llm("summarizer", lambda: chain.invoke(inputs))
         # sanitize: keep up to 3 short suggestions, strip blanks
         out = [s.strip() for s in (advice.suggestions or []) if s.strip()]
         if len(out) > 3:
@@ -154,7 +115,7 @@ def _llm_suggestions(
 
 
 def summarize(
-    plan: DayPlan,
+    plan: AnyPlan,
     *,
     completed_titles: Optional[List[str]] = None,
     profile: Optional[str] = None,
@@ -163,34 +124,24 @@ def summarize(
     energy_curve: Optional[List[Tuple[datetime, float]]] = None,
 ) -> DailySummary:
     """
-    Compute deterministic metrics (completion_rate, energy_alignment, flow_minutes) and
+    Compute deterministic metrics (completion_rate, energy_alignment, flow_minutes,
+    fragmentation; see core.metrics) and
     produce suggestions. If an LLM is available, rewrite the suggestions to be sharper
     and context-specific; otherwise fallback to deterministic tips.
+    `plan` may be a DayPlan or the scheduler's PackedPlan (read as-is, no conversion).
     """
-    completed_titles = completed_titles or []
-
-   
-    planned_titles = [b.task_title for b in plan.blocks]
-    planned_unique = set(planned_titles)
-    done = len([t for t in planned_unique if t in set(completed_titles)])
-    total = len(planned_unique) if planned_unique else 1
-    completion_rate = round(done / total, 2)
-
-    
-    curve_dict = None
-    if energy_curve:
-        curve_dict = {t: e for t, e in energy_curve}
-    energy_align = _energy_alignment(plan, curve=curve_dict)
-
-    
-    flow = _flow_minutes(plan)
+    plan = as_packed(plan)
+    metrics = metrics_for(plan, energy_curve or None, completed_titles or [])
+    completion_rate = metrics.completion_rate
+    energy_align = metrics.energy_alignment
+    flow = metrics.flow_minutes
 
 
     suggestions = _baseline_suggestions(energy_align, plan)
 
 
     llm_out = _llm_suggestions(
-        date_str=plan.date.isoformat(),
+        date_str=plan.day.isoformat(),
         profile=profile,
         work_start_h=work_start_h,
         work_end_h=work_end_h,
@@ -202,9 +153,10 @@ def summarize(
         suggestions = llm_out
 
     return DailySummary(
-        date=plan.date,
+        date=plan.day,
         completion_rate=completion_rate,
         energy_alignment=energy_align,
         flow_minutes=flow,
+        fragmentation=metrics.fragmentation,
         suggestions=suggestions,
     )
@@ -1,26 +1,47 @@
 
 from __future__ import annotations
 
+import asyncio
+import json
+import logging
 import os
-from datetime import date, datetime
-from typing import List, Optional, Literal
+from datetime import date, datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Literal
 
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse, PlainTextResponse
+from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel, Field, ValidationError
 
 load_dotenv()
 
 
-from agents.parser import parse_task
-from agents.classifier import classify_effort
-from agents.scheduler import greedy_schedule
+from agents.parser import aparse_task, aparse_tasks
+from agents.classifier import aclassify_effort
+from agents.scheduler import agreedy_schedule, plan_horizon, replan
+from agents.solver import optimal_schedule
+from agents.batch import plan_job, batch_executor
 from agents.summarizer import summarize
-from core.models import Task, DayPlan, DailySummary
+from core.models import (
+    Task, DayPlan, DailySummary, HorizonPlan, SolverReport, PlanDelta, PlanJob, PlanResult,
+    CompletionRecord, BusyInterval,
+)
+from core.calendar import BusyCalendar
+from core.plan import PackedPlan
+from core.history import history_store
 from core.energy import energy_curve_for
+from core.profiles import fit_user_profile, profile_store, unpack_values, user_energy_curve
 from core.quiz import infer_profile
+from core.config import PLAN_CONCURRENCY
+from core import telemetry
+from core.llm import llm_budget
+from graph.plan_graph import astream_many
+
 
+log = logging.getLogger("mindsync.api")
 
 app = FastAPI(
     title="MindSync Planner API",
@@ -42,6 +63,16 @@ app.add_middleware(
 )
 
 
+@app.middleware("http")
+async def bound_llm_time(request: Request, call_next):
+    """
+    Every request shares one LLM time budget (LLM_REQUEST_BUDGET_S) across all agents;
+    /plan/batch starts a fresh one per user instead.
+    """
+    with llm_budget():
+        return await call_next(request)
+
+
 EnergyProfile = Literal["morning_lark", "balanced", "night_owl"]
 
 class PlanRequest(BaseModel):
@@ -50,11 +81,54 @@ class PlanRequest(BaseModel):
     profile: Optional[EnergyProfile] = Field("balanced", description="Energy profile to bias scheduling")
     work_start_h: Optional[int] = Field(9, ge=0, le=23)
     work_end_h: Optional[int] = Field(18, ge=0, le=23)
+    mode: Literal["greedy", "optimal"] = Field("greedy", description="'optimal' runs the exact solver next to greedy")
+    time_budget_ms: int = Field(250, ge=1, le=5000, description="Solver budget before falling back to greedy")
+    user_id: Optional[str] = Field(None, description="Use this user's learned energy curve when one is stored")
+    busy: List[BusyInterval] = Field(default_factory=list, description="Busy time; entries with `rrule` recur (expanded only over the planned days)")
+    busy_ics: Optional[str] = Field(None, description="iCalendar export (BEGIN:VCALENDAR...) whose busy events are added to `busy`")
 
 class PlanResponse(BaseModel):
     plan: DayPlan
     summary: DailySummary
     profile: EnergyProfile
+    solver: Optional[SolverReport] = None
+    timings: Optional[Dict[str, Dict[str, float]]] = Field(None, description="Per-stage ms and counters (with ?timings=true)")
+
+class HorizonRequest(PlanRequest):
+    days: int = Field(7, ge=1, le=31, description="Number of consecutive days to plan, starting at `day`")
+
+class HorizonResponse(BaseModel):
+    horizon: HorizonPlan
+    summaries: List[DailySummary]
+    profile: EnergyProfile
+
+class ReplanRequest(BaseModel):
+    plan: DayPlan
+    tasks: List[Task] = Field(..., description="Tasks the plan was built from (as returned by /parse or /plan)")
+    delta: PlanDelta = Field(default_factory=PlanDelta)
+    add_lines: List[str] = Field(default_factory=list, description="Raw task lines to parse, classify and add")
+    profile: Optional[EnergyProfile] = Field("balanced", description="Energy profile to bias scheduling")
+    work_start_h: Optional[int] = Field(9, ge=0, le=23)
+    work_end_h: Optional[int] = Field(18, ge=0, le=23)
+    user_id: Optional[str] = Field(None, description="Use this user's learned energy curve when one is stored")
+    busy: List[BusyInterval] = Field(default_factory=list, description="Busy time the plan was built against; entries with `rrule` recur")
+    busy_ics: Optional[str] = Field(None, description="iCalendar export (BEGIN:VCALENDAR...) whose busy events are added to `busy`")
+
+class PlanStreamRequest(BaseModel):
+    tasks: List[str] = Field(..., description="Task lines like 'Finish report; ~2h; due Fri 5pm'")
+    day: Optional[str] = Field(None, description="YYYY-MM-DD (defaults to today)")
+    profile: Optional[EnergyProfile] = Field("balanced", description="Energy profile to bias scheduling")
+
+class BatchUserPlan(BaseModel):
+    user_id: str
+    tasks: List[str] = Field(..., description="Task lines like 'Finish report; ~2h; due Fri 5pm'")
+    day: Optional[str] = Field(None, description="YYYY-MM-DD (defaults to today)")
+    profile: Optional[EnergyProfile] = Field("balanced", description="Energy profile to bias scheduling")
+    work_start_h: Optional[int] = Field(9, ge=0, le=23)
+    work_end_h: Optional[int] = Field(18, ge=0, le=23)
+
+class BatchPlanRequest(BaseModel):
+    users: List[BatchUserPlan] = Field(..., description="One planning payload per user")
 
 class ParseRequest(BaseModel):
     text: str
@@ -80,52 +154,213 @@ class QuizResult(BaseModel):
     confidence: float
     rationale: str
 
+class ProfileFitRequest(BaseModel):
+    user_id: str
+    answers: QuizAnswers
+    history: List[CompletionRecord] = Field(default_factory=list, description="Past blocks and whether they were completed")
+
+class ProfileFitResponse(BaseModel):
+    user_id: str
+    profile: EnergyProfile
+    confidence: float
+    points: List[float] = Field(..., description="Fitted energy, 96 x 15-min points from 06:00")
+
+class CompletionsRequest(BaseModel):
+    user_id: str
+    day: Optional[str] = Field(None, description="YYYY-MM-DD (defaults to today)")
+    titles: List[str] = Field(..., description="Titles of tasks finished that day")
+
+class HistoryAggregate(BaseModel):
+    period_start: date
+    days: int = Field(..., description="Stored plans in the period")
+    completion_rate: float
+    energy_alignment: float
+    flow_minutes: int
+    avg_flow_minutes: float
+    fragmentation: float
+
+class HistoryResponse(BaseModel):
+    user_id: str
+    period: Literal["week", "month"]
+    start: date
+    end: date
+    aggregates: List[HistoryAggregate]
+
 class PlanwithQuizRequest(QuizAnswers):
     tasks: List[str] = Field(..., description="Raw task lines like 'Finish report; ~2h; due Fri 5pm'")
     day: Optional[str] = Field(None, description="YYYY-MM-DD (defaults to today)")
     work_start_h: Optional[int] = Field(9, ge=0, le=23)
     work_end_h: Optional[int] = Field(18, ge=0, le=23)
-    
+    user_id: Optional[str] = Field(None, description="Store the plan in this user's history and count their completions")
+
+async def _aparse_and_classify(lines: List[str], gate: Optional[asyncio.Semaphore] = None) -> List[Task]:
+    """
+    Batch-parse the lines, then classify every task concurrently (bounded by
+    PLAN_CONCURRENCY, or by a `gate` shared with other concurrent callers).
+    """
+    sem = gate or asyncio.Semaphore(PLAN_CONCURRENCY)
+    with telemetry.span("parse"):
+        parsed = await aparse_tasks(lines, concurrency=PLAN_CONCURRENCY, gate=sem)
+
+    async def one(t: Task) -> Task:
+        async with sem:
+            return await aclassify_effort(t)
+
+    with telemetry.span("classify"):
+        return list(await asyncio.gather(*(one(t) for t in parsed)))
+
+async def _with_timings(run: Callable[[], Awaitable[Dict[str, Any]]], timings: bool) -> Dict[str, Any]:
+    """Run an endpoint body; with `timings`, attach its per-request trace to the response."""
+    if not timings:
+        return await run()
+    with telemetry.collect() as trace:
+        with telemetry.span("request"):
+            out = await run()
+    out["timings"] = trace.as_dict() if trace is not None else None
+    return out
+
+def _busy_calendar(busy: List[BusyInterval], ics: Optional[str] = None) -> Optional[BusyCalendar]:
+    """
+    Request busy time (intervals plus an optional .ics export) as a calendar; None
+    when both are empty, so the schedulers keep their default.
+    """
+    if not busy and not ics:
+        return None
+    if ics and "BEGIN:VCALENDAR" not in ics:
+        # from_ics also reads paths; request text must never be taken for one
+        raise HTTPException(status_code=400, detail="busy_ics must be iCalendar text (BEGIN:VCALENDAR)")
+    try:
+        cal = BusyCalendar.from_ics(ics) if ics else BusyCalendar()
+        return cal.extend(busy)
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"invalid busy interval: {e}")
+
+def _completed(user_id: Optional[str], day: date) -> List[str]:
+    """Titles the user reported done on `day` (feeds the summary's completion rate); [] if history is down."""
+    if not user_id:
+        return []
+    try:
+        return history_store().completed_titles(user_id, day)
+    except Exception:
+        telemetry.count("history_errors", op="read")
+        log.exception("history read failed for user %s", user_id)
+        return []
+
+def _save_history(user_id: Optional[str], plans: List[Any], summaries: List[DailySummary], profile: Optional[str]) -> None:
+    """Store finished plans; a history failure is logged and counted, never a failed plan."""
+    if not user_id:
+        return
+    try:
+        store = history_store()
+        for plan, summary in zip(plans, summaries):
+            store.save_plan(user_id, plan, summary, profile)
+    except Exception:
+        telemetry.count("history_errors", op="write")
+        log.exception("history write failed for user %s", user_id)
+
+def _curve_for(day: date, profile: EnergyProfile, user_id: Optional[str] = None):
+    """The user's learned curve when one is stored, else the preset for `profile`."""
+    if user_id:
+        curve = user_energy_curve(user_id, day)
+        if curve is not None:
+            return curve
+    return energy_curve_for(day, profile)
+
 @app.get("/health")
 def health():
     return {"ok": True, "time": datetime.utcnow().isoformat() + "Z"}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Stage timings, LLM calls, cache hit/miss and packer counters (Prometheus text format)."""
+    return PlainTextResponse(telemetry.render_prometheus(), media_type="text/plain; version=0.0.4")
+
 @app.post("/profile/quiz", response_model=QuizResult)
 def profile_quiz(answers: QuizAnswers):
     profile, conf, why = infer_profile(answers.model_dump())
     return {"profile": profile, "confidence": conf, "rationale": why}
 
+@app.post("/profile/fit", response_model=ProfileFitResponse)
+def profile_fit(body: ProfileFitRequest):
+    """Fit and store a per-user energy curve from quiz answers plus completion history."""
+    answers = body.answers.model_dump()
+    profile, conf, _why = infer_profile(answers)
+    blob = fit_user_profile(body.user_id, answers, body.history)
+    return {
+        "user_id": body.user_id,
+        "profile": profile,
+        "confidence": conf,
+        "points": list(unpack_values(blob)),
+    }
+
+@app.post("/history/completions")
+def history_completions(body: CompletionsRequest):
+    """Record finished tasks; later summaries and aggregates for that day count them."""
+    try:
+        day = date.fromisoformat(body.day) if body.day else date.today()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="day must be YYYY-MM-DD")
+    return {"recorded": history_store().record_completions(body.user_id, day, body.titles)}
+
+@app.get("/history/{user_id}/weekly", response_model=HistoryResponse)
+def history_weekly(
+    user_id: str,
+    start: Optional[date] = Query(None, description="First day (defaults to 12 weeks before `end`)"),
+    end: Optional[date] = Query(None, description="Last day (defaults to today)"),
+):
+    """Per-week (Monday start) completion rate, energy alignment and flow minutes from stored plans."""
+    end = end or date.today()
+    return _history(user_id, "week", start or end - timedelta(weeks=12), end)
+
+@app.get("/history/{user_id}/monthly", response_model=HistoryResponse)
+def history_monthly(
+    user_id: str,
+    start: Optional[date] = Query(None, description="First day (defaults to a year before `end`)"),
+    end: Optional[date] = Query(None, description="Last day (defaults to today)"),
+):
+    """Per-calendar-month completion rate, energy alignment and flow minutes from stored plans."""
+    end = end or date.today()
+    return _history(user_id, "month", start or end - timedelta(days=365), end)
+
+def _history(user_id: str, period: Literal["week", "month"], start: date, end: date) -> Dict[str, Any]:
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    rows = history_store().aggregates(user_id, period, start, end)
+    return {"user_id": user_id, "period": period, "start": start, "end": end, "aggregates": rows}
+
 @app.post("/parse", response_model=ParseResponse)
-def parse_endpoint(body: ParseRequest):
+async def parse_endpoint(body: ParseRequest):
     try:
-        t = parse_task(body.text)
+        t = await aparse_task(body.text)
         return {"task": t}
     except Exception as e:
         raise HTTPException(status_code=422, detail=f"parse error: {e}")
 
 @app.post("/classify", response_model=ParseResponse)
-def classify_endpoint(body: ClassifyRequest):
+async def classify_endpoint(body: ClassifyRequest):
     try:
         t = Task(title=body.title, est_minutes=body.est_minutes or 30, notes=body.notes)
-        t = classify_effort(t)
+        t = await aclassify_effort(t)
         return {"task": t}
     except Exception as e:
         raise HTTPException(status_code=422, detail=f"classify error: {e}")
 
 @app.post("/plan", response_model=PlanResponse)
-def plan_endpoint(body: PlanRequest):
+async def plan_endpoint(body: PlanRequest, timings: bool = Query(False, description="Attach per-stage timings")):
     """
     End-to-end:
       1) parse + classify tasks
       2) build energy curve for requested day/profile
       3) schedule within work hours + summarize
     """
+    return await _with_timings(lambda: _plan(body), timings)
+
+async def _plan(body: PlanRequest) -> Dict[str, Any]:
     profile = getattr(body, "profile", "None")  # type: ignore
     try:
         if not body.tasks:
             raise HTTPException(status_code=400, detail="tasks[] cannot be empty")
 
-        
         plan_day = date.today()
         if body.day:
             try:
@@ -133,40 +368,163 @@ def plan_endpoint(body: PlanRequest):
             except ValueError:
                 raise HTTPException(status_code=400, detail="day must be YYYY-MM-DD")
 
-       
-        parsed: List[Task] = []
-        for line in body.tasks:
-            t = parse_task(line)
-            t = classify_effort(t)
-            parsed.append(t)
+        busy = _busy_calendar(body.busy, body.busy_ics)
+        parsed: List[Task] = await _aparse_and_classify(body.tasks)
 
-        profile: EnergyProfile = (body.profile or "balanced")  
-        
+        profile: EnergyProfile = (body.profile or "balanced")
         try:
-            curve = energy_curve_for(plan_day, profile)
+            curve = _curve_for(plan_day, profile, body.user_id)
         except Exception:
             from agents.scheduler import mock_energy_curve
             curve = mock_energy_curve(plan_day)
 
-        
-        day_plan = greedy_schedule(
-            parsed,
-            plan_day,
-            energy_curve=curve,
-            work_start_h=body.work_start_h or 9,
-            work_end_h=body.work_end_h or 18,
-            use_llm=True
-        )
+        solver_report: Optional[SolverReport] = None
+        with telemetry.span("schedule"):
+            if body.mode == "optimal":
+                day_plan, solver_report = await run_in_threadpool(
+                    optimal_schedule,
+                    parsed,
+                    plan_day,
+                    energy_curve=curve,
+                    busy=busy,
+                    work_start_h=body.work_start_h or 9,
+                    work_end_h=body.work_end_h or 18,
+                    time_budget_s=body.time_budget_ms / 1000.0,
+                    use_llm=False,  # the greedy baseline it compares against never waits on advice
+                )
+            else:
+                day_plan = await agreedy_schedule(
+                    parsed,
+                    plan_day,
+                    energy_curve=curve,
+                    busy=busy,
+                    work_start_h=body.work_start_h or 9,
+                    work_end_h=body.work_end_h or 18,
+                    use_llm=None,  # SCHEDULER_USE_LLM decides
+                    packed=True,
+                )
+
+        completed = await run_in_threadpool(_completed, body.user_id, plan_day)
+        with telemetry.span("summarize"):
+            daily_summary = await run_in_threadpool(
+                summarize,
+                day_plan,
+                completed_titles=completed,
+                profile = profile,
+                work_start_h=body.work_start_h or 9 if hasattr(body, "work_start_h") else 9,
+                work_end_h=body.work_end_h or 18 if hasattr(body, "work_end_h") else 18,
+                energy_curve=curve,
+                )
+        await run_in_threadpool(_save_history, body.user_id, [day_plan], [daily_summary], profile)
+        if isinstance(day_plan, PackedPlan):
+            day_plan = day_plan.to_day_plan()
+        return {"plan": day_plan, "summary": daily_summary, "profile": profile, "solver": solver_report}
+    except HTTPException:
+        raise
+    except ValidationError as ve:
+        raise HTTPException(status_code=422, detail=str(ve))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"planning error: {e}")
+@app.post("/plan/horizon", response_model=HorizonResponse)
+async def plan_horizon_endpoint(body: HorizonRequest):
+    """
+    Multi-day planning: parse + classify once, then spread the tasks over
+    `days` consecutive days (respecting deadlines) and summarize each day.
+    """
+    try:
+        if not body.tasks:
+            raise HTTPException(status_code=400, detail="tasks[] cannot be empty")
 
-       
-        daily_summary = summarize(
-            day_plan, 
-            completed_titles=[],
-            profile = profile,
-            work_start_h=body.work_start_h or 9 if hasattr(body, "work_start_h") else 9,
-            work_end_h=body.work_end_h or 18 if hasattr(body, "work_end_h") else 18,
-            energy_curve=curve,
+        start_day = date.today()
+        if body.day:
+            try:
+                start_day = date.fromisoformat(body.day)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="day must be YYYY-MM-DD")
+
+        busy = _busy_calendar(body.busy, body.busy_ics)
+        parsed: List[Task] = await _aparse_and_classify(body.tasks)
+
+        profile: EnergyProfile = (body.profile or "balanced")
+        work_start_h = body.work_start_h or 9
+        work_end_h = body.work_end_h or 18
+
+        with telemetry.span("schedule"):
+            horizon = await run_in_threadpool(
+                plan_horizon,
+                parsed,
+                start_day,
+                days=body.days,
+                energy_curve=_curve_for(start_day, profile, body.user_id),
+                busy=busy,
+                work_start_h=work_start_h,
+                work_end_h=work_end_h,
+                use_llm=None,  # SCHEDULER_USE_LLM decides
+            )
+
+        def summaries_for_days() -> List[DailySummary]:
+            return [
+                summarize(
+                    day_plan,
+                    completed_titles=_completed(body.user_id, day_plan.date),
+                    profile=profile,
+                    work_start_h=work_start_h,
+                    work_end_h=work_end_h,
+                    energy_curve=_curve_for(day_plan.date, profile, body.user_id),
+                )
+                for day_plan in horizon.days
+            ]
+
+        with telemetry.span("summarize"):
+            summaries = await run_in_threadpool(summaries_for_days)
+        await run_in_threadpool(_save_history, body.user_id, horizon.days, summaries, profile)
+        return {"horizon": horizon, "summaries": summaries, "profile": profile}
+    except HTTPException:
+        raise
+    except ValidationError as ve:
+        raise HTTPException(status_code=422, detail=str(ve))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"planning error: {e}")
+
+@app.post("/plan/replan", response_model=PlanResponse)
+async def replan_endpoint(body: ReplanRequest):
+    """
+    Incremental re-plan: apply a delta (tasks added/removed, estimates changed,
+    new busy time) to an existing plan, repairing only the affected blocks.
+    """
+    try:
+        delta = body.delta.model_copy(deep=True)
+        if body.add_lines:
+            delta.add.extend(await _aparse_and_classify(body.add_lines))
+
+        profile: EnergyProfile = (body.profile or "balanced")
+        curve = _curve_for(body.plan.date, profile, body.user_id)
+        work_start_h = body.work_start_h or 9
+        work_end_h = body.work_end_h or 18
+
+        with telemetry.span("schedule"):
+            day_plan = await run_in_threadpool(
+                replan,
+                body.plan,
+                body.tasks,
+                delta,
+                energy_curve=curve,
+                busy=_busy_calendar(body.busy, body.busy_ics),
+                work_start_h=work_start_h,
+                work_end_h=work_end_h,
+            )
+        completed = await run_in_threadpool(_completed, body.user_id, day_plan.date)
+        with telemetry.span("summarize"):
+            daily_summary = await run_in_threadpool(
+                summarize,
+                day_plan,
+                completed_titles=completed,
+                profile=profile,
+                work_start_h=work_start_h,
+                work_end_h=work_end_h,
+                energy_curve=curve,
             )
+        await run_in_threadpool(_save_history, body.user_id, [day_plan], [daily_summary], profile)
         return {"plan": day_plan, "summary": daily_summary, "profile": profile}
     except HTTPException:
         raise
@@ -174,17 +532,95 @@ def plan_endpoint(body: PlanRequest):
         raise HTTPException(status_code=422, detail=str(ve))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"planning error: {e}")
+
+@app.post("/plan/batch")
+async def plan_batch(body: BatchPlanRequest):
+    """
+    Many users in one call (e.g. nightly pre-computation). Each user's lines are
+    parsed + classified, then scheduled and summarized on the batch process pool.
+    Streams one NDJSON `PlanResult` line per user as soon as that user completes;
+    per-user failures come back as lines with `error` set.
+    """
+    if not body.users:
+        raise HTTPException(status_code=400, detail="users[] cannot be empty")
+
+    loop = asyncio.get_running_loop()
+    pool = batch_executor()
+    # one gate for the whole batch: PLAN_CONCURRENCY LLM calls in flight across all users
+    llm_gate = asyncio.Semaphore(PLAN_CONCURRENCY)
+
+    async def one(u: BatchUserPlan) -> PlanResult:
+        try:
+            plan_day = date.fromisoformat(u.day) if u.day else date.today()
+            # each user gets its own LLM budget; the request-wide one would be shared by all
+            with llm_budget(fresh=True):
+                parsed = await _aparse_and_classify(u.tasks, gate=llm_gate)
+            # SQLite-backed lookups stay off the event loop
+            energy = await run_in_threadpool(profile_store().get, u.user_id)
+            completed = await run_in_threadpool(_completed, u.user_id, plan_day)
+            job = PlanJob(
+                user_id=u.user_id,
+                tasks=parsed,
+                day=plan_day,
+                profile=u.profile or "balanced",
+                work_start_h=u.work_start_h or 9,
+                work_end_h=u.work_end_h or 18,
+                energy=energy,
+                completed=completed,
+            )
+            if pool is not None:
+                result = await loop.run_in_executor(pool, plan_job, job)
+            else:  # no process pool here: plan on the thread pool, off the event loop
+                result = await run_in_threadpool(plan_job, job)
+            if result.plan is not None and result.summary is not None:
+                await run_in_threadpool(_save_history, u.user_id, [result.plan], [result.summary], job.profile)
+            return result
+        except Exception as e:
+            return PlanResult(user_id=u.user_id, error=str(e))
+
+    async def stream():
+        for fut in asyncio.as_completed([one(u) for u in body.users]):
+            result = await fut
+            yield result.model_dump_json() + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+@app.post("/plan/stream")
+async def plan_stream(body: PlanStreamRequest):
+    """
+    Plan graph over all lines, streamed as NDJSON progress events so a UI can
+    render early: `parsed`/`classified` per task (with `index`), then `plan`
+    and `summary`. A failure mid-run ends the stream with an `error` event.
+    """
+    if not body.tasks:
+        raise HTTPException(status_code=400, detail="tasks[] cannot be empty")
+    try:
+        plan_day = date.fromisoformat(body.day) if body.day else date.today()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="day must be YYYY-MM-DD")
+
+    async def events():
+        try:
+            async for event in astream_many(body.tasks, day=plan_day, profile=body.profile or "balanced"):
+                yield json.dumps(jsonable_encoder(event)) + "\n"
+        except Exception as e:
+            yield json.dumps({"type": "error", "detail": str(e)}) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
 @app.post("/plan/with_quiz", response_model=PlanResponse)
-def plan_with_quiz(body: PlanwithQuizRequest):
+async def plan_with_quiz(body: PlanwithQuizRequest, timings: bool = Query(False, description="Attach per-stage timings")):
     """
     One-shot: (1) infer profile from quiz answers, (2) parse+classify tasks,
     (3) build energy curve, (4) schedule, (5) summarize.
     """
+    return await _with_timings(lambda: _plan_with_quiz(body), timings)
+
+async def _plan_with_quiz(body: PlanwithQuizRequest) -> Dict[str, Any]:
     try:
         if not body.tasks:
             raise HTTPException(status_code=400, detail="tasks[] cannot be empty")
 
-      
         quiz_only = QuizAnswers(
             wake_time=body.wake_time,
             peak_block_start=body.peak_block_start,
@@ -192,45 +628,43 @@ def plan_with_quiz(body: PlanwithQuizRequest):
             post_lunch_slump=body.post_lunch_slump,
             ideal_meeting_time=body.ideal_meeting_time,
         )
-        profile_str, conf, why = infer_profile(quiz_only.model_dump())  
-        profile: EnergyProfile = profile_str  
+        profile_str, conf, why = infer_profile(quiz_only.model_dump())
+        profile: EnergyProfile = profile_str
 
-       
         plan_day = date.today() if not body.day else date.fromisoformat(body.day)
 
-   
         try:
             curve = energy_curve_for(plan_day, profile)
         except Exception:
             from agents.scheduler import mock_energy_curve
             curve = mock_energy_curve(plan_day)
 
-    
-        parsed: List[Task] = []
-        for line in body.tasks:
-            t = parse_task(line)
-            t = classify_effort(t)
-            parsed.append(t)
-
-      
-        day_plan = greedy_schedule(
-            parsed,
-            plan_day,
-            energy_curve=curve,
-            work_start_h=body.work_start_h or 9,
-            work_end_h=body.work_end_h or 18,
-            use_llm=True,  
-        )
-        daily_summary = summarize(
-            day_plan,
-            completed_titles=[],
-            profile=profile,
-            work_start_h=body.work_start_h or 9,
-            work_end_h=body.work_end_h or 18,
-            energy_curve=curve,
-        )
+        parsed: List[Task] = await _aparse_and_classify(body.tasks)
+
+        with telemetry.span("schedule"):
+            day_plan = await agreedy_schedule(
+                parsed,
+                plan_day,
+                energy_curve=curve,
+                work_start_h=body.work_start_h or 9,
+                work_end_h=body.work_end_h or 18,
+                use_llm=None,  # SCHEDULER_USE_LLM decides
+                packed=True,
+            )
+        completed = await run_in_threadpool(_completed, body.user_id, plan_day)
+        with telemetry.span("summarize"):
+            daily_summary = await run_in_threadpool(
+                summarize,
+                day_plan,
+                completed_titles=completed,
+                profile=profile,
+                work_start_h=body.work_start_h or 9,
+                work_end_h=body.work_end_h or 18,
+                energy_curve=curve,
+            )
+        await run_in_threadpool(_save_history, body.user_id, [day_plan], [daily_summary], profile)
 
-        return {"plan": day_plan, "summary": daily_summary, "profile": profile}
+        return {"plan": day_plan.to_day_plan(), "summary": daily_summary, "profile": profile}
 
     except ValueError:
         raise HTTPException(status_code=400, detail="day must be YYYY-MM-DD")
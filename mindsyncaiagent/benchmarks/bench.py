@@ -0,0 +1,229 @@
+# benchmarks/bench.py
+"""
+Standalone benchmark runner for the planner hot paths (LLM always disabled).
+
+  python benchmarks/bench.py                          # run, print a table
+  python benchmarks/bench.py --save benchmarks/baseline.json
+  python benchmarks/bench.py --compare benchmarks/baseline.json --threshold 0.15
+
+Workloads are synthetic and seeded (same --seed → same tasks): 10..500 tasks with
+mixed efforts, deadlines, fixed windows, busy lists and energy profiles.
+Benchmarks: greedy_schedule, parse_task (deterministic path), summarize, plan_metrics
+over n plans, a week of busy lookups over n recurring rules that started years
+earlier, and a full /plan request through TestClient. `--compare` exits 1 when any benchmark's median
+is slower than the baseline by more than `--threshold`.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from datetime import date, datetime, time as dtime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+# benchmarks measure local work only; keep every agent on its deterministic path
+os.environ["GOOGLE_API_KEY"] = ""  # set (not unset) so load_dotenv cannot restore it
+os.environ.setdefault("TELEMETRY", "0")
+os.environ.setdefault("PARSE_CACHE_SIZE", "0")
+os.environ.setdefault("CLASSIFY_CACHE_SIZE", "0")
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.models import Task  # noqa: E402
+from core.energy import energy_curve_for  # noqa: E402
+from agents.parser import parse_task  # noqa: E402
+from agents.scheduler import greedy_schedule  # noqa: E402
+from agents.summarizer import summarize  # noqa: E402
+from core.metrics import plan_metrics  # noqa: E402
+from core.plan import PackedPlan  # noqa: E402
+from core.calendar import BusyCalendar  # noqa: E402
+
+DAY = date(2030, 1, 7)
+PROFILES = ("morning_lark", "balanced", "night_owl")
+SIZES = (10, 50, 100, 500)
+
+
+# --- workloads ---
+def _at(h: int, m: int = 0) -> datetime:
+    return datetime.combine(DAY, dtime(h, m))
+
+
+def make_tasks(n: int, rng: random.Random) -> List[Task]:
+    tasks: List[Task] = []
+    for i in range(n):
+        est = rng.choice((15, 30, 45, 60, 90, 120))
+        t = Task(title=f"task {i}", est_minutes=est, effort=rng.choice(("low", "medium", "high")))
+        r = rng.random()
+        if r < 0.2:
+            t.deadline = _at(rng.randint(10, 18), rng.choice((0, 30)))
+        elif r < 0.3:
+            t.fixed_start = _at(rng.randint(8, 17), rng.choice((0, 15, 30, 45)))
+            t.fixed_end = t.fixed_start + timedelta(minutes=est)
+        tasks.append(t)
+    return tasks
+
+
+def make_busy(rng: random.Random) -> List[Tuple[datetime, datetime]]:
+    busy = []
+    for _ in range(rng.randint(0, 4)):
+        s = _at(rng.randint(9, 17), rng.choice((0, 15, 30, 45)))
+        busy.append((s, s + timedelta(minutes=rng.choice((15, 30, 60)))))
+    return busy
+
+
+def make_rules(n: int, rng: random.Random) -> BusyCalendar:
+    """n recurring meetings whose series started up to ten years before DAY."""
+    rules = ("FREQ=DAILY", "FREQ=WEEKLY;BYDAY=MO,WE,FR", "FREQ=DAILY;INTERVAL=2", "FREQ=WEEKLY;INTERVAL=2")
+    cal = BusyCalendar()
+    for _ in range(n):
+        start = datetime.combine(DAY - timedelta(days=rng.randint(365, 3650)), dtime(rng.randint(8, 17), rng.choice((0, 30))))
+        cal.add_rule(rng.choice(rules), start, start + timedelta(minutes=rng.choice((15, 30, 60))))
+    return cal
+
+
+def make_lines(n: int, rng: random.Random) -> List[str]:
+    verbs = ("Write", "Review", "Email", "Call", "Design", "Plan", "Read", "Fix")
+    nouns = ("report", "PR", "client", "slides", "budget", "paper", "bug", "roadmap")
+    lines = []
+    for _ in range(n):
+        line = f"{rng.choice(verbs)} {rng.choice(nouns)}; {rng.choice(('15m', '30m', '1h', '2h'))}"
+        r = rng.random()
+        if r < 0.2:
+            line += f"; due today {rng.randint(1, 5)}pm"
+        elif r < 0.3:
+            h = rng.randint(9, 16)
+            line += f"; {h}:00-{h + 1}:00"
+        lines.append(line)
+    return lines
+
+
+# --- timing ---
+def measure(fn: Callable[[], object], repeat: int, warmup: int = 1) -> Dict[str, float]:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000.0)
+    samples.sort()
+    p95 = samples[min(len(samples) - 1, int(round(0.95 * (len(samples) - 1))))]
+    return {
+        "median_ms": round(statistics.median(samples), 4),
+        "p95_ms": round(p95, 4),
+        "min_ms": round(samples[0], 4),
+        "runs": repeat,
+    }
+
+
+def run_benchmarks(sizes=SIZES, repeat: int = 5, seed: int = 0, include_api: bool = True) -> Dict[str, Dict[str, float]]:
+    results: Dict[str, Dict[str, float]] = {}
+    for n in sizes:
+        rng = random.Random(f"{seed}:{n}")
+        tasks = make_tasks(n, rng)
+        busy = make_busy(rng)
+        profile = PROFILES[n % len(PROFILES)]
+        curve = energy_curve_for(DAY, profile)  # type: ignore[arg-type]
+        lines = make_lines(n, rng)
+
+        def schedule():
+            return greedy_schedule([t.model_copy() for t in tasks], DAY, energy_curve=curve,
+                                   busy=busy, use_llm=False)
+
+        plan = schedule()
+        results[f"greedy_schedule[{n}]"] = measure(schedule, repeat)
+        results[f"parse_task[{n}]"] = measure(lambda: [parse_task(s) for s in lines], repeat)
+        results[f"summarize[{n}]"] = measure(
+            lambda: summarize(plan, completed_titles=[], profile=profile, energy_curve=curve), repeat
+        )
+        # reporting: metrics for n plans in one pass
+        packed = PackedPlan.from_day_plan(plan)
+        results[f"plan_metrics[{n}]"] = measure(lambda: plan_metrics([packed] * n, [curve] * n), repeat)
+        rules = make_rules(n, rng)
+        results[f"busy_rules[{n}]"] = measure(lambda: [rules.on(DAY + timedelta(days=d)) for d in range(7)], repeat)
+        if include_api:
+            results[f"api_plan[{n}]"] = _measure_api(lines, profile, repeat)
+    return results
+
+
+def _measure_api(lines: List[str], profile: str, repeat: int) -> Dict[str, float]:
+    from fastapi.testclient import TestClient
+    from api import app
+
+    payload = {"tasks": lines, "day": DAY.isoformat(), "profile": profile}
+    with TestClient(app) as client:
+        def call():
+            r = client.post("/plan", json=payload)
+            r.raise_for_status()
+        return measure(call, repeat)
+
+
+# --- baselines ---
+def compare(current: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], threshold: float) -> List[str]:
+    """Names whose median regressed by more than `threshold` (fraction) vs the baseline."""
+    slower = []
+    for name, cur in current.items():
+        base = baseline.get(name)
+        if not base or base.get("median_ms", 0) <= 0:
+            continue
+        if cur["median_ms"] > base["median_ms"] * (1.0 + threshold):
+            slower.append(name)
+    return slower
+
+
+def _meta(seed: int, repeat: int) -> Dict[str, object]:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": seed,
+        "repeat": repeat,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", default=",".join(map(str, SIZES)), help="comma-separated task counts")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--no-api", action="store_true", help="skip the TestClient /plan benchmark")
+    ap.add_argument("--save", help="write results (with metadata) to this JSON file")
+    ap.add_argument("--compare", help="baseline JSON to compare against")
+    ap.add_argument("--threshold", type=float, default=0.15, help="allowed slowdown before failing (0.15 = 15%%)")
+    args = ap.parse_args(argv)
+
+    sizes = tuple(int(s) for s in args.sizes.split(",") if s.strip())
+    results = run_benchmarks(sizes, repeat=args.repeat, seed=args.seed, include_api=not args.no_api)
+
+    baseline: Dict[str, Dict[str, float]] = {}
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f).get("results", {})
+
+    print(f"{'benchmark':<24} {'median ms':>11} {'p95 ms':>10} {'vs base':>9}")
+    for name, r in results.items():
+        base = baseline.get(name)
+        delta = f"{(r['median_ms'] / base['median_ms'] - 1) * 100:+.1f}%" if base and base.get("median_ms") else ""
+        print(f"{name:<24} {r['median_ms']:>11.3f} {r['p95_ms']:>10.3f} {delta:>9}")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"meta": _meta(args.seed, args.repeat), "results": results}, f, indent=2)
+        print(f"saved {args.save}")
+
+    if args.compare:
+        slower = compare(results, baseline, args.threshold)
+        if slower:
+            print(f"regressions (> {args.threshold:.0%} slower): {', '.join(slower)}")
+            return 1
+        print("no regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+# core/cache.py
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+from core import telemetry
+
+
+def make_key(*parts: Any) -> str:
+    """Content address for JSON-serializable parts (stable across processes)."""
+    raw = json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class TieredCache:
+    """
+    Two-tier key/value cache for JSON-serializable values:
+      • memory: LRU bounded by `max_items` (0 disables caching entirely),
+      • disk:   optional SQLite table at `db_path`, shared across processes/restarts.
+    Entries expire after `ttl_s` seconds in both tiers (None = never). Disk hits are
+    promoted into memory. Disk errors never propagate; the cache just misses.
+    """
+
+    _PURGE_EVERY = 256
+
+    def __init__(
+        self,
+        name: str,
+        max_items: int = 1024,
+        db_path: Optional[str] = None,
+        ttl_s: Optional[float] = None,
+    ):
+        self.name = name
+        self.max_items = max(0, int(max_items))
+        self.ttl_s = ttl_s
+        self._mem: "OrderedDict[str, Tuple[Optional[float], Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._writes = 0
+        if db_path and self.max_items:
+            try:
+                self._db = sqlite3.connect(db_path, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS cache ("
+                    "ns TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, expires REAL, "
+                    "PRIMARY KEY (ns, key))"
+                )
+                self._db.commit()
+            except sqlite3.Error:
+                self._db = None
+
+    def _expiry(self) -> Optional[float]:
+        return time.time() + self.ttl_s if self.ttl_s else None
+
+    def get(self, key: str) -> Optional[Any]:
+        if not self.max_items:
+            return None
+        value = self._get(key)
+        telemetry.count("cache_requests", cache=self.name, result="miss" if value is None else "hit")
+        return value
+
+    def _get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            hit = self._mem.get(key)
+            if hit is not None:
+                expires, value = hit
+                if expires is None or expires > now:
+                    self._mem.move_to_end(key)
+                    return value
+                del self._mem[key]
+            if self._db is None:
+                return None
+            try:
+                row = self._db.execute(
+                    "SELECT value, expires FROM cache WHERE ns = ? AND key = ?", (self.name, key)
+                ).fetchone()
+            except sqlite3.Error:
+                return None
+            if row is None or (row[1] is not None and row[1] <= now):
+                return None
+            value = json.loads(row[0])
+            self._remember(key, row[1], value)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        if not self.max_items:
+            return
+        expires = self._expiry()
+        with self._lock:
+            self._remember(key, expires, value)
+            if self._db is None:
+                return
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO cache (ns, key, value, expires) VALUES (?, ?, ?, ?)",
+                    (self.name, key, json.dumps(value), expires),
+                )
+                self._writes += 1
+                if self._writes % self._PURGE_EVERY == 0:
+                    self._db.execute(
+                        "DELETE FROM cache WHERE ns = ? AND expires IS NOT NULL AND expires <= ?",
+                        (self.name, time.time()),
+                    )
+                self._db.commit()
+            except sqlite3.Error:
+                pass
+
+    def clear(self) -> None:
+        with self._lock:
+            self._mem.clear()
+            if self._db is not None:
+                try:
+                    self._db.execute("DELETE FROM cache WHERE ns = ?", (self.name,))
+                    self._db.commit()
+                except sqlite3.Error:
+                    pass
+
+    def __len__(self) -> int:
+        return len(self._mem)
+
+    def _remember(self, key: str, expires: Optional[float], value: Any) -> None:
+        self._mem[key] = (expires, value)
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_items:
+            self._mem.popitem(last=False)
@@ -0,0 +1,414 @@
+# core/calendar.py
+from __future__ import annotations
+
+import json
+import os
+import re
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, time, timedelta
+from typing import Any, Iterable, Iterator, List, Optional, Union
+
+try:
+    from zoneinfo import ZoneInfo
+except Exception:
+    ZoneInfo = None
+
+try:
+    from dateutil.rrule import rrulestr, rruleset
+except Exception:
+    rrulestr = None
+    rruleset = None
+
+from core.config import TZ
+from core.slots import Slot
+
+
+# rule frequencies with a fixed period, so a series can be restarted at any period boundary
+_PERIODS = {
+    "WEEKLY": timedelta(weeks=1), "DAILY": timedelta(days=1),
+    "HOURLY": timedelta(hours=1), "MINUTELY": timedelta(minutes=1),
+}
+
+
+def _merge(intervals: Iterable[Slot]) -> List[Slot]:
+    out: List[Slot] = []
+    for s, e in sorted((s, e) for s, e in intervals if e > s):
+        if out and s <= out[-1][1]:
+            if e > out[-1][1]:
+                out[-1] = (out[-1][0], e)
+        else:
+            out.append((s, e))
+    return out
+
+
+class _Recurrence:
+    """
+    One RRULE series with its occurrence length. Queries never walk the series from
+    DTSTART:
+      • plain FREQ/INTERVAL rules (no BY* parts) are stepped arithmetically from the
+        window start, COUNT and UNTIL included,
+      • other fixed-period rules (weekly/daily/hourly/minutely without COUNT) are
+        restarted at the last period boundary before the window, which yields the
+        same occurrences from there on,
+      • the rest (COUNT with BY* parts, monthly/yearly) keep dateutil's cache.
+    """
+
+    __slots__ = ("rule", "first", "dur", "exdates", "skip", "until", "count", "step", "plain", "period")
+
+    def __init__(self, rule: Any, parts: dict, first: datetime, dur: timedelta,
+                 exdates: Iterable[datetime] = ()):
+        self.rule = rule
+        self.first = first
+        self.dur = dur
+        self.exdates = sorted(exdates)
+        self.skip = frozenset(self.exdates)
+        self.until: Optional[datetime] = parts["until"]
+        self.count: Optional[int] = parts["count"]
+        unit = _PERIODS.get(parts["freq"])
+        self.step = unit * parts["interval"] if unit is not None else None
+        self.plain = self.step is not None and not parts["by"]
+        self.period = self.step if self.count is None else None
+
+    def _stepped(self, lo: datetime, hi: datetime, inc: bool) -> Iterator[datetime]:
+        """Occurrences o of a plain rule with lo < o < hi (o <= hi when `inc`)."""
+        step, first, until, count = self.step, self.first, self.until, self.count
+        k = 0 if lo < first else (lo - first) // step + 1
+        o = first + k * step
+        while (o <= hi if inc else o < hi) and (until is None or o <= until) and (count is None or k < count):
+            if o not in self.skip:
+                yield o
+            k += 1
+            o += step
+
+    def _set(self, start: datetime) -> Any:
+        """The series from its last period boundary at or before `start`, with its exdates."""
+        rule, dtstart = self.rule, self.first
+        if self.period is not None and start > dtstart + self.period:
+            dtstart += ((start - dtstart) // self.period) * self.period
+            rule = rule.replace(dtstart=dtstart)
+        rules = rruleset()
+        rules.rrule(rule)
+        for d in self.exdates[bisect_left(self.exdates, dtstart):]:
+            rules.exdate(d)
+        return rules
+
+    def between(self, start: datetime, end: datetime) -> List[datetime]:
+        """Occurrence starts o overlapping [start, end), i.e. start - dur < o < end."""
+        lo = start - self.dur
+        if self.plain:
+            return list(self._stepped(lo, end, inc=False))
+        return self._set(lo).between(lo, end)
+
+    def covers(self, dt: datetime) -> bool:
+        lo = dt - self.dur
+        if self.plain:
+            return next(self._stepped(lo, dt, inc=True), None) is not None
+        o = self._set(lo).before(dt, inc=True)
+        return o is not None and dt < o + self.dur
+
+
+class BusyCalendar:
+    """
+    Busy time as sorted, merged, non-overlapping intervals kept in two parallel
+    lists (starts, ends), so both are sorted and every query is a bisect:
+      • between(start, end): busy intervals overlapping a window, O(log n + k),
+      • is_busy(dt) / free_between(start, end) for point and free-slot queries.
+    Recurring busy time (RRULE) is stored as rules and expanded only inside the
+    queried window, so a years-long daily series costs one rule, not its occurrences,
+    and a query starts at the window rather than at the series' first occurrence.
+    Bulk loads (`from_ics`, `from_json`, `add`) sort and merge once.
+    Iterating yields the one-off intervals, like the plain List[Slot] it replaces.
+    """
+
+    __slots__ = ("_starts", "_ends", "_rules")
+
+    def __init__(self, intervals: Iterable[Slot] = ()):
+        merged = _merge(intervals)
+        self._starts: List[datetime] = [s for s, _ in merged]
+        self._ends: List[datetime] = [e for _, e in merged]
+        self._rules: List[_Recurrence] = []
+
+    def add_rule(
+        self,
+        rule: str,
+        start: datetime,
+        end: datetime,
+        exdates: Iterable[datetime] = (),
+    ) -> "BusyCalendar":
+        """
+        Recurring busy time: `rule` is an RFC 5545 RRULE ("FREQ=WEEKLY;BYDAY=MO,WE",
+        "RRULE:" prefix optional) whose first occurrence is [start, end).
+        """
+        if rrulestr is None:
+            raise RuntimeError("recurring busy time needs python-dateutil")
+        text = rule.strip()
+        text = _naive_until(text[6:] if text.upper().startswith("RRULE:") else text)
+        parts = _rrule_parts(text)
+        rule = rrulestr(text, dtstart=start, cache=parts["count"] is not None or parts["freq"] not in _PERIODS)
+        self._rules.append(_Recurrence(rule, parts, start, end - start, exdates))
+        return self
+
+    def add(self, intervals: Iterable[Slot]) -> "BusyCalendar":
+        """Merge more intervals in (one sort for the whole batch)."""
+        merged = _merge(list(zip(self._starts, self._ends)) + list(intervals))
+        self._starts = [s for s, _ in merged]
+        self._ends = [e for _, e in merged]
+        return self
+
+    def __len__(self) -> int:
+        return len(self._starts) + len(self._rules)
+
+    def __iter__(self) -> Iterator[Slot]:
+        return iter(zip(self._starts, self._ends))
+
+    def __repr__(self) -> str:
+        return f"BusyCalendar(intervals={len(self._starts)}, rules={len(self._rules)})"
+
+    # --- queries ---
+    def between(self, start: datetime, end: datetime) -> List[Slot]:
+        """Busy intervals overlapping [start, end) (unclipped, merged with rule occurrences)."""
+        lo = bisect_right(self._ends, start)
+        hi = bisect_left(self._starts, end)
+        fixed = list(zip(self._starts[lo:hi], self._ends[lo:hi]))
+        if not self._rules:
+            return fixed
+        # an occurrence o overlaps the window iff start - duration < o < end
+        return _merge(fixed + [
+            (o, o + rec.dur) for rec in self._rules for o in rec.between(start, end)
+        ])
+
+    def is_busy(self, dt: datetime) -> bool:
+        i = bisect_right(self._starts, dt) - 1
+        if i >= 0 and dt < self._ends[i]:
+            return True
+        return any(rec.covers(dt) for rec in self._rules)
+
+    def free_between(self, start: datetime, end: datetime) -> List[Slot]:
+        """Gaps in [start, end) not covered by busy time."""
+        out: List[Slot] = []
+        t = start
+        for s, e in self.between(start, end):
+            if s > t:
+                out.append((t, s))
+            t = max(t, e)
+        if t < end:
+            out.append((t, end))
+        return out
+
+    def on(self, day: date) -> List[Slot]:
+        """Busy intervals touching `day`."""
+        start = datetime.combine(day, time(0, 0))
+        return self.between(start, start + timedelta(days=1))
+
+    # --- loaders ---
+    @classmethod
+    def from_intervals(cls, items: Iterable[Any]) -> "BusyCalendar":
+        """(start, end) tuples, BusyInterval models or {"start", "end", "rrule"} dicts."""
+        return cls().extend(items)
+
+    def extend(self, items: Iterable[Any]) -> "BusyCalendar":
+        """Add `from_intervals`-style items (one-off and recurring) to this calendar."""
+        cal = self
+        fixed: List[Slot] = []
+        for item in items:
+            if isinstance(item, dict):
+                start, end, rule = item["start"], item["end"], item.get("rrule")
+            elif isinstance(item, (tuple, list)):
+                (start, end), rule = item, None
+            else:
+                start, end, rule = item.start, item.end, getattr(item, "rrule", None)
+            if isinstance(start, str):
+                start, end = datetime.fromisoformat(start), datetime.fromisoformat(end)
+            start, end = _naive(start), _naive(end)
+            if rule:
+                cal.add_rule(rule, start, end)
+            else:
+                fixed.append((start, end))
+        return cal.add(fixed)
+
+    @classmethod
+    def from_json(cls, source: Union[str, bytes, os.PathLike, list, dict]) -> "BusyCalendar":
+        """
+        JSON export (path, text, or parsed): a list of {"start", "end", "rrule"?} objects
+        or [start, end] pairs with ISO datetimes, optionally under a "busy"/"events" key.
+        """
+        data: Any = source
+        if isinstance(source, (str, bytes, os.PathLike)):
+            text = source
+            if not (isinstance(source, (str, bytes)) and source.lstrip()[:1] in ("[", "{", b"[", b"{")):
+                with open(source, encoding="utf-8") as f:
+                    text = f.read()
+            data = json.loads(text)
+        if isinstance(data, dict):
+            data = data.get("busy", data.get("events", []))
+        return cls.from_intervals(data)
+
+    @classmethod
+    def from_ics(cls, source: Union[str, os.PathLike]) -> "BusyCalendar":
+        """iCalendar (.ics path or text): opaque, non-cancelled VEVENTs; RRULE/EXDATE series stay rules."""
+        cal = cls()
+        fixed: List[Slot] = []
+        for ev in _ics_events(_ics_text(source)):
+            span = _ics_span(ev)
+            if span is None:
+                continue
+            if "RRULE" in ev and rrulestr is not None:
+                exdates = [
+                    _ics_datetime(params, v)
+                    for params, value in ev.get("EXDATE*", ())
+                    for v in value.split(",")
+                ]
+                cal.add_rule(ev["RRULE"][1], span[0], span[1], exdates)
+            else:
+                fixed.append(span)
+        return cal.add(fixed)
+
+
+# --- iCalendar ---
+def _local_zone():
+    if ZoneInfo is None:
+        return None
+    try:
+        return ZoneInfo(TZ)
+    except Exception:
+        return None
+
+
+def _naive(dt: datetime) -> datetime:
+    """Aware datetimes -> naive local time in TZ (the planner works in naive local time)."""
+    if dt.tzinfo is None:
+        return dt
+    zone = _local_zone()
+    return (dt.astimezone(zone) if zone else dt).replace(tzinfo=None)
+
+
+_UNTIL_UTC_RE = re.compile(r"UNTIL=(\d{8}T\d{6})Z", re.IGNORECASE)
+
+
+def _naive_until(rule: str) -> str:
+    """UTC UNTIL (as .ics exports write it) -> local naive, to match naive DTSTARTs."""
+    def local(m: re.Match) -> str:
+        until = _ics_datetime("", m.group(1) + "Z")
+        return "UNTIL=" + until.strftime("%Y%m%dT%H%M%S")
+    return _UNTIL_UTC_RE.sub(local, rule)
+
+
+def _rrule_parts(rule: str) -> dict:
+    """
+    FREQ, INTERVAL, COUNT and UNTIL of an RRULE (after `_naive_until`), plus whether
+    it has any other part (BY*, WKST) that the arithmetic stepping can't follow.
+    """
+    fields = dict(
+        (k.strip().upper(), v.strip())
+        for k, _, v in (p.partition("=") for p in rule.split(";") if p.strip())
+    )
+    until = fields.pop("UNTIL", None)
+    count = fields.pop("COUNT", None)
+    return {
+        "freq": fields.pop("FREQ", "").upper(),
+        "interval": int(fields.pop("INTERVAL", None) or 1),
+        "count": int(count) if count else None,
+        "until": (
+            datetime.strptime(until[:15], "%Y%m%dT%H%M%S") if until and "T" in until
+            else datetime.strptime(until[:8], "%Y%m%d") if until else None
+        ),
+        "by": bool(fields),
+    }
+
+
+def _ics_text(source: Union[str, os.PathLike]) -> str:
+    if isinstance(source, str) and "BEGIN:" in source:
+        return source
+    with open(source, encoding="utf-8") as f:
+        return f.read()
+
+
+def _ics_lines(text: str) -> Iterator[str]:
+    """Unfolded content lines (RFC 5545 §3.1: continuation lines start with a space/tab)."""
+    current = ""
+    for raw in text.splitlines():
+        if raw[:1] in (" ", "\t"):
+            current += raw[1:]
+            continue
+        if current:
+            yield current
+        current = raw
+    if current:
+        yield current
+
+
+def _ics_datetime(params: str, value: str) -> datetime:
+    value = value.strip()
+    if "VALUE=DATE" in params.upper() and "T" not in value:
+        return datetime.strptime(value[:8], "%Y%m%d")
+    dt = datetime.strptime(value[:15], "%Y%m%dT%H%M%S")
+    if value.endswith("Z"):
+        return _naive(dt.replace(tzinfo=ZoneInfo("UTC")) if ZoneInfo else dt)
+    for p in params.split(";"):
+        if p.upper().startswith("TZID=") and ZoneInfo is not None:
+            try:
+                return _naive(dt.replace(tzinfo=ZoneInfo(p[5:].strip('"'))))
+            except Exception:
+                break
+    return dt
+
+
+def _ics_duration(value: str) -> timedelta:
+    """RFC 5545 DURATION such as PT30M, PT1H30M, P1D, P1W."""
+    value = value.strip().lstrip("+")
+    sign = -1 if value.startswith("-") else 1
+    num, total, in_time = "", timedelta(), False
+    units = {"W": timedelta(weeks=1), "D": timedelta(days=1)}
+    time_units = {"H": timedelta(hours=1), "M": timedelta(minutes=1), "S": timedelta(seconds=1)}
+    for ch in value.lstrip("-P"):
+        if ch == "T":
+            in_time = True
+        elif ch.isdigit():
+            num += ch
+        else:
+            total += int(num or 0) * (time_units if in_time else units).get(ch, timedelta())
+            num = ""
+    return sign * total
+
+
+def _ics_events(text: str) -> Iterator[dict]:
+    """Raw VEVENT properties: name -> (params, value); every EXDATE line under "EXDATE*"."""
+    event: Optional[dict] = None
+    for line in _ics_lines(text):
+        name, _, value = line.partition(":")
+        key, _, params = name.partition(";")
+        key = key.upper()
+        if key == "BEGIN" and value.strip().upper() == "VEVENT":
+            event = {}
+        elif key == "END" and value.strip().upper() == "VEVENT":
+            if event is not None:
+                yield event
+            event = None
+        elif event is not None and key == "EXDATE":
+            event.setdefault("EXDATE*", []).append((params, value))
+        elif event is not None and key not in event:
+            event[key] = (params, value)
+
+
+def _ics_span(ev: dict) -> Optional[Slot]:
+    """(start, end) of one busy VEVENT, or None when it doesn't block time."""
+    if ev.get("TRANSP", ("", ""))[1].strip().upper() == "TRANSPARENT":
+        return None
+    if ev.get("STATUS", ("", ""))[1].strip().upper() == "CANCELLED":
+        return None
+    if "DTSTART" not in ev:
+        return None
+    start = _ics_datetime(*ev["DTSTART"])
+    if "DTEND" in ev:
+        end = _ics_datetime(*ev["DTEND"])
+    elif "DURATION" in ev:
+        end = start + _ics_duration(ev["DURATION"][1])
+    else:
+        all_day = "VALUE=DATE" in ev["DTSTART"][0].upper()
+        end = start + (timedelta(days=1) if all_day else timedelta())
+    return (start, end) if end > start else None
+
+
+# what the schedulers accept as `busy`: an explicit list (Slot tuples, or BusyInterval
+# entries that may carry an `rrule`) or an indexed calendar
+Busy = Union[List[Any], BusyCalendar]
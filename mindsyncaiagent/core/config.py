@@ -7,4 +7,56 @@ load_dotenv()
 
 MODEL = os.getenv("LC_MODEL", "gemini-2.5-flash")
 
+# max pooled HTTP connections per shared LLM client
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "20"))
+
+# guarded LLM calls: per-call deadline, total LLM time per API request (0 = unbounded),
+# hedge a slow call after this latency percentile (0 = never), circuit breaker
+LLM_TIMEOUT_S = float(os.getenv("LLM_TIMEOUT_S", "8"))
+LLM_REQUEST_BUDGET_S = float(os.getenv("LLM_REQUEST_BUDGET_S", "20"))
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "0.95"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_COOLDOWN_S = float(os.getenv("LLM_BREAKER_COOLDOWN_S", "30"))
+
+# max parse/classify LLM calls in flight per planning request
+PLAN_CONCURRENCY = int(os.getenv("PLAN_CONCURRENCY", "8"))
+
+# SQLite file backing the on-disk cache tier (empty = in-memory only)
+CACHE_DB = os.getenv("CACHE_DB", "")
+# parse_task result cache: LRU size (0 disables) and entry lifetime
+PARSE_CACHE_SIZE = int(os.getenv("PARSE_CACHE_SIZE", "4096"))
+PARSE_CACHE_TTL_S = float(os.getenv("PARSE_CACHE_TTL_S", str(7 * 24 * 3600)))
+# skip the parser LLM when the task-line grammar accounts for the whole line
+PARSER_SHORT_CIRCUIT = os.getenv("PARSER_SHORT_CIRCUIT", "1").lower() not in ("0", "false", "no")
+PARSER_MIN_CONFIDENCE = float(os.getenv("PARSER_MIN_CONFIDENCE", "0.9"))
+
+# skip the classifier LLM when a low keyword alone would settle the effort (off: an LLM "high" still wins)
+CLASSIFIER_SHORT_CIRCUIT = os.getenv("CLASSIFIER_SHORT_CIRCUIT", "0").lower() not in ("0", "false", "no")
+# cached classifier LLM verdicts keyed on (title, notes)
+CLASSIFY_CACHE_SIZE = int(os.getenv("CLASSIFY_CACHE_SIZE", "4096"))
+CLASSIFY_CACHE_TTL_S = float(os.getenv("CLASSIFY_CACHE_TTL_S", str(30 * 24 * 3600)))
+
+# scheduler LLM advice: default for use_llm=None, how long a plan waits for advice
+# before returning the deterministic packing, and the advice cache
+SCHEDULER_USE_LLM = os.getenv("SCHEDULER_USE_LLM", "0").lower() not in ("0", "false", "no")
+SCHEDULER_ADVICE_WAIT_S = float(os.getenv("SCHEDULER_ADVICE_WAIT_S", "1.5"))
+ADVICE_CACHE_SIZE = int(os.getenv("ADVICE_CACHE_SIZE", "1024"))
+ADVICE_CACHE_TTL_S = float(os.getenv("ADVICE_CACHE_TTL_S", str(24 * 3600)))
+
+# worker processes for batch planning (default one per CPU, 0 = plan inline)
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS") or os.cpu_count() or 1)
+
+# learned per-user energy curves: SQLite file (empty = in-memory only) and LRU size
+PROFILE_DB = os.getenv("PROFILE_DB", "")
+PROFILE_CACHE_SIZE = int(os.getenv("PROFILE_CACHE_SIZE", "100000"))
+
+# plan/summary/completion history: SQLite file. Empty (the default) = an in-memory database
+# per process: history is lost on restart and not shared between workers, so set a path
+# (e.g. HISTORY_DB=history.db) for anything but local runs and tests.
+HISTORY_DB = os.getenv("HISTORY_DB", "")
+
+# built-in timing/counter layer behind /metrics and `timings` (0 = off, near zero cost)
+TELEMETRY_ENABLED = os.getenv("TELEMETRY", "1").lower() not in ("0", "false", "no")
+
 TZ = os.getenv("TZ", "UTC")
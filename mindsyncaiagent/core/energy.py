@@ -1,22 +1,128 @@
-
 from __future__ import annotations
+from array import array
 from datetime import datetime, timedelta, date, time
-from typing import List, Tuple, Literal
+from functools import lru_cache
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Literal, Union
 
 EnergyProfile = Literal["morning_lark", "balanced", "night_owl"]
 
-SlotPoint = Tuple[datetime, float]  
+SlotPoint = Tuple[datetime, float]
+
 
-def _curve_from_peaks(day: date, peaks: list[tuple[int, int, float]], base: float = 0.3) -> List[SlotPoint]:
+class EnergyCurve(Sequence[SlotPoint]):
     """
-    Build a 15-min resolution curve from (start_hour, end_hour, energy) peaks.
-    `peaks` hours are inclusive for start, exclusive for end.
+    Energy over one day as a compact float array: value i belongs to minute-of-day
+    `origin_min + i * step_min` (wrapping past midnight onto the next date).
+    The array is date-free and shared between curves; `day` only anchors it when
+    points are materialized, so a curve still iterates/indexes like the legacy
+    List[(datetime, float)]. Lookups are index arithmetic instead of dict builds:
+      • get(dt):        value at an exact slot start on this curve's dates,
+      • values_for(..): one value per slot of a step grid, anchored or by time of day.
     """
-    start = datetime.combine(day, time(6, 0))
-    pts: List[SlotPoint] = []
-    for i in range(96):  
-        t = start + timedelta(minutes=15 * i)
-        h = t.hour + t.minute / 60.0
+
+    __slots__ = ("values", "day", "origin_min", "step_min")
+
+    def __init__(self, values: Sequence[float], day: date, origin_min: int = 6 * 60, step_min: int = 15):
+        self.values = values if isinstance(values, array) else array("d", values)
+        self.day = day
+        self.origin_min = origin_min
+        self.step_min = step_min
+
+    def on(self, day: date) -> "EnergyCurve":
+        """The same curve anchored to another date (shares the array)."""
+        return EnergyCurve(self.values, day, self.origin_min, self.step_min)
+
+    # --- sequence protocol (legacy list-of-points view) ---
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return (self._start() + timedelta(minutes=self.step_min * i), self.values[i])
+
+    def __iter__(self) -> Iterator[SlotPoint]:
+        t = self._start()
+        step = timedelta(minutes=self.step_min)
+        for v in self.values:
+            yield (t, v)
+            t += step
+
+    def __repr__(self) -> str:
+        return f"EnergyCurve(day={self.day}, points={len(self)}, step_min={self.step_min})"
+
+    # --- lookups ---
+    def _start(self) -> datetime:
+        return datetime.combine(self.day, time(0, 0)) + timedelta(minutes=self.origin_min)
+
+    def _index(self, offset_s: float) -> Optional[int]:
+        step_s = self.step_min * 60
+        if offset_s % step_s:
+            return None
+        i = int(offset_s // step_s)
+        return i if 0 <= i < len(self.values) else None
+
+    def index_of(self, dt: datetime) -> Optional[int]:
+        """Index of the point starting exactly at `dt`, or None."""
+        return self._index((dt - self._start()).total_seconds())
+
+    def get(self, dt: datetime, default: Optional[float] = None) -> Optional[float]:
+        """Dict-style lookup (same semantics as `dict(curve).get`)."""
+        i = self.index_of(dt)
+        return default if i is None else self.values[i]
+
+    def values_for(
+        self,
+        origin: datetime,
+        step_min: int,
+        n: int,
+        *,
+        default: float = 0.5,
+        anchored: bool = True,
+    ) -> List[float]:
+        """
+        Energy at each of `n` slots starting at `origin`, `step_min` apart.
+        anchored=False matches by time of day only (a template for any date).
+        """
+        if anchored:
+            base_s = (origin - self._start()).total_seconds()
+        else:
+            base_s = (origin.hour * 60 + origin.minute - self.origin_min) * 60 + origin.second
+        out: List[float] = []
+        for k in range(n):
+            off = base_s + k * step_min * 60
+            if not anchored:
+                off %= 24 * 3600
+            i = self._index(off)
+            out.append(default if i is None else self.values[i])
+        return out
+
+
+def curve_lookup(curve: Union[EnergyCurve, Sequence[SlotPoint], None]):
+    """Object with `.get(dt, default)` for any curve (no dict rebuild for EnergyCurve)."""
+    if curve is None or isinstance(curve, EnergyCurve):
+        return curve
+    return {t: e for t, e in curve}
+
+
+@lru_cache(maxsize=128)
+def curve_values(
+    fn: Callable[[float], float],
+    origin_min: int = 6 * 60,
+    step_min: int = 15,
+    n: int = 96,
+) -> array:
+    """Memoized `fn(hour_of_day)` sampled on the curve grid (hours wrap at 24)."""
+    return array("d", (fn(((origin_min + step_min * i) % (24 * 60)) / 60.0) for i in range(n)))
+
+
+@lru_cache(maxsize=64)
+def _peaks_values(peaks: Tuple[Tuple[int, int, float], ...], base: float) -> array:
+    def energy(h: float) -> float:
         e = base
         for (hs, he, val) in peaks:
             if hs <= h < he:
@@ -24,19 +130,32 @@ def _curve_from_peaks(day: date, peaks: list[tuple[int, int, float]], base: floa
         # common dip
         if 13 <= h < 14:
             e = min(e, 0.25)
-        pts.append((t, round(e, 3)))
-    return pts
+        return round(e, 3)
+
+    return curve_values(energy)
+
+
+def _curve_from_peaks(day: date, peaks: list[tuple[int, int, float]], base: float = 0.3) -> EnergyCurve:
+    """
+    Build a 15-min resolution curve from (start_hour, end_hour, energy) peaks.
+    `peaks` hours are inclusive for start, exclusive for end.
+    Values are computed once per (peaks, base) and shared by every curve.
+    """
+    return EnergyCurve(_peaks_values(tuple(tuple(p) for p in peaks), base), day)
+
+
+_PROFILE_PEAKS: Dict[str, List[Tuple[int, int, float]]] = {
+    "morning_lark": [(8, 11, 0.95), (16, 18, 0.8)],
+    "night_owl": [(10, 12, 0.6), (17, 21, 0.95)],
+    "balanced": [(9, 11, 0.85), (16, 18, 0.8)],
+}
+
 
-def energy_curve_for(day: date, profile: EnergyProfile = "balanced") -> List[SlotPoint]:
+def energy_curve_for(day: date, profile: EnergyProfile = "balanced") -> EnergyCurve:
     """
     morning_lark: big peak 08–11, small peak 16–18
     balanced:     mild 09–11 and 16–18
     night_owl:    big peak 17–21, mild 10–12
     """
-    if profile == "morning_lark":
-        peaks = [(8, 11, 0.95), (16, 18, 0.8)]
-    elif profile == "night_owl":
-        peaks = [(10, 12, 0.6), (17, 21, 0.95)]
-    else:  
-        peaks = [(9, 11, 0.85), (16, 18, 0.8)]
+    peaks = _PROFILE_PEAKS.get(profile, _PROFILE_PEAKS["balanced"])
     return _curve_from_peaks(day, peaks)
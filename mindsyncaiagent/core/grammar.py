@@ -0,0 +1,322 @@
+# core/grammar.py
+"""
+Single-pass grammar for structured task lines such as
+  "Write report; ~1.5h; due Fri 5pm #deep"   or   "Standup 9:30-9:45".
+One precompiled alternation scans each ';'/newline segment left to right:
+  • duration:  2h, 1.5 hours, 1h30, 45m, 90 min (never read as a clock time),
+  • window:    14:00-14:30, 2pm-3pm, 9-10am, 2pm to 3pm,
+  • time:      14:00, 5pm, noon, eod (a bare number is never a time),
+  • day:       today, tomorrow/tmr, mon..sunday, next fri,
+  • date:      2026-11-01, 10/20(/2026), Nov 3(rd)(, 2026), 3 Nov (next year once past),
+  • due:       due/by/before; every day/date/time after it in the segment is the deadline,
+  • tag:       #word.
+The first segment is the title (trailing tokens stripped). `parse_line` also returns
+a confidence in [0..1] that drops for anything the grammar could not place (bare
+numbers after at/due, m/d dates that could be d/m, unknown segments, repeated fields), so callers can
+send only those lines to an LLM.
+"""
+from __future__ import annotations
+
+import re
+from datetime import date, datetime, time, timedelta
+from typing import List, Optional, Tuple
+
+from core.models import Task
+
+DEFAULT_DUE_HOUR = 17
+
+_CLOCK = r"\d{1,2}(?::[0-5]\d)?(?:\s*[ap]\.?m\b\.?)?"
+_MONTH = r"(?P<{}>jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)(?:uary|ruary|ch|il|e|y|ust|tember|ober|ember)?\.?"
+_DAY_NUM = r"(?P<{}>\d{{1,2}})(?:st|nd|rd|th)?"
+_YEAR = r"(?:,?\s*(?P<{}>\d{{4}}))?"
+
+# every token starts at a word start; the leading (?<!\w) rejects mid-word
+# positions before any alternative is tried
+_TOKEN_RE = re.compile(
+    rf"""
+    (?<!\w)(?:
+      (?P<date>(?<![\w:./-])(?:
+            (?P<iy>\d{{4}})-(?P<im>\d{{1,2}})-(?P<id>\d{{1,2}})
+          | (?P<nm>\d{{1,2}})/(?P<nd>\d{{1,2}})(?:/(?P<ny>\d{{4}}|\d{{2}}))?
+          | {_MONTH.format("mon1")}\s*{_DAY_NUM.format("day1")}{_YEAR.format("year1")}
+          | {_DAY_NUM.format("day2")}\s+(?:of\s+)?{_MONTH.format("mon2")}{_YEAR.format("year2")}
+        )(?![\w:/-]))
+    | (?P<window>(?<![\w:.])(?P<w1>{_CLOCK})\s*(?:-|–|—|\bto\b)\s*(?P<w2>{_CLOCK})(?![\d:]))
+    | (?P<dur>~?\s*(?<![\w:.])(?:
+            (?P<dh>\d+(?:\.\d+)?)\s*(?:hours?|hrs?|h)(?:\s*(?P<dhm>\d{{1,2}})\s*(?:minutes?|mins?|m)?)?
+          | (?P<dm>\d+)\s*(?:minutes?|mins?|m)
+        )\b)
+    | (?P<time>(?<![\w:.])(?:{_CLOCK})(?![\d:])|\bnoon\b|\beod\b)
+    | (?P<day>\b(?:(?P<next>next\s+)?(?P<wd>mon(?:day)?|tue(?:s(?:day)?)?|wed(?:nesday)?
+            |thu(?:r(?:s(?:day)?)?)?|fri(?:day)?|sat(?:urday)?|sun(?:day)?)|today|tomorrow|tmrw?)\b)
+    | (?P<due>\b(?:due|by|before)\b)
+    | (?P<tag>(?<!\w)\#(?P<tagname>[\w-]+))
+    | (?P<filler>\b(?:at|from|on|for|around|about|starting|approx\.?|est\.?)(?!\w)|@|~)
+    )""",
+    re.IGNORECASE | re.VERBOSE,
+)
+_SEGMENT_RE = re.compile(r"[;\n]")
+_WORDISH_RE = re.compile(r"\w")
+_CLOCK_RE = re.compile(r"(?P<h>\d{1,2})(?::(?P<m>[0-5]\d))?\s*(?:(?P<ap>[ap])\.?m\.?)?", re.IGNORECASE)
+_WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+_MONTHS = ("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec")
+
+# confidence caps (the line's confidence is the lowest one it triggers)
+_UNPLACED = 0.5      # unknown segment, repeated field, invalid window, "at 9"
+_MID_TITLE = 0.7     # a token inside the title text ("Review 2pm notes")
+_LOOSE_DAY = 0.6     # a day with no time or deadline to attach to
+_AMBIGUOUS_DATE = 0.7  # "3/4": read as m/d, but could be d/m
+_BARE_HOUR = 0.6     # "at 10" / "6-7": taken as 24h clock hours, but the LLM should confirm
+
+
+def _clock(text: str, ampm_hint: Optional[str] = None) -> Optional[Tuple[int, int, bool]]:
+    """(hour, minute, explicit) for '5pm', '14:00', '9', 'noon', 'eod'; None if out of range."""
+    low = text.strip().lower()
+    if low == "noon":
+        return 12, 0, True
+    if low == "eod":
+        return DEFAULT_DUE_HOUR, 0, True
+    m = _CLOCK_RE.fullmatch(low)
+    if not m:
+        return None
+    h, mm, ap = int(m.group("h")), int(m.group("m") or 0), (m.group("ap") or ampm_hint)
+    explicit = bool(m.group("ap") or m.group("m"))
+    if ap:
+        if not 1 <= h <= 12:
+            return None
+        h = h % 12 + (12 if ap.lower() == "p" else 0)
+    elif h > 23:
+        return None
+    return h, mm, explicit
+
+
+def _window(w1: str, w2: str) -> Optional[Tuple[Tuple[int, int], Tuple[int, int]]]:
+    """
+    Both ends of '9-10am' / '2pm-3pm' / '14:00-14:30'; None unless one side is unambiguous.
+    Only a window with an explicit end ('10pm-1am') may run past midnight.
+    """
+    end = _clock(w2)
+    start = _clock(w1)
+    if start is None or end is None or not (start[2] or end[2]):
+        return None
+    ap2 = _CLOCK_RE.fullmatch(w2.strip().lower())
+    hint = ap2.group("ap") if ap2 else None
+    if hint and not _CLOCK_RE.fullmatch(w1.strip().lower()).group("ap"):
+        # "9-10am" / "1-2pm": the start shares the end's am/pm when that keeps it first
+        shared = _clock(w1, hint)
+        if shared is not None and shared[:2] <= end[:2]:
+            start = shared
+    if not end[2] and end[:2] <= start[:2]:
+        # a bare end hour before the start is the same afternoon ("9am-5"), never the next day
+        end = (end[0] + 12, end[1], False)
+        if end[0] > 23 or end[:2] <= start[:2]:
+            return None
+    return start[:2], end[:2]
+
+
+def _bare_window(w1: str, w2: str) -> Optional[Tuple[Tuple[int, int], Tuple[int, int]]]:
+    """'6-7' read literally as 24h hours (06:00-07:00); None unless both are hours in order."""
+    if not (w1.strip().isdigit() and w2.strip().isdigit()):
+        return None
+    h1, h2 = int(w1), int(w2)
+    return ((h1, 0), (h2, 0)) if 0 <= h1 < h2 <= 23 else None
+
+
+def _calendar_date(m: re.Match, today: date) -> Optional[date]:
+    """The date a `date` token names; without a year, the next such date from today."""
+    if m.group("iy"):
+        y, mo, d = m.group("iy"), m.group("im"), m.group("id")
+    elif m.group("nm"):
+        y, mo, d = m.group("ny"), m.group("nm"), m.group("nd")
+        if y and len(y) == 2:
+            y = "20" + y
+    else:
+        name = m.group("mon1") or m.group("mon2")
+        y, mo, d = m.group("year1") or m.group("year2"), _MONTHS.index(name.lower()[:3]) + 1, m.group("day1") or m.group("day2")
+    try:
+        day = date(int(y) if y else today.year, int(mo), int(d))
+    except ValueError:
+        return None
+    if not y and day < today:
+        try:
+            day = day.replace(year=day.year + 1)
+        except ValueError:  # Feb 29
+            return None
+    return day
+
+
+def _ambiguous_date(m: re.Match) -> bool:
+    return bool(m.group("nm")) and m.group("nm") != m.group("nd") and int(m.group("nd")) <= 12
+
+
+def _resolve_day(m: re.Match, today: date) -> date:
+    if m.group("date"):
+        return _calendar_date(m, today)
+    word = m.group(0).lower()
+    if word == "today":
+        return today
+    if word.startswith("t") and not m.group("wd"):
+        return today + timedelta(days=1)
+    target = _WEEKDAYS.index(m.group("wd").lower()[:3])
+    ahead = (target - today.weekday()) % 7
+    if m.group("next") and ahead == 0:
+        ahead = 7
+    return today + timedelta(days=ahead)
+
+
+def _at(day: date, hm: Tuple[int, int]) -> datetime:
+    return datetime.combine(day, time(hm[0], hm[1]))
+
+
+Item = Tuple[str, object, int]   # (kind, match or leftover text, end offset)
+_TEXT = ("word", "cue", "junk")
+
+
+def _items(segment: str) -> List[Item]:
+    """Tokens and the leftover text between them, in order."""
+    items: List[Item] = []
+    pos = 0
+    for m in _TOKEN_RE.finditer(segment):
+        gap = segment[pos:m.start()]
+        if _WORDISH_RE.search(gap):
+            items.append(("word", gap.strip(" ,"), len(gap.rstrip(" ,")) + pos))
+        items.append((m.lastgroup, m, m.end()))
+        pos = m.end()
+    tail = segment[pos:]
+    if _WORDISH_RE.search(tail):
+        items.append(("word", tail.strip(" ,"), len(tail.rstrip(" ,")) + pos))
+    return items
+
+
+def _attach(items: List[Item], today: date) -> List[Item]:
+    """
+    Demote tokens that only look structural back to text: bare numbers ("Chapter 2"),
+    impossible dates ("2/30", junk), and due/filler words not followed by a day/time
+    ("Stand by me"; kept as a cue). A bare number right after "at"/"@" and a window of
+    two bare hours ("6-7") survive as low-confidence "hour"/"hours" tokens.
+    """
+    out: List[Item] = []
+    for kind, v, end in items:
+        if kind == "time" and not (_clock(v.group(0)) or (0, 0, False))[2]:
+            at = out and out[-1][0] == "filler" and out[-1][1].group(0).lower() in ("at", "@")
+            kind, v = ("hour", v) if at and _clock(v.group(0)) else ("word", v.group(0))
+        elif kind == "window" and _window(v.group("w1"), v.group("w2")) is None:
+            bare = _bare_window(v.group("w1"), v.group("w2"))
+            kind, v = ("hours", v) if bare else ("junk", v.group(0))
+        elif kind == "date" and _calendar_date(v, today) is None:
+            kind, v = "junk", v.group(0)
+        out.append((kind, v, end))
+    for i, (kind, v, end) in enumerate(out):
+        if kind in ("due", "filler"):
+            nxt = next((k for k, _v, _e in out[i + 1:] if k != "filler"), None)
+            if nxt not in ("day", "date", "time", "hour", "window", "hours", "dur"):
+                out[i] = ("cue", v.group(0), end)
+    return out
+
+
+def parse_line(raw_text: str, today: date) -> Tuple[Task, float]:
+    """Deterministic Task for one line, plus how fully the grammar accounted for it."""
+    conf = 1.0
+    segments = [s.strip() for s in _SEGMENT_RE.split(raw_text or "") if s.strip()]
+    if not segments:
+        return Task(title=(raw_text or "").strip()), 0.0
+
+    title = segments[0]
+    est: Optional[int] = None
+    window = start = None
+    day_m = due_day_m = None
+    due_hm: Optional[Tuple[int, int]] = None
+    tags: List[str] = []
+    notes: List[str] = []
+
+    for si, seg in enumerate(segments):
+        items = _attach(_items(seg), today)
+        if si == 0:
+            # the title is everything before the trailing run of tokens
+            cut = len(items)
+            while cut and items[cut - 1][0] not in _TEXT:
+                cut -= 1
+            if cut:
+                title = seg[:items[cut - 1][2]].strip(" ,")
+                # "Read chapters 2-3": bare hours inside the title are just numbers
+                items = [("junk", v.group(0), e) if k == "hours" else (k, v, e)
+                         for k, v, e in items[:cut]] + items[cut:]
+                if any(k not in _TEXT for k, _v, _e in items[:cut]):
+                    conf = min(conf, _MID_TITLE)
+        in_due = False
+        prev = None
+        for kind, v, _end in items:
+            if kind in _TEXT:
+                if si or kind == "junk" or (prev == "cue" and v[:1].isdigit()) or in_due:
+                    conf = min(conf, _UNPLACED)
+            elif kind == "due":
+                in_due = True
+            elif kind in ("day", "date"):
+                if kind == "date" and _ambiguous_date(v):
+                    conf = min(conf, _AMBIGUOUS_DATE)
+                if in_due:
+                    conf = min(conf, _UNPLACED) if due_day_m else conf
+                    due_day_m = due_day_m or v
+                else:
+                    conf = min(conf, _UNPLACED) if day_m else conf
+                    day_m = day_m or v
+            elif kind in ("time", "hour"):
+                hm = _clock(v.group(0))
+                if kind == "hour":
+                    conf = min(conf, _BARE_HOUR)
+                if in_due:
+                    conf = min(conf, _UNPLACED) if due_hm else conf
+                    due_hm = due_hm or hm[:2]
+                else:
+                    conf = min(conf, _UNPLACED) if (start or window) else conf
+                    start = start or hm[:2]
+            elif kind in ("window", "hours"):
+                if in_due or window or start:
+                    conf = min(conf, _UNPLACED)
+                if kind == "hours":
+                    conf = min(conf, _BARE_HOUR)
+                if not in_due:
+                    window = window or (_window if kind == "window" else _bare_window)(v.group("w1"), v.group("w2"))
+            elif kind == "dur":
+                conf = min(conf, _UNPLACED) if est is not None else conf
+                if est is None:
+                    hours = float(v.group("dh") or 0)
+                    est = int(round(hours * 60)) + int(v.group("dhm") or 0) + int(v.group("dm") or 0)
+                in_due = False
+            elif kind == "tag":
+                tags.append(v.group("tagname"))
+            prev = kind
+        if si and any(k in _TEXT for k, _v, _e in items):
+            notes.append(seg)
+
+    day = _resolve_day(day_m, today) if day_m else today
+    fixed_start = fixed_end = None
+    if window:
+        fixed_start, fixed_end = _at(day, window[0]), _at(day, window[1])
+        if fixed_end <= fixed_start:
+            fixed_end += timedelta(days=1)
+        if est is None:
+            est = int((fixed_end - fixed_start).total_seconds() // 60)
+    elif start:
+        fixed_start = _at(day, start)
+        fixed_end = fixed_start + timedelta(minutes=est or 30)
+
+    deadline = None
+    if due_day_m or due_hm:
+        due_day = _resolve_day(due_day_m, today) if due_day_m else day
+        deadline = _at(due_day, due_hm or (DEFAULT_DUE_HOUR, 0))
+    elif day_m and fixed_start is None:
+        conf = min(conf, _LOOSE_DAY)
+
+    if not title or _TOKEN_RE.fullmatch(title):
+        conf = 0.0
+    task = Task(
+        title=title,
+        est_minutes=est or 30,
+        deadline=deadline,
+        tags=tags,
+        notes="; ".join(notes) or None,
+        fixed_start=fixed_start,
+        fixed_end=fixed_end,
+    )
+    return task, conf
@@ -0,0 +1,173 @@
+# core/history.py
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time as _time
+import warnings
+from datetime import date
+from typing import Any, Dict, Iterable, List, Literal, Optional, Tuple
+
+from core.config import HISTORY_DB
+from core.models import DailySummary
+from core.plan import AnyPlan, as_packed
+
+Period = Literal["week", "month"]
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS plans ("
+    " id INTEGER PRIMARY KEY,"
+    " user_id TEXT NOT NULL,"
+    " date TEXT NOT NULL,"                      # YYYY-MM-DD, so text order is date order
+    " profile TEXT,"
+    " energy_alignment REAL NOT NULL,"
+    " flow_minutes INTEGER NOT NULL,"
+    " fragmentation REAL NOT NULL,"
+    " updated REAL NOT NULL)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS plans_user_date ON plans (user_id, date)",
+    "CREATE TABLE IF NOT EXISTS blocks ("
+    " plan_id INTEGER NOT NULL REFERENCES plans (id) ON DELETE CASCADE,"
+    " task TEXT NOT NULL,"
+    " start_min INTEGER NOT NULL,"              # minutes from the plan date's midnight
+    " end_min INTEGER NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS blocks_plan ON blocks (plan_id)",
+    "CREATE TABLE IF NOT EXISTS completions ("
+    " user_id TEXT NOT NULL,"
+    " date TEXT NOT NULL,"
+    " task TEXT NOT NULL,"
+    " recorded REAL NOT NULL,"
+    " PRIMARY KEY (user_id, date, task))",
+)
+
+# first day of the period containing `p.date` ('weekday 0' = next Sunday, so -6 days = Monday)
+_PERIOD_START = {
+    "week": "date(p.date, 'weekday 0', '-6 days')",
+    "month": "date(p.date, 'start of month')",
+}
+
+# per-plan completion = distinct planned tasks with a completion / distinct planned tasks,
+# then averaged per period next to the metrics stored with each plan
+_AGGREGATE_SQL = """
+WITH per_plan AS (
+    SELECT p.id, p.date, p.energy_alignment, p.flow_minutes, p.fragmentation,
+           ROUND(CAST(COUNT(DISTINCT c.task) AS REAL) / MAX(COUNT(DISTINCT b.task), 1), 2) AS completion_rate
+    FROM plans p
+    LEFT JOIN blocks b ON b.plan_id = p.id
+    LEFT JOIN completions c ON c.user_id = p.user_id AND c.date = p.date AND c.task = b.task
+    WHERE p.user_id = ? AND p.date >= ? AND p.date <= ?
+    GROUP BY p.id
+)
+SELECT {period_start} AS period_start,
+       COUNT(*) AS days,
+       ROUND(AVG(completion_rate), 3) AS completion_rate,
+       ROUND(AVG(energy_alignment), 3) AS energy_alignment,
+       SUM(flow_minutes) AS flow_minutes,
+       ROUND(AVG(flow_minutes), 1) AS avg_flow_minutes,
+       ROUND(AVG(fragmentation), 3) AS fragmentation
+FROM per_plan p
+GROUP BY period_start
+ORDER BY period_start
+"""
+
+
+class HistoryStore:
+    """
+    Plan history in SQLite (db_path None = an in-process memory database):
+      • plans:       one row per (user, date) with the metrics from its summary; saving
+                     the same day again (e.g. after a replan) replaces it,
+      • blocks:      the plan's blocks as (task, start/end minute) rows,
+      • completions: tasks the user reported done, per (user, date).
+    The (user_id, date) index drives every read; weekly/monthly aggregates are computed
+    by SQLite (GROUP BY over the range) so no plan is loaded into Python.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path or ":memory:", check_same_thread=False)
+        self._db.execute("PRAGMA foreign_keys = ON")
+        for stmt in _SCHEMA:
+            self._db.execute(stmt)
+        self._db.commit()
+
+    # --- writes ---
+    def save_plan(
+        self,
+        user_id: str,
+        plan: AnyPlan,
+        summary: DailySummary,
+        profile: Optional[str] = None,
+    ) -> int:
+        """Store (or replace) one user's plan for its date; returns the plan row id."""
+        packed = as_packed(plan)
+        day = packed.day.isoformat()
+        rows = [(packed.titles[t], s, e) for s, e, t in zip(packed.starts, packed.ends, packed.tasks)]
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM plans WHERE user_id = ? AND date = ?", (user_id, day))
+            cur = self._db.execute(
+                "INSERT INTO plans (user_id, date, profile, energy_alignment, flow_minutes, fragmentation, updated)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (user_id, day, profile, summary.energy_alignment, summary.flow_minutes,
+                 summary.fragmentation, _time.time()),
+            )
+            plan_id = cur.lastrowid
+            self._db.executemany(
+                "INSERT INTO blocks (plan_id, task, start_min, end_min) VALUES (?, ?, ?, ?)",
+                [(plan_id, *r) for r in rows],
+            )
+        return plan_id
+
+    def record_completions(self, user_id: str, day: date, titles: Iterable[str]) -> int:
+        """Mark tasks done on `day` (idempotent per title)."""
+        now = _time.time()
+        rows = [(user_id, day.isoformat(), t, now) for t in dict.fromkeys(titles) if t]
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO completions (user_id, date, task, recorded) VALUES (?, ?, ?, ?)", rows
+            )
+        return len(rows)
+
+    # --- reads ---
+    def completed_titles(self, user_id: str, day: date) -> List[str]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT task FROM completions WHERE user_id = ? AND date = ? ORDER BY task",
+                (user_id, day.isoformat()),
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def plan_blocks(self, user_id: str, day: date) -> List[Tuple[str, int, int]]:
+        """(task, start_min, end_min) rows of the stored plan for `day` (empty when none)."""
+        with self._lock:
+            return self._db.execute(
+                "SELECT b.task, b.start_min, b.end_min FROM plans p JOIN blocks b ON b.plan_id = p.id"
+                " WHERE p.user_id = ? AND p.date = ? ORDER BY b.start_min",
+                (user_id, day.isoformat()),
+            ).fetchall()
+
+    def aggregates(self, user_id: str, period: Period, start: date, end: date) -> List[Dict[str, Any]]:
+        """Per week (Monday start) or calendar month in [start, end], oldest first."""
+        sql = _AGGREGATE_SQL.format(period_start=_PERIOD_START[period])
+        with self._lock:
+            cur = self._db.execute(sql, (user_id, start.isoformat(), end.isoformat()))
+            names = [d[0] for d in cur.description]
+            return [dict(zip(names, row)) for row in cur.fetchall()]
+
+
+_store: Optional[HistoryStore] = None
+_store_lock = threading.Lock()
+
+
+def history_store() -> HistoryStore:
+    """Process-wide store configured by HISTORY_DB (unset = in-memory, with a warning)."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if not HISTORY_DB:
+                    warnings.warn(
+                        "HISTORY_DB is not set: plan history is kept in memory for this process only",
+                        RuntimeWarning,
+                        stacklevel=2,
+                    )
+                _store = HistoryStore(HISTORY_DB or None)
+    return _store
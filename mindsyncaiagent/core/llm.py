@@ -0,0 +1,353 @@
+# core/llm.py
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterator, Optional, Tuple, TypeVar
+
+try:
+    from langchain_google_genai import ChatGoogleGenerativeAI
+except Exception:
+    ChatGoogleGenerativeAI = None
+
+try:
+    import httpx
+except Exception:
+    httpx = None
+
+from core.config import (
+    MODEL,
+    LLM_POOL_SIZE,
+    LLM_TIMEOUT_S,
+    LLM_REQUEST_BUDGET_S,
+    LLM_HEDGE_PERCENTILE,
+    LLM_HEDGE_MIN_SAMPLES,
+    LLM_BREAKER_FAILURES,
+    LLM_BREAKER_COOLDOWN_S,
+)
+from core import telemetry
+
+T = TypeVar("T")
+
+
+_lock = threading.Lock()
+_clients: Dict[Tuple[str, float, str], Any] = {}
+
+
+def _client_args() -> Optional[Dict[str, Any]]:
+    """Keep-alive pool settings handed to the SDK's HTTP client (sync and async)."""
+    if httpx is None:
+        return None
+    return {
+        "limits": httpx.Limits(
+            max_connections=LLM_POOL_SIZE,
+            max_keepalive_connections=LLM_POOL_SIZE,
+        )
+    }
+
+
+def _build(model: str, temperature: float, key: str):
+    args = _client_args()
+    if args is not None:
+        try:
+            return ChatGoogleGenerativeAI(
+                model=model, temperature=temperature, google_api_key=key, client_args=args
+            )
+        except Exception:
+            pass  # older SDKs have no client_args
+    return ChatGoogleGenerativeAI(model=model, temperature=temperature, google_api_key=key)
+
+
+def get_llm(model: Optional[str] = None, temperature: float = 0.0):
+    """
+    Shared chat client for (model, temperature), built on first use and reused by
+    every agent afterwards. Returns None when the SDK or GOOGLE_API_KEY is missing.
+    """
+    key = os.getenv("GOOGLE_API_KEY")
+    if not key or ChatGoogleGenerativeAI is None:
+        return None
+    name = model or MODEL
+    k = (name, float(temperature), key)
+    llm = _clients.get(k)
+    if llm is not None:
+        return llm
+    with _lock:
+        llm = _clients.get(k)
+        if llm is None:
+            try:
+                llm = _build(name, float(temperature), key)
+            except Exception:
+                return None
+            _clients[k] = llm
+    return llm
+
+
+def reset_llm_clients() -> None:
+    """Drop cached clients (e.g. after rotating GOOGLE_API_KEY)."""
+    with _lock:
+        _clients.clear()
+
+
+# --- guarded calls ---
+# Every agent's LLM round-trip goes through `call_llm` / `acall_llm`:
+#   • deadline:  each call is bounded by LLM_TIMEOUT_S (and the request budget),
+#   • budget:    `llm_budget(s)` caps total LLM wall time for everything in a request,
+#   • hedging:   once an agent has LLM_HEDGE_MIN_SAMPLES latencies, a call still running
+#                past their LLM_HEDGE_PERCENTILE gets one duplicate; the first answer wins,
+#   • breaker:   LLM_BREAKER_FAILURES failures in a row stop all calls for
+#                LLM_BREAKER_COOLDOWN_S, then a single trial call decides whether to resume;
+#                a call that only timed out because the request budget cut it short is
+#                not a provider failure and does not count.
+# Rejected or timed-out calls raise, so callers drop into their deterministic fallback.
+
+
+class LLMUnavailable(RuntimeError):
+    """The call was not attempted (circuit open or request budget spent)."""
+
+
+class CircuitBreaker:
+    """Closed -> open after `failures` in a row -> one half-open trial after `cooldown_s`."""
+
+    def __init__(self, failures: int = 5, cooldown_s: float = 30.0):
+        self.failures = max(1, int(failures))
+        self.cooldown_s = cooldown_s
+        self._fails = 0
+        self._opened_at: Optional[float] = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        return "half_open" if time.monotonic() - self._opened_at >= self.cooldown_s else "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._trial or time.monotonic() - self._opened_at < self.cooldown_s:
+                return False
+            self._trial = True
+            return True
+
+    def success(self) -> None:
+        with self._lock:
+            self._fails, self._opened_at, self._trial = 0, None, False
+
+    def failure(self) -> None:
+        with self._lock:
+            self._fails += 1
+            if self._trial or self._fails >= self.failures:
+                self._opened_at = time.monotonic()
+            self._trial = False
+
+    def release(self) -> None:
+        """The call ended without saying anything about the provider; free the trial slot."""
+        with self._lock:
+            self._trial = False
+
+
+_breaker = CircuitBreaker(LLM_BREAKER_FAILURES, LLM_BREAKER_COOLDOWN_S)
+_latencies: Dict[str, Deque[float]] = {}
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("llm_budget_deadline", default=None)
+_pool: Optional[ThreadPoolExecutor] = None
+
+
+@contextmanager
+def llm_budget(seconds: Optional[float] = None, *, fresh: bool = False) -> Iterator[None]:
+    """
+    Cap the total LLM wall time of everything run in this context. Nested budgets only
+    shrink, unless `fresh` starts an independent one (e.g. per user inside a batch).
+    """
+    seconds = LLM_REQUEST_BUDGET_S if seconds is None else seconds
+    if not seconds or seconds <= 0:
+        if not fresh:
+            yield
+            return
+        deadline = None
+    else:
+        deadline = time.monotonic() + seconds
+    outer = None if fresh else _deadline.get()
+    token = _deadline.set(deadline if outer is None else min(outer, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def budget_remaining() -> Optional[float]:
+    """Seconds left in the active budget (None = no budget)."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def breaker() -> CircuitBreaker:
+    return _breaker
+
+
+def reset_call_state() -> None:
+    """Forget latency history and close the breaker (tests, config reloads)."""
+    global _breaker
+    with _lock:
+        _latencies.clear()
+        _breaker = CircuitBreaker(LLM_BREAKER_FAILURES, LLM_BREAKER_COOLDOWN_S)
+
+
+def _admit(agent: str, timeout_s: Optional[float]) -> Tuple[float, bool]:
+    """
+    Effective deadline for this call and whether the request budget (not the per-call
+    timeout) set it, or LLMUnavailable when the call must not be made.
+    """
+    timeout = LLM_TIMEOUT_S if timeout_s is None else timeout_s
+    cut = False
+    remaining = budget_remaining()
+    if remaining is not None:
+        if remaining <= 0:
+            telemetry.count("llm_rejected", agent=agent, reason="budget")
+            raise LLMUnavailable("request LLM budget spent")
+        cut = remaining < timeout
+        timeout = min(timeout, remaining)
+    if not _breaker.allow():
+        telemetry.count("llm_rejected", agent=agent, reason="circuit_open")
+        raise LLMUnavailable("LLM circuit open")
+    return timeout, cut
+
+
+def _failed(cut: bool, error: BaseException, elapsed: float, timeout: float) -> None:
+    """Count a failed call against the breaker unless only the caller's budget ran out."""
+    if cut and isinstance(error, TimeoutError) and elapsed >= timeout:
+        _breaker.release()
+    else:
+        _breaker.failure()
+
+
+def _hedge_after(agent: str, timeout: float) -> Optional[float]:
+    if LLM_HEDGE_PERCENTILE <= 0:
+        return None
+    samples = _latencies.get(agent)
+    if not samples or len(samples) < LLM_HEDGE_MIN_SAMPLES:
+        return None
+    ordered = sorted(samples)
+    after = ordered[min(len(ordered) - 1, int(LLM_HEDGE_PERCENTILE * len(ordered)))]
+    return after if after < timeout else None
+
+
+def _record(agent: str, seconds: float) -> None:
+    with _lock:
+        samples = _latencies.get(agent)
+        if samples is None:
+            samples = _latencies[agent] = deque(maxlen=200)
+        samples.append(seconds)
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=2 * LLM_POOL_SIZE, thread_name_prefix="llm")
+    return _pool
+
+
+def _race(agent: str, fn: Callable[[], T], timeout: float) -> T:
+    """First successful attempt within `timeout`; a hedge starts once the first one is slow.
+    Threads cannot be interrupted, so attempts that lose (or time out) finish in the background."""
+    pool = _executor()
+    hedge = _hedge_after(agent, timeout)
+    deadline = time.monotonic() + timeout
+    pending = {pool.submit(contextvars.copy_context().run, fn)}
+    error: Optional[BaseException] = None
+    while pending:
+        left = deadline - time.monotonic()
+        if left <= 0:
+            break
+        done, pending = wait(pending, timeout=min(left, hedge) if hedge else left, return_when=FIRST_COMPLETED)
+        for f in done:
+            if f.exception() is None:
+                return f.result()
+            error = f.exception()
+        if not done and hedge:
+            hedge = None
+            telemetry.count("llm_hedges", agent=agent)
+            pending.add(pool.submit(contextvars.copy_context().run, fn))
+    if pending:
+        raise TimeoutError(f"{agent} LLM call exceeded {timeout:.1f}s")
+    raise error  # type: ignore[misc]
+
+
+async def _arace(agent: str, afn: Callable[[], Awaitable[T]], timeout: float) -> T:
+    """Async `_race`; losing and timed-out attempts are cancelled."""
+    hedge = _hedge_after(agent, timeout)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    pending = {asyncio.ensure_future(afn())}
+    error: Optional[BaseException] = None
+    try:
+        while pending:
+            left = deadline - loop.time()
+            if left <= 0:
+                break
+            done, pending = await asyncio.wait(
+                pending, timeout=min(left, hedge) if hedge else left, return_when=asyncio.FIRST_COMPLETED
+            )
+            for f in done:
+                if f.exception() is None:
+                    return f.result()
+                error = f.exception()
+            if not done and hedge:
+                hedge = None
+                telemetry.count("llm_hedges", agent=agent)
+                pending.add(asyncio.ensure_future(afn()))
+    finally:
+        for f in pending:
+            f.cancel()
+    if pending:
+        raise TimeoutError(f"{agent} LLM call exceeded {timeout:.1f}s")
+    raise error  # type: ignore[misc]
+
+
+def call_llm(agent: str, fn: Callable[[], T], *, timeout_s: Optional[float] = None) -> T:
+    """
+    Run one LLM round-trip `fn()` (e.g. `lambda: chain.invoke(x)`) under the deadline,
+    budget, hedging and breaker rules above. Raises LLMUnavailable, TimeoutError or
+    whatever `fn` raised; callers treat any exception as "use the fallback".
+    """
+    timeout, cut = _admit(agent, timeout_s)
+    t0 = time.monotonic()
+    with telemetry.llm_call(agent):
+        try:
+            out = _race(agent, fn, timeout)
+        except ValueError:
+            _breaker.success()  # the model answered; the reply just didn't validate
+            raise
+        except BaseException as e:
+            _failed(cut, e, time.monotonic() - t0, timeout)
+            raise
+    _breaker.success()
+    _record(agent, time.monotonic() - t0)
+    return out
+
+
+async def acall_llm(agent: str, afn: Callable[[], Awaitable[T]], *, timeout_s: Optional[float] = None) -> T:
+    """Async `call_llm`: `afn` makes a fresh awaitable per attempt (e.g. `lambda: chain.ainvoke(x)`)."""
+    timeout, cut = _admit(agent, timeout_s)
+    t0 = time.monotonic()
+    with telemetry.llm_call(agent):
+        try:
+            out = await _arace(agent, afn, timeout)
+        except ValueError:
+            _breaker.success()  # the model answered; the reply just didn't validate
+            raise
+        except BaseException as e:
+            _failed(cut, e, time.monotonic() - t0, timeout)
+            raise
+    _breaker.success()
+    _record(agent, time.monotonic() - t0)
+    return out
@@ -0,0 +1,203 @@
+# core/metrics.py
+"""
+Plan metrics engine shared by the summarizer, the solver and reporting jobs.
+Works on PackedPlan int arrays (block start/end minutes + task ids) for any
+number of plans at once:
+  • energy_alignment: share of 15-min steps (from each block start) on a curve
+                      point with energy >= HIGH_ENERGY,
+  • flow_minutes:     minutes in blocks of at least FLOW_BLOCK_MIN,
+  • fragmentation:    (blocks - planned tasks) / blocks; 0 when no task is split,
+  • completion_rate:  planned tasks found in `completed`, over planned tasks.
+All plans go through one vectorized pass (numpy when installed); small inputs and
+numpy-less installs use the equivalent Python loop.
+"""
+from __future__ import annotations
+
+from array import array
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from core.energy import EnergyCurve
+from core.plan import AnyPlan, PackedPlan, as_packed
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+HIGH_ENERGY = 0.75
+FLOW_BLOCK_MIN = 45
+STEP_MIN = 15
+
+_VECTOR_MIN_BLOCKS = 64   # below this the Python loop beats numpy's setup cost
+_GROUP = 10 ** 11         # key space per curve: absolute seconds (day ordinal * 86400 + s)
+
+
+class PlanMetrics:
+    """Deterministic metrics for one plan."""
+
+    __slots__ = ("completion_rate", "energy_alignment", "flow_minutes", "fragmentation")
+
+    def __init__(self, completion_rate: float, energy_alignment: float, flow_minutes: int, fragmentation: float):
+        self.completion_rate = completion_rate
+        self.energy_alignment = energy_alignment
+        self.flow_minutes = flow_minutes
+        self.fragmentation = fragmentation
+
+    def as_dict(self) -> Dict[str, float]:
+        return {k: getattr(self, k) for k in self.__slots__}
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, PlanMetrics) and self.as_dict() == other.as_dict()
+
+    def __repr__(self) -> str:
+        return f"PlanMetrics({', '.join(f'{k}={v}' for k, v in self.as_dict().items())})"
+
+
+def _abs_s(day: date, seconds: float) -> int:
+    return day.toordinal() * 86400 + int(seconds)
+
+
+def _high_keys(curve: Any) -> List[int]:
+    """Absolute seconds of every curve point with energy >= HIGH_ENERGY."""
+    if isinstance(curve, EnergyCurve):
+        base = _abs_s(curve.day, curve.origin_min * 60)
+        step = curve.step_min * 60
+        return [base + i * step for i, v in enumerate(curve.values) if v >= HIGH_ENERGY]
+    points = curve.items() if isinstance(curve, dict) else curve
+    out = []
+    for t, e in points:
+        if e >= HIGH_ENERGY and not t.microsecond:
+            out.append(_abs_s(t.date(), t.hour * 3600 + t.minute * 60 + t.second))
+    return sorted(out)
+
+
+def _ratio(num: float, den: float) -> float:
+    return 0.0 if den == 0 else round(num / den, 2)
+
+
+def plan_metrics(
+    plans: Sequence[AnyPlan],
+    curves: Optional[Sequence[Any]] = None,
+    completed: Optional[Sequence[Iterable[str]]] = None,
+) -> List[PlanMetrics]:
+    """
+    Metrics for many plans in one pass. `curves[i]` (an EnergyCurve, a list of
+    (datetime, energy) points or a dict; None = no alignment) and `completed[i]`
+    (titles) belong to `plans[i]`. Curves shared between plans are read once.
+    """
+    packed = [as_packed(p) for p in plans]
+    curves = list(curves) if curves is not None else [None] * len(packed)
+    done_sets = [set(c or ()) for c in completed] if completed is not None else [set()] * len(packed)
+
+    # one high-energy key set per distinct curve object
+    group_of: Dict[int, int] = {}
+    highs: List[List[int]] = []
+    groups: List[Optional[int]] = []
+    for c in curves:
+        if c is None:
+            groups.append(None)
+            continue
+        g = group_of.get(id(c))
+        if g is None:
+            g = group_of[id(c)] = len(highs)
+            highs.append(_high_keys(c))
+        groups.append(g)
+
+    if np is not None and sum(len(p) for p in packed) >= _VECTOR_MIN_BLOCKS:
+        return _vectorized(packed, groups, highs, done_sets)
+    return [_one(p, g, highs, done) for p, g, done in zip(packed, groups, done_sets)]
+
+
+def metrics_for(plan: AnyPlan, curve: Any = None, completed: Iterable[str] = ()) -> PlanMetrics:
+    return plan_metrics([plan], [curve], [completed])[0]
+
+
+def _one(p: PackedPlan, group: Optional[int], highs: List[List[int]], done: set) -> PlanMetrics:
+    n = len(p)
+    minutes = p.minutes()
+    planned = set(p.tasks)
+    hit = steps = 0
+    if group is not None:
+        high = set(highs[group])
+        base = _abs_s(p.day, 0)
+        for s, e in zip(p.starts, p.ends):
+            for m in range(s, e, STEP_MIN):
+                steps += 1
+                hit += (base + m * 60) in high
+    return PlanMetrics(
+        completion_rate=_ratio(sum(p.titles[t] in done for t in planned), len(planned) or 1),
+        energy_alignment=_ratio(hit, steps),
+        flow_minutes=sum(m for m in minutes if m >= FLOW_BLOCK_MIN),
+        fragmentation=_ratio(n - len(planned), n),
+    )
+
+
+def _column(arrays: Iterable[array]):
+    """One int64 vector from many array('i') columns (joined in C, then read as one buffer)."""
+    joined = array("i")
+    for a in arrays:
+        joined += a
+    return np.frombuffer(joined, dtype=f"i{joined.itemsize}").astype(np.int64)
+
+
+def _vectorized(
+    packed: List[PackedPlan],
+    groups: List[Optional[int]],
+    highs: List[List[int]],
+    done_sets: List[set],
+) -> List[PlanMetrics]:
+    n_plans = len(packed)
+    counts = np.fromiter((len(p) for p in packed), dtype=np.int64, count=n_plans)
+    plan_of = np.repeat(np.arange(n_plans), counts)
+    starts = _column(p.starts for p in packed)
+    ends = _column(p.ends for p in packed)
+    minutes = ends - starts
+
+    # tasks: global id = per-plan id + offset into the concatenated title lists
+    offsets = np.cumsum([0] + [len(p.titles) for p in packed])
+    task_ids = np.unique(_column(p.tasks for p in packed) + offsets[:-1][plan_of])
+    task_plan = np.searchsorted(offsets, task_ids, side="right") - 1
+    planned = np.bincount(task_plan, minlength=n_plans)
+    if any(done_sets):
+        task_done = np.fromiter(
+            (t in done for p, done in zip(packed, done_sets) for t in p.titles), dtype=bool, count=int(offsets[-1])
+        )
+        done = np.bincount(task_plan, weights=task_done[task_ids], minlength=n_plans)
+    else:
+        done = np.zeros(n_plans)
+
+    flow = np.bincount(plan_of, weights=np.where(minutes >= FLOW_BLOCK_MIN, minutes, 0), minlength=n_plans)
+
+    # alignment: expand every block into its 15-min steps, look each up in its curve's keys
+    group_arr = np.array([-1 if g is None else g for g in groups], dtype=np.int64)
+    block_group = group_arr[plan_of]
+    n_steps = np.where(block_group >= 0, np.maximum(0, (minutes + STEP_MIN - 1) // STEP_MIN), 0)
+    total_steps = int(n_steps.sum())
+    step_block = np.repeat(np.arange(len(starts)), n_steps)
+    first = np.cumsum(n_steps) - n_steps
+    k = np.arange(total_steps) - first[step_block]
+    day_base = np.array([_abs_s(p.day, 0) for p in packed], dtype=np.int64)
+    step_keys = (
+        block_group[step_block] * _GROUP
+        + day_base[plan_of[step_block]]
+        + (starts[step_block] + k * STEP_MIN) * 60
+    )
+    high_keys = np.fromiter(
+        (g * _GROUP + key for g, keys in enumerate(highs) for key in keys), dtype=np.int64
+    )
+    step_plan = plan_of[step_block]
+    hits = np.bincount(step_plan, weights=np.isin(step_keys, high_keys), minlength=n_plans)
+    steps = np.bincount(step_plan, minlength=n_plans)
+
+    # plain Python values from here on (round() must match the scalar path exactly)
+    rows = zip(done.tolist(), planned.tolist(), hits.tolist(), steps.tolist(), flow.tolist(), counts.tolist())
+    return [
+        PlanMetrics(
+            completion_rate=_ratio(d, p or 1),
+            energy_alignment=_ratio(h, st),
+            flow_minutes=int(f),
+            fragmentation=_ratio(n - p, n),
+        )
+        for d, p, h, st, f, n in rows
+    ]
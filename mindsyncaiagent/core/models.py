@@ -1,7 +1,7 @@
 
 from __future__ import annotations
 from pydantic import BaseModel, Field
-from typing import List, Optional, Literal
+from typing import Dict, List, Optional, Literal
 from datetime import datetime, date
 
 
@@ -36,10 +36,70 @@ class DayPlan(BaseModel):
     blocks: List[Block] = Field(default_factory=list)
 
 
+class BusyInterval(BaseModel):
+    """A span of time the user is not available; with `rrule`, the first of a recurring series."""
+    start: datetime
+    end: datetime
+    rrule: Optional[str] = Field(None, description="RFC 5545 rule, e.g. 'FREQ=WEEKLY;BYDAY=MO,WE,FR'")
+
+
+class CompletionRecord(BaseModel):
+    """A past block and whether the user actually finished it."""
+    start: datetime
+    end: datetime
+    completed: bool = True
+
+
+class PlanDelta(BaseModel):
+    """A small edit to an existing plan, applied by the incremental re-planner."""
+    add: List[Task] = Field(default_factory=list)
+    remove: List[str] = Field(default_factory=list)          # task titles
+    estimates: Dict[str, int] = Field(default_factory=dict)  # title -> new est_minutes
+    busy: List[BusyInterval] = Field(default_factory=list)   # newly busy time
+
+
+class HorizonPlan(BaseModel):
+    """Consecutive day plans over a multi-day window, plus work that did not fit."""
+    start: date
+    days: List[DayPlan] = Field(default_factory=list)
+    unscheduled: Dict[str, int] = Field(default_factory=dict)  # title -> minutes left
+
+
+class SolverReport(BaseModel):
+    """How a plan was produced when the optimal solver ran next to greedy."""
+    solver: Literal["optimal", "greedy"]
+    completed: bool                       # search finished within its time budget
+    greedy_alignment: float
+    optimal_alignment: Optional[float] = None
+    elapsed_ms: float = 0.0
+    states: int = 0                       # DP states explored
+
+
 class DailySummary(BaseModel):
     """Aggregated stats and suggestions at the end of a day."""
     date: date
     completion_rate: float
     energy_alignment: float
     flow_minutes: int
+    fragmentation: float = 0.0   # share of blocks beyond one per task
     suggestions: List[str] = Field(default_factory=list)
+
+
+class PlanJob(BaseModel):
+    """One user's already parsed/classified tasks, scheduled by the batch planner."""
+    user_id: str
+    tasks: List[Task] = Field(default_factory=list)
+    day: date
+    profile: str = "balanced"
+    work_start_h: int = 9
+    work_end_h: int = 18
+    energy: Optional[bytes] = None        # packed per-user curve; overrides `profile`
+    completed: List[str] = Field(default_factory=list)   # titles already done that day
+
+
+class PlanResult(BaseModel):
+    """Batch planner output for one user; `error` is set instead of plan/summary on failure."""
+    user_id: str
+    plan: Optional[DayPlan] = None
+    summary: Optional[DailySummary] = None
+    error: Optional[str] = None
@@ -0,0 +1,106 @@
+# core/plan.py
+from __future__ import annotations
+
+from array import array
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterator, List, Tuple, Union
+
+from core.models import Block, DayPlan
+
+
+class PackedPlan:
+    """
+    Compact day plan used inside the scheduler and summarizer:
+      • blocks are parallel int arrays: start/end minute (from midnight of `day`) and task id,
+      • task ids index `titles`, so a title is stored once however many blocks it has.
+    Appending a block is three array appends (no per-block object, no validation).
+    Block times are minute-resolution; `to_day_plan` builds the pydantic DayPlan for
+    the API boundary and `from_day_plan` reads one back in.
+    """
+
+    __slots__ = ("day", "origin", "titles", "_ids", "starts", "ends", "tasks")
+
+    def __init__(self, day: date):
+        self.day = day
+        self.origin = datetime.combine(day, time(0, 0))
+        self.titles: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self.starts = array("i")
+        self.ends = array("i")
+        self.tasks = array("i")
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __repr__(self) -> str:
+        return f"PackedPlan(day={self.day.isoformat()}, blocks={len(self)})"
+
+    # --- minute <-> time ---
+    def minute_of(self, dt: datetime) -> int:
+        return int((dt - self.origin).total_seconds() // 60)
+
+    def time_of(self, minute: int) -> datetime:
+        return self.origin + timedelta(minutes=minute)
+
+    # --- building ---
+    def task_id(self, title: str) -> int:
+        tid = self._ids.get(title)
+        if tid is None:
+            tid = self._ids[title] = len(self.titles)
+            self.titles.append(title)
+        return tid
+
+    def append(self, tid: int, start_min: int, end_min: int) -> None:
+        self.starts.append(start_min)
+        self.ends.append(end_min)
+        self.tasks.append(tid)
+
+    def add(self, title: str, start: datetime, end: datetime) -> None:
+        self.append(self.task_id(title), self.minute_of(start), self.minute_of(end))
+
+    def merge_adjacent(self) -> "PackedPlan":
+        """Sort by start (then title) and fuse back-to-back blocks of the same task."""
+        titles, starts, ends, tasks = self.titles, self.starts, self.ends, self.tasks
+        order = sorted(range(len(starts)), key=lambda i: (starts[i], titles[tasks[i]]))
+        out_s, out_e, out_t = array("i"), array("i"), array("i")
+        for i in order:
+            if out_t and out_t[-1] == tasks[i] and out_e[-1] == starts[i]:
+                out_e[-1] = ends[i]
+            else:
+                out_s.append(starts[i])
+                out_e.append(ends[i])
+                out_t.append(tasks[i])
+        self.starts, self.ends, self.tasks = out_s, out_e, out_t
+        return self
+
+    # --- reading ---
+    def minutes(self) -> List[int]:
+        return [e - s for s, e in zip(self.starts, self.ends)]
+
+    def blocks(self) -> Iterator[Tuple[str, datetime, datetime]]:
+        """(title, start, end) per block."""
+        for s, e, tid in zip(self.starts, self.ends, self.tasks):
+            yield self.titles[tid], self.time_of(s), self.time_of(e)
+
+    def planned_titles(self) -> List[str]:
+        """Titles with at least one block."""
+        return [self.titles[tid] for tid in sorted(set(self.tasks))]
+
+    # --- pydantic boundary ---
+    def to_day_plan(self) -> DayPlan:
+        blocks = [Block(task_title=t, start=s, end=e) for t, s, e in self.blocks()]
+        return DayPlan(date=self.day, blocks=blocks)
+
+    @classmethod
+    def from_day_plan(cls, plan: DayPlan) -> "PackedPlan":
+        packed = cls(plan.date)
+        for b in plan.blocks:
+            packed.add(b.task_title, b.start, b.end)
+        return packed
+
+
+AnyPlan = Union[DayPlan, PackedPlan]
+
+
+def as_packed(plan: AnyPlan) -> PackedPlan:
+    return plan if isinstance(plan, PackedPlan) else PackedPlan.from_day_plan(plan)
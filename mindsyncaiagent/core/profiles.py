@@ -0,0 +1,222 @@
+# core/profiles.py
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time as _time
+from array import array
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from core.energy import EnergyCurve, energy_curve_for
+from core.models import CompletionRecord
+from core.quiz import infer_profile, normalize_hour_str
+from core.config import PROFILE_DB, PROFILE_CACHE_SIZE
+
+POINTS = 96          # 15-min points from 06:00, same grid as energy_curve_for
+ORIGIN_MIN = 6 * 60
+STEP_MIN = 15
+PRIOR_WEIGHT = 4.0   # history observations needed to move a slot halfway off the quiz prior
+
+
+def _hour_of(i: int) -> float:
+    return ((ORIGIN_MIN + STEP_MIN * i) % (24 * 60)) / 60.0
+
+
+def _quiz_prior(answers: Dict[str, Any]) -> List[float]:
+    """
+    Start from the nearest preset, then bend it to the user's own answers:
+      • deep-work start hour (+2h) and best meeting hour raise energy,
+      • before wake-up is low, after 20:00 scales with night alertness,
+      • the 13:00 dip deepens with post-lunch slump.
+    """
+    profile, _conf, _why = infer_profile(answers)
+    base = energy_curve_for(date(2000, 1, 3), profile).values
+    wake_h = normalize_hour_str(str(answers.get("wake_time", "7")))
+    peak_h = normalize_hour_str(str(answers.get("peak_block_start", "10")))
+    night_alert = max(0, min(5, int(answers.get("night_alert", 2))))
+    slump = max(0, min(5, int(answers.get("post_lunch_slump", 2))))
+    ideal_meet = normalize_hour_str(str(answers.get("ideal_meeting_time", "15")))
+
+    out: List[float] = []
+    for i in range(POINTS):
+        h = _hour_of(i)
+        v = base[i]
+        if peak_h <= h < peak_h + 2:
+            v = max(v, 0.9)
+        if ideal_meet <= h < ideal_meet + 1:
+            v = max(v, 0.7)
+        if 13 <= h < 14:
+            v = min(v, 0.45 - 0.05 * slump)
+        if h >= 20:
+            v = 0.1 + 0.15 * night_alert
+        if h < wake_h:
+            v = min(v, 0.1)
+        out.append(v)
+    return out
+
+
+def _history_rates(history: Iterable[CompletionRecord]) -> Tuple[List[int], List[int]]:
+    """Per-point (planned, completed) 15-min counts by time of day."""
+    planned = [0] * POINTS
+    done = [0] * POINTS
+    step = timedelta(minutes=STEP_MIN)
+    for rec in history:
+        t = rec.start.replace(second=0, microsecond=0)
+        t -= timedelta(minutes=t.minute % STEP_MIN)
+        while t < rec.end:
+            i = ((t.hour * 60 + t.minute - ORIGIN_MIN) % (24 * 60)) // STEP_MIN
+            if i < POINTS:
+                planned[i] += 1
+                done[i] += 1 if rec.completed else 0
+            t += step
+    return planned, done
+
+
+def fit_energy_values(answers: Dict[str, Any], history: Iterable[CompletionRecord] = ()) -> List[float]:
+    """
+    Per-user curve (POINTS values in [0..1]): the quiz prior, pulled toward the
+    observed completion rate of each time slot as history accumulates.
+    """
+    prior = _quiz_prior(answers)
+    planned, done = _history_rates(history)
+    out = []
+    for p, n, d in zip(prior, planned, done):
+        v = (PRIOR_WEIGHT * p + d) / (PRIOR_WEIGHT + n) if n else p
+        out.append(round(max(0.0, min(1.0, v)), 3))
+    return out
+
+
+def pack_values(values: Sequence[float]) -> bytes:
+    """POINTS floats in [0..1] -> POINTS uint8 bytes."""
+    if len(values) != POINTS:
+        raise ValueError(f"expected {POINTS} values, got {len(values)}")
+    return bytes(int(round(max(0.0, min(1.0, v)) * 255)) for v in values)
+
+
+def unpack_values(blob: bytes) -> array:
+    return array("d", (round(b / 255, 3) for b in blob))
+
+
+def curve_from_blob(blob: bytes, day: date) -> EnergyCurve:
+    return EnergyCurve(unpack_values(blob), day, ORIGIN_MIN, STEP_MIN)
+
+
+class ProfileStore:
+    """
+    Per-user energy curves as POINTS-byte uint8 blobs:
+      • memory: LRU of blobs (~100 bytes per user) bounded by `max_items`,
+      • disk:   optional SQLite table keyed by user_id (db_path None = memory only).
+    Lookups are one dict hit, or one primary-key read on a miss.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, max_items: int = 100_000):
+        self.max_items = max(1, int(max_items))
+        self._mem: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS user_energy ("
+                "user_id TEXT PRIMARY KEY, curve BLOB NOT NULL, updated REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    def get(self, user_id: str) -> Optional[bytes]:
+        with self._lock:
+            blob = self._mem.get(user_id)
+            if blob is not None:
+                self._mem.move_to_end(user_id)
+                return blob
+            if self._db is None:
+                return None
+            row = self._db.execute(
+                "SELECT curve FROM user_energy WHERE user_id = ?", (user_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._remember(user_id, bytes(row[0]))
+            return bytes(row[0])
+
+    def put(self, user_id: str, values: Sequence[float]) -> bytes:
+        blob = pack_values(values)
+        self.put_many([(user_id, blob)])
+        return blob
+
+    def put_many(self, items: Iterable[Tuple[str, bytes]]) -> int:
+        """Bulk upsert of (user_id, packed blob) pairs in one transaction."""
+        rows = [(uid, bytes(blob)) for uid, blob in items]
+        for _uid, blob in rows:
+            if len(blob) != POINTS:
+                raise ValueError(f"expected {POINTS}-byte curves")
+        with self._lock:
+            for uid, blob in rows:
+                self._remember(uid, blob)
+            if self._db is not None:
+                now = _time.time()
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO user_energy (user_id, curve, updated) VALUES (?, ?, ?)",
+                    [(uid, blob, now) for uid, blob in rows],
+                )
+                self._db.commit()
+        return len(rows)
+
+    def load(self, user_ids: Optional[Iterable[str]] = None) -> int:
+        """Bulk-load curves from disk into memory (all users, or just `user_ids`)."""
+        if self._db is None:
+            return 0
+        with self._lock:
+            if user_ids is None:
+                rows = self._db.execute(
+                    "SELECT user_id, curve FROM user_energy ORDER BY updated DESC LIMIT ?",
+                    (self.max_items,),
+                ).fetchall()
+            else:
+                ids = list(user_ids)
+                rows = []
+                for k in range(0, len(ids), 500):
+                    part = ids[k:k + 500]
+                    rows += self._db.execute(
+                        f"SELECT user_id, curve FROM user_energy WHERE user_id IN ({','.join('?' * len(part))})",
+                        part,
+                    ).fetchall()
+            for uid, blob in reversed(rows):
+                self._remember(uid, bytes(blob))
+        return len(rows)
+
+    def _remember(self, user_id: str, blob: bytes) -> None:
+        self._mem[user_id] = blob
+        self._mem.move_to_end(user_id)
+        while len(self._mem) > self.max_items:
+            self._mem.popitem(last=False)
+
+
+_store: Optional[ProfileStore] = None
+_store_lock = threading.Lock()
+
+
+def profile_store() -> ProfileStore:
+    """Process-wide store configured by PROFILE_DB / PROFILE_CACHE_SIZE."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ProfileStore(PROFILE_DB or None, PROFILE_CACHE_SIZE)
+    return _store
+
+
+def fit_user_profile(
+    user_id: str,
+    answers: Dict[str, Any],
+    history: Iterable[CompletionRecord] = (),
+) -> bytes:
+    """Fit and store a user's curve; returns the packed blob."""
+    return profile_store().put(user_id, fit_energy_values(answers, history))
+
+
+def user_energy_curve(user_id: str, day: date) -> Optional[EnergyCurve]:
+    """The user's learned curve anchored to `day`, or None when none is stored."""
+    blob = profile_store().get(user_id)
+    return None if blob is None else curve_from_blob(blob, day)
@@ -17,7 +17,7 @@ EnergyProfile = Literal["morning_lark", "balanced", "night_owl"]
 def _score_range(value: int, low: int, high: int) -> int:
     return 1 if low <= value <= high else 0
 
-def _normalize_hour_str(s: str) -> int:
+def normalize_hour_str(s: str) -> int:
    
     s = s.strip()
     if ":" in s:
@@ -28,11 +28,11 @@ def _normalize_hour_str(s: str) -> int:
 
 def infer_profile(answers: Dict[str, Any]) -> Tuple[EnergyProfile, float, str]:
     
-    wake_h = _normalize_hour_str(str(answers.get("wake_time", "7")))
-    peak_h = _normalize_hour_str(str(answers.get("peak_block_start", "10")))
+    wake_h = normalize_hour_str(str(answers.get("wake_time", "7")))
+    peak_h = normalize_hour_str(str(answers.get("peak_block_start", "10")))
     night_alert = int(answers.get("night_alert", 2))            
     slump = int(answers.get("post_lunch_slump", 2))            
-    ideal_meet = _normalize_hour_str(str(answers.get("ideal_meeting_time", "15")))
+    ideal_meet = normalize_hour_str(str(answers.get("ideal_meeting_time", "15")))
 
     score_morning = 0
     score_night = 0
@@ -0,0 +1,123 @@
+from __future__ import annotations
+from datetime import datetime, timedelta, date, time
+from typing import Iterable, Iterator, Tuple
+
+Slot = Tuple[datetime, datetime]
+
+
+class SlotGrid:
+    """
+    Integer-indexed view of one work window at `step_min` resolution.
+
+    Slot i covers [origin + i*step, origin + (i+1)*step). Occupancy is kept as
+    Python-int bitmasks (bit i == slot i), one per layer:
+      • busy:  external conflicts (meetings, calendar),
+      • fixed: reservations for fixed-time tasks,
+      • used:  chunks placed by the packer.
+    A run of k slots starting at i fits iff `free & run_mask(i, k) == run_mask(i, k)`,
+    so contiguity checks are a couple of integer ops instead of slot-by-slot scans.
+    """
+
+    __slots__ = ("day", "origin", "step_min", "n", "full", "busy", "fixed", "used")
+
+    def __init__(self, day: date, start_h: int = 9, end_h: int = 18, step_min: int = 15):
+        self.day = day
+        self.origin = datetime.combine(day, time(start_h, 0))
+        self.step_min = step_min
+        self.n = max(0, ((end_h - start_h) * 60) // step_min)
+        self.full = (1 << self.n) - 1
+        self.busy = 0
+        self.fixed = 0
+        self.used = 0
+
+    # --- index <-> time ---
+    def time_of(self, i: int) -> datetime:
+        return self.origin + timedelta(minutes=self.step_min * i)
+
+    @property
+    def end(self) -> datetime:
+        return self.time_of(self.n)
+
+    def index_floor(self, dt: datetime) -> int:
+        """Index of the slot containing `dt` (may fall outside [0, n))."""
+        return int((dt - self.origin).total_seconds() // (self.step_min * 60))
+
+    def index_ceil(self, dt: datetime) -> int:
+        step_s = self.step_min * 60
+        return -int(-(dt - self.origin).total_seconds() // step_s)
+
+    def slots_for(self, minutes: int) -> int:
+        """Number of slots needed to cover `minutes` (at least one)."""
+        return max(1, -(-int(minutes) // self.step_min))
+
+    def slot(self, i: int) -> Slot:
+        return (self.time_of(i), self.time_of(i + 1))
+
+    def slots(self) -> Iterator[Slot]:
+        for i in range(self.n):
+            yield self.slot(i)
+
+    # --- masks ---
+    def run_mask(self, i: int, k: int) -> int:
+        """Mask of k slots starting at i; 0 when the run leaves the grid."""
+        if i < 0 or k <= 0 or i + k > self.n:
+            return 0
+        return ((1 << k) - 1) << i
+
+    def span_mask(self, start: datetime, end: datetime) -> int:
+        """Mask of every slot overlapping [start, end), clipped to the grid."""
+        lo = max(0, self.index_floor(start))
+        hi = min(self.n, self.index_ceil(end))
+        if hi <= lo:
+            return 0
+        return ((1 << (hi - lo)) - 1) << lo
+
+    @property
+    def free(self) -> int:
+        return self.full & ~(self.busy | self.fixed | self.used)
+
+    def is_free(self, i: int) -> bool:
+        return 0 <= i < self.n and bool(self.free >> i & 1)
+
+    def fits(self, i: int, k: int) -> bool:
+        m = self.run_mask(i, k)
+        return m != 0 and (self.free & m) == m
+
+    def run_starts(self, k: int) -> int:
+        """Bitmask of every index where k consecutive free slots begin."""
+        f = self.free
+        m = f
+        for j in range(1, k):
+            m &= f >> j
+        return m
+
+    def free_indices(self) -> Iterator[int]:
+        f = self.free
+        while f:
+            low = f & -f
+            yield low.bit_length() - 1
+            f ^= low
+
+    def load(self) -> int:
+        """Number of slots taken by any layer."""
+        return bin((self.busy | self.fixed | self.used) & self.full).count("1")
+
+    # --- mutation ---
+    def mark_busy(self, intervals: Iterable[Slot]) -> None:
+        for s, e in intervals:
+            self.busy |= self.span_mask(s, e)
+
+    def reserve(self, start: datetime, end: datetime) -> None:
+        self.fixed |= self.span_mask(start, end)
+
+    def occupy(self, i: int, k: int) -> None:
+        self.used |= self.run_mask(i, k)
+
+    def release(self, i: int, k: int) -> None:
+        self.used &= ~self.run_mask(i, k)
+
+    def occupy_span(self, start: datetime, end: datetime) -> None:
+        self.used |= self.span_mask(start, end)
+
+    def release_span(self, start: datetime, end: datetime) -> None:
+        self.used &= ~self.span_mask(start, end)
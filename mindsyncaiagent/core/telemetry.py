@@ -0,0 +1,211 @@
+# core/telemetry.py
+"""
+Process-wide timing/counting layer for the planning pipeline.
+  • span(stage):        wall time of a pipeline stage (parse, classify, pack, ...),
+  • llm_call(agent):    LLM call count, latency and outcome per agent,
+  • count(name, n):     plain counters (cache hits/misses, slots examined, ...),
+  • collect():          per-request trace, read back as a `timings` dict.
+Aggregates render in Prometheus text format via `render_prometheus()`.
+With TELEMETRY=0 every hook returns immediately (one global check).
+"""
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional, Tuple
+
+from core.config import TELEMETRY_ENABLED
+
+Labels = Tuple[Tuple[str, str], ...]
+
+_lock = threading.Lock()
+_counters: Dict[Tuple[str, Labels], float] = {}
+_summaries: Dict[Tuple[str, Labels], list] = {}   # [count, sum_seconds]
+_trace: ContextVar[Optional["Trace"]] = ContextVar("telemetry_trace", default=None)
+
+_HELP = {
+    "mindsync_stage_seconds": ("summary", "Wall time per pipeline stage."),
+    "mindsync_llm_call_seconds": ("summary", "LLM call latency per agent."),
+    "mindsync_llm_calls_total": ("counter", "LLM calls per agent and outcome."),
+    "mindsync_llm_hedges_total": ("counter", "Duplicate LLM requests started for slow calls."),
+    "mindsync_llm_rejected_total": ("counter", "LLM calls skipped (circuit open or budget spent)."),
+    "mindsync_cache_requests_total": ("counter", "Cache lookups per cache and result."),
+    "mindsync_parse_short_circuit_total": ("counter", "Task lines parsed by the grammar without an LLM."),
+    "mindsync_advice_late_total": ("counter", "Plans returned before the scheduler's LLM advice arrived."),
+    "mindsync_slots_examined_total": ("counter", "Candidate slots scanned by the packer."),
+}
+
+
+def enabled() -> bool:
+    return TELEMETRY_ENABLED
+
+
+class Trace:
+    """Per-request accumulator: stage -> milliseconds, plus counter totals."""
+
+    __slots__ = ("stages", "counts", "_lock")
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        self.counts: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def add_stage(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds * 1000.0
+
+    def add_count(self, name: str, n: float) -> None:
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + n
+
+    def as_dict(self) -> Dict[str, Dict[str, float]]:
+        return {
+            "stages_ms": {k: round(v, 3) for k, v in self.stages.items()},
+            "counts": dict(self.counts),
+        }
+
+
+def _labels(labels: Dict[str, str]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _observe(name: str, seconds: float, labels: Labels) -> None:
+    with _lock:
+        s = _summaries.get((name, labels))
+        if s is None:
+            _summaries[(name, labels)] = [1, seconds]
+        else:
+            s[0] += 1
+            s[1] += seconds
+
+
+def count(name: str, n: float = 1, **labels: str) -> None:
+    """Add `n` to counter `mindsync_<name>_total{labels}` (and to the active trace)."""
+    if not TELEMETRY_ENABLED:
+        return
+    key = (f"mindsync_{name}_total", _labels(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + n
+    tr = _trace.get()
+    if tr is not None:
+        suffix = ".".join(str(v) for _k, v in key[1])
+        tr.add_count(f"{name}.{suffix}" if suffix else name, n)
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ("stage", "t0")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        dt = time.perf_counter() - self.t0
+        _observe("mindsync_stage_seconds", dt, (("stage", self.stage),))
+        tr = _trace.get()
+        if tr is not None:
+            tr.add_stage(self.stage, dt)
+        return False
+
+
+def span(stage: str):
+    """Context manager timing one pipeline stage."""
+    if not TELEMETRY_ENABLED:
+        return _NOOP
+    return _Span(stage)
+
+
+class _LLMCall:
+    __slots__ = ("agent", "t0")
+
+    def __init__(self, agent: str):
+        self.agent = agent
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        dt = time.perf_counter() - self.t0
+        _observe("mindsync_llm_call_seconds", dt, (("agent", self.agent),))
+        count("llm_calls", agent=self.agent, outcome="error" if exc_type else "ok")
+        tr = _trace.get()
+        if tr is not None:
+            tr.add_stage(f"llm.{self.agent}", dt)
+        return False
+
+
+def llm_call(agent: str):
+    """Context manager around one LLM round-trip (counts errors raised inside it)."""
+    if not TELEMETRY_ENABLED:
+        return _NOOP
+    return _LLMCall(agent)
+
+
+@contextmanager
+def collect() -> Iterator[Optional[Trace]]:
+    """Trace everything recorded in this context (and tasks/threads copied from it)."""
+    if not TELEMETRY_ENABLED:
+        yield None
+        return
+    tr = Trace()
+    token = _trace.set(tr)
+    try:
+        yield tr
+    finally:
+        _trace.reset(token)
+
+
+def _escape(v: str) -> str:
+    return v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _fmt_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+def render_prometheus() -> str:
+    """All aggregates in Prometheus text exposition format (v0.0.4)."""
+    with _lock:
+        counters = dict(_counters)
+        summaries = {k: list(v) for k, v in _summaries.items()}
+    lines = []
+    names = sorted({n for n, _ in counters} | {n for n, _ in summaries})
+    for name in names:
+        kind, help_text = _HELP.get(name, ("counter" if name in {n for n, _ in counters} else "summary", name))
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for (n, labels), v in sorted(counters.items()):
+            if n == name:
+                lines.append(f"{name}{_fmt_labels(labels)} {v:g}")
+        for (n, labels), (c, total) in sorted(summaries.items()):
+            if n == name:
+                lines.append(f"{name}_count{_fmt_labels(labels)} {c}")
+                lines.append(f"{name}_sum{_fmt_labels(labels)} {total:.6f}")
+    return "\n".join(lines) + "\n"
+
+
+def reset() -> None:
+    with _lock:
+        _counters.clear()
+        _summaries.clear()
@@ -1,66 +1,138 @@
 # graph/plan_graph.py
 from __future__ import annotations
-from typing import TypedDict
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextvars import ContextVar, copy_context
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Sequence, TypedDict
 from datetime import date
 
 try:
-    from langgraph.graph import StateGraph, END
+    from langgraph.graph import StateGraph, START, END
+    from langchain_core.runnables import RunnableLambda
 except Exception:
     StateGraph = None
+    START = None
     END = None
+    RunnableLambda = None
+try:
+    from langgraph.config import get_stream_writer
+except Exception:
+    get_stream_writer = None
 
 from core.models import Task, DayPlan, DailySummary
-from agents.parser import parse_task
-from agents.classifier import classify_effort
-from agents.scheduler import greedy_schedule
+from core.energy import energy_curve_for
+from core.config import PLAN_CONCURRENCY
+from agents.parser import parse_task, aparse_task, parse_tasks, aparse_tasks
+from agents.classifier import classify_effort, aclassify_effort
+from agents.scheduler import greedy_schedule, agreedy_schedule
 from agents.summarizer import summarize
 
 
 class State(TypedDict, total=False):
     raw_text: str
     task: Task
+    # many-line runs: all lines parsed/classified in parallel, planned together
+    raw_texts: List[str]
+    tasks: List[Task]
+    day: date
+    profile: str
     plan: DayPlan
     summary: DailySummary
 
+
+Event = Dict[str, Any]
+
+# writer used by SequentialGraph.stream/astream; the compiled graph uses LangGraph's
+_fallback_writer: ContextVar[Optional[Callable[[Event], None]]] = ContextVar("plan_graph_writer", default=None)
+
+
+def _emit(event: Event) -> None:
+    """Send a progress event to whoever is streaming this run (no-op otherwise)."""
+    w = _fallback_writer.get()
+    if w is None and get_stream_writer is not None:
+        try:
+            w = get_stream_writer()
+        except Exception:
+            return
+    if w is not None:
+        w(event)
+
+
 def node_parse(state: State) -> State:
-    """Raw text → Task"""
+    """Raw text → Task (or raw_texts → tasks, one batched parse)"""
+    texts = state.get("raw_texts")
+    if texts:
+        tasks = parse_tasks(list(texts))
+        for i, t in enumerate(tasks):
+            _emit({"type": "parsed", "index": i, "task": t})
+        state["tasks"] = tasks
+        return state
     # Parse raw_text into a Task and store it in state['task'].
     raw = state.get("raw_text")
     if not raw:
         return state
     t = parse_task(raw)
+    _emit({"type": "parsed", "index": 0, "task": t})
     state["task"] = t
     return state
 
 
 def node_classify(state: State) -> State:
-    """Task → (effort, confidence)"""
+    """Task → (effort, confidence); many tasks are classified concurrently"""
+    tasks = state.get("tasks")
+    if tasks:
+        out: List[Optional[Task]] = [None] * len(tasks)
+        with ThreadPoolExecutor(max_workers=max(1, min(PLAN_CONCURRENCY, len(tasks)))) as pool:
+            futures = {pool.submit(copy_context().run, classify_effort, t): i for i, t in enumerate(tasks)}
+            for fut in as_completed(futures):
+                i = futures[fut]
+                out[i] = fut.result()
+                _emit({"type": "classified", "index": i, "task": out[i]})
+        state["tasks"] = out  # type: ignore[typeddict-item]
+        return state
     # Classify the task and update state['task'] with effort/confidence.
     t = state.get("task")
     if not t:
         return state
     state["task"] = classify_effort(t)
+    _emit({"type": "classified", "index": 0, "task": state["task"]})
     return state
 
 
-def node_schedule(state: State) -> State:
-    """Task(+effort) → DayPlan (today by default)"""
-    # Schedule the task into a DayPlan and store in state['plan'].
-    t = state.get("task")
-    if not t:
-        return state
-    # determine target day: use task.deadline.date() if present and a date, else today
-    from datetime import date
-    target_day = date.today()
+def _target_day(t: Task) -> date:
+    # use task.deadline.date() if present and a date, else today
     try:
         if getattr(t, "deadline", None) is not None:
-            d = t.deadline
-            target_day = d.date()
+            return t.deadline.date()
     except Exception:
-        target_day = date.today()
+        pass
+    return date.today()
 
-    plan = greedy_schedule([t], target_day)
-    state["plan"] = plan
+
+def _schedule_args(state: State):
+    """(tasks, day, curve) for the schedule/summary nodes, or None when nothing to plan."""
+    tasks = state.get("tasks")
+    if tasks:
+        day = state.get("day") or date.today()
+    elif state.get("task"):
+        tasks = [state["task"]]
+        day = state.get("day") or _target_day(state["task"])
+    else:
+        return None
+    profile = state.get("profile")
+    curve = energy_curve_for(day, profile) if profile else None  # type: ignore[arg-type]
+    return tasks, day, curve
+
+
+def node_schedule(state: State) -> State:
+    """Task(s)(+effort) → one DayPlan (today by default)"""
+    # Schedule every task together into a DayPlan and store in state['plan'].
+    args = _schedule_args(state)
+    if args is None:
+        return state
+    tasks, day, curve = args
+    state["plan"] = greedy_schedule(tasks, day, energy_curve=curve)
+    _emit({"type": "plan", "plan": state["plan"]})
     return state
 
 
@@ -70,73 +142,153 @@ def node_summary(state: State) -> State:
     p = state.get("plan")
     if not p:
         return state
-    summary = summarize(p, completed_titles=[])
-    state["summary"] = summary
+    args = _schedule_args(state)
+    curve = args[2] if args else None
+    state["summary"] = summarize(p, completed_titles=[], energy_curve=curve)
+    _emit({"type": "summary", "summary": state["summary"]})
+    return state
+
+
+async def anode_parse(state: State) -> State:
+    texts = state.get("raw_texts")
+    if texts:
+        tasks = await aparse_tasks(list(texts), concurrency=PLAN_CONCURRENCY)
+        for i, t in enumerate(tasks):
+            _emit({"type": "parsed", "index": i, "task": t})
+        state["tasks"] = tasks
+        return state
+    raw = state.get("raw_text")
+    if not raw:
+        return state
+    state["task"] = await aparse_task(raw)
+    _emit({"type": "parsed", "index": 0, "task": state["task"]})
+    return state
+
+
+async def anode_classify(state: State) -> State:
+    tasks = state.get("tasks")
+    if tasks:
+        sem = asyncio.Semaphore(PLAN_CONCURRENCY)
+        out: List[Optional[Task]] = [None] * len(tasks)
+
+        async def one(i: int, t: Task) -> None:
+            async with sem:
+                out[i] = await aclassify_effort(t)
+            _emit({"type": "classified", "index": i, "task": out[i]})
+
+        await asyncio.gather(*(one(i, t) for i, t in enumerate(tasks)))
+        state["tasks"] = out  # type: ignore[typeddict-item]
+        return state
+    t = state.get("task")
+    if not t:
+        return state
+    state["task"] = await aclassify_effort(t)
+    _emit({"type": "classified", "index": 0, "task": state["task"]})
+    return state
+
+
+async def anode_schedule(state: State) -> State:
+    args = _schedule_args(state)
+    if args is None:
+        return state
+    tasks, day, curve = args
+    state["plan"] = await agreedy_schedule(tasks, day, energy_curve=curve)
+    _emit({"type": "plan", "plan": state["plan"]})
+    return state
+
+
+async def anode_summary(state: State) -> State:
+    p = state.get("plan")
+    if not p:
+        return state
+    args = _schedule_args(state)
+    curve = args[2] if args else None
+    state["summary"] = await asyncio.to_thread(summarize, p, completed_titles=[], energy_curve=curve)
+    _emit({"type": "summary", "summary": state["summary"]})
     return state
 
 
+_STEPS = (
+    ("parse", node_parse, anode_parse),
+    ("classify", node_classify, anode_classify),
+    ("schedule", node_schedule, anode_schedule),
+    ("summary", node_summary, anode_summary),
+)
+
+
+class SequentialGraph:
+    """
+    Stand-in for the compiled LangGraph app when langgraph is not installed:
+    same invoke/ainvoke/batch/abatch surface, nodes applied in order, and
+    stream/astream of the nodes' progress events (LangGraph's "custom" mode).
+    """
+
+    def invoke(self, state: State, config: Any = None) -> State:
+        s: State = dict(state)  # type: ignore[assignment]
+        for _name, fn, _afn in _STEPS:
+            s = fn(s)
+        return s
+
+    async def ainvoke(self, state: State, config: Any = None) -> State:
+        s: State = dict(state)  # type: ignore[assignment]
+        for _name, _fn, afn in _STEPS:
+            s = await afn(s)
+        return s
+
+    def batch(self, states: Sequence[State], config: Any = None) -> List[State]:
+        return [self.invoke(s) for s in states]
+
+    async def abatch(self, states: Sequence[State], config: Any = None) -> List[State]:
+        return list(await asyncio.gather(*(self.ainvoke(s) for s in states)))
+
+    def stream(self, state: State, config: Any = None, stream_mode: str = "custom") -> Iterator[Event]:
+        s: State = dict(state)  # type: ignore[assignment]
+        for _name, fn, _afn in _STEPS:
+            events: List[Event] = []
+            token = _fallback_writer.set(events.append)
+            try:
+                s = fn(s)
+            finally:
+                _fallback_writer.reset(token)
+            yield from events
+
+    async def astream(self, state: State, config: Any = None, stream_mode: str = "custom") -> AsyncIterator[Event]:
+        queue: asyncio.Queue = asyncio.Queue()
+        done = object()
+        token = _fallback_writer.set(queue.put_nowait)
+        try:
+            run = asyncio.ensure_future(self.ainvoke(state))  # copies the context (writer) now
+        finally:
+            _fallback_writer.reset(token)
+        run.add_done_callback(lambda _f: queue.put_nowait(done))
+        while (item := await queue.get()) is not done:
+            yield item
+        run.result()
+
+
 def build_graph():
     """
     Returns a compiled LangGraph app that runs:
         parse → classify → schedule → summary
+    (or a SequentialGraph with the same interface when langgraph is unavailable).
+    Each node has a sync and an async implementation, so `invoke`/`batch` and
+    `ainvoke`/`abatch` both run the pipeline exactly once per input.
     """
-    # Build a langgraph-backed runner when available, otherwise provide
-    # a safe sequential runner that applies the nodes in order.
-    g = None
-    run_graph_callable = None
+    if StateGraph is None or RunnableLambda is None:
+        return SequentialGraph()
 
-    if StateGraph is not None:
-        try:
-            try:
-                g = StateGraph(state_schema=State)
-            except TypeError:
-                g = StateGraph()
-
-            if g is not None:
-                # add nodes and edges
-                g.add_node("parse", node_parse)
-                g.add_node("classify", node_classify)
-                g.add_node("schedule", node_schedule)
-                g.add_node("summary", node_summary)
-                g.add_edge("parse", "classify")
-                g.add_edge("classify", "schedule")
-                g.add_edge("schedule", "summary")
-
-                def _invoke_langgraph(state: State) -> State:
-                    # Try typical invocation methods; if none work, raise.
-                    for method in ("run", "invoke", "execute", "__call__"):
-                        fn = getattr(g, method, None)
-                        if fn is None:
-                            continue
-                        try:
-                            return fn(state)
-                        except Exception:
-                            continue
-                    raise RuntimeError("unable to invoke StateGraph with known methods")
-
-                run_graph_callable = _invoke_langgraph
-        except Exception:
-            run_graph_callable = None
-
-    # Fallback sequential runner
-    def runner(state: State) -> State:
-        s = dict(state)
-        s = node_parse(s)
-        s = node_classify(s)
-        s = node_schedule(s)
-        s = node_summary(s)
-        return s
+    g = StateGraph(State)
+    prev = START
+    for name, fn, afn in _STEPS:
+        g.add_node(name, RunnableLambda(fn, afunc=afn, name=name))
+        g.add_edge(prev, name)
+        prev = name
+    g.add_edge(prev, END)
+    return g.compile()
 
-    # Wrap: prefer langgraph runner, but on any error fall back to sequential runner
-    def graph_runner(state: State) -> State:
-        if run_graph_callable is not None:
-            try:
-                return run_graph_callable(state)
-            except Exception:
-                return runner(state)
-        return runner(state)
 
-    return graph_runner
+# compiled once at import; reused by every request
+plan_graph = build_graph()
 
 
 def run_once(raw_text: str) -> State:
@@ -144,9 +296,47 @@ def run_once(raw_text: str) -> State:
     Convenience wrapper used by app.py:
     input raw text → returns final state with task, plan, summary.
     """
-    # Build and run the graph (or the safe fallback runner).
-    # HINT: The initial state is {"raw_text": raw_text}
-    g = build_graph()
-    initial: State = {"raw_text": raw_text}
-    return g(initial)
+    return plan_graph.invoke({"raw_text": raw_text})
+
 
+async def arun_once(raw_text: str) -> State:
+    return await plan_graph.ainvoke({"raw_text": raw_text})
+
+
+def run_batch(texts: Sequence[str], max_concurrency: Optional[int] = None) -> List[State]:
+    """One pipeline run per line; runs are independent and execute concurrently."""
+    config = {"max_concurrency": max_concurrency} if max_concurrency else None
+    return plan_graph.batch([{"raw_text": t} for t in texts], config)
+
+
+def run_many(raw_texts: Sequence[str], day: Optional[date] = None, profile: Optional[str] = None) -> State:
+    """
+    Many lines → one plan: batch-parse, classify concurrently, then schedule all
+    tasks together into a single DayPlan and summarize it.
+    """
+    return plan_graph.invoke(_many_state(raw_texts, day, profile))
+
+
+def stream_many(raw_texts: Sequence[str], day: Optional[date] = None, profile: Optional[str] = None) -> Iterator[Event]:
+    """
+    Like `run_many`, but yields progress events as they become available:
+      {"type": "parsed"|"classified", "index": i, "task": Task}, then
+      {"type": "plan", "plan": DayPlan} and {"type": "summary", "summary": DailySummary}.
+    """
+    yield from plan_graph.stream(_many_state(raw_texts, day, profile), stream_mode="custom")
+
+
+async def astream_many(
+    raw_texts: Sequence[str], day: Optional[date] = None, profile: Optional[str] = None
+) -> AsyncIterator[Event]:
+    async for event in plan_graph.astream(_many_state(raw_texts, day, profile), stream_mode="custom"):
+        yield event
+
+
+def _many_state(raw_texts: Sequence[str], day: Optional[date], profile: Optional[str]) -> State:
+    state: State = {"raw_texts": list(raw_texts)}
+    if day is not None:
+        state["day"] = day
+    if profile:
+        state["profile"] = profile
+    return state
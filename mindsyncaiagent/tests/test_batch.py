@@ -0,0 +1,49 @@
+import sys
+import os
+import json
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from fastapi.testclient import TestClient
+
+from api import app
+from agents.batch import plan_job, plan_many
+from core.models import PlanJob, Task
+
+DAY = date(2030, 1, 7)
+
+
+def _jobs():
+    return [
+        PlanJob(
+            user_id=f"u{i}",
+            tasks=[Task(title="deep work", est_minutes=60 + 15 * i, effort="high"),
+                   Task(title="inbox", est_minutes=30, effort="low")],
+            day=DAY,
+            profile=("balanced", "night_owl")[i % 2],
+        )
+        for i in range(4)
+    ]
+
+
+def test_plan_many_matches_inline_across_processes():
+    expected = {j.user_id: plan_job(j) for j in _jobs()}
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        got = {r.user_id: r for r in plan_many(_jobs(), executor=pool)}
+    assert got == expected
+    assert all(r.error is None and r.plan.blocks for r in got.values())
+
+
+def test_plan_batch_streams_one_line_per_user():
+    users = [
+        {"user_id": "a", "tasks": ["Write report", "Review slides"], "day": "2030-01-07"},
+        {"user_id": "b", "tasks": ["Reply to email"], "day": "not-a-day"},
+    ]
+    with TestClient(app) as client:
+        r = client.post("/plan/batch", json={"users": users})
+    assert r.status_code == 200
+    lines = {d["user_id"]: d for d in map(json.loads, r.text.strip().splitlines())}
+    assert lines["a"]["error"] is None and lines["a"]["plan"]["blocks"]
+    assert lines["b"]["error"] and lines["b"]["plan"] is None
@@ -0,0 +1,128 @@
+import sys
+import os
+from datetime import date, datetime, time, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from core.calendar import BusyCalendar
+from agents.scheduler import greedy_schedule
+from core.models import Task
+
+DAY = date(2030, 1, 7)
+
+
+def _at(h: int, m: int = 0, day: date = DAY) -> datetime:
+    return datetime.combine(day, time(h, m))
+
+
+def test_intervals_merge_and_query():
+    cal = BusyCalendar([(_at(9), _at(10)), (_at(9, 30), _at(11)), (_at(14), _at(15)), (_at(11), _at(11, 30))])
+    assert list(cal) == [(_at(9), _at(11, 30)), (_at(14), _at(15))]
+    assert cal.between(_at(11), _at(14)) == [(_at(9), _at(11, 30))]
+    assert cal.is_busy(_at(14, 30)) and not cal.is_busy(_at(15))
+    assert cal.free_between(_at(8), _at(16)) == [(_at(8), _at(9)), (_at(11, 30), _at(14)), (_at(15), _at(16))]
+
+
+def test_ics_and_json_exports_feed_the_scheduler():
+    ics = "\r\n".join([
+        "BEGIN:VCALENDAR",
+        "BEGIN:VEVENT", "DTSTART:20300107T090000", "DTEND:20300107T120000", "SUMMARY:Offsite", "END:VEVENT",
+        "BEGIN:VEVENT", "DTSTART:20300107T130000", "DURATION:PT1H", "TRANSP:TRANSPARENT", "END:VEVENT",
+        "BEGIN:VEVENT", "DTSTART:20300107T150000", "DURATION:PT30M", "STATUS:CANCELLED", "END:VEVENT",
+        "END:VCALENDAR",
+    ])
+    cal = BusyCalendar.from_ics(ics)
+    assert list(cal) == [(_at(9), _at(12))]
+    assert list(BusyCalendar.from_json('{"busy": [{"start": "2030-01-07T09:00", "end": "2030-01-07T12:00"}]}')) == list(cal)
+
+    # thousands of events on other days cost nothing for this one
+    cal.add((_at(9, day=DAY + timedelta(days=d)), _at(17, day=DAY + timedelta(days=d))) for d in range(1, 5000))
+    plan = greedy_schedule([Task(title="deep", est_minutes=120, effort="high")], DAY, busy=cal, use_llm=False)
+    assert plan.blocks and all(b.start >= _at(12) for b in plan.blocks)
+
+
+def test_recurring_busy_expands_only_inside_the_window():
+    ics = "\r\n".join([
+        "BEGIN:VCALENDAR",
+        "BEGIN:VEVENT", "DTSTART:20000103T093000", "DTEND:20000103T100000",
+        "RRULE:FREQ=WEEKLY;BYDAY=MO,WE;UNTIL=20401231T235959Z",
+        "EXDATE:20300109T093000", "SUMMARY:Standup", "END:VEVENT",
+        "END:VCALENDAR",
+    ])
+    cal = BusyCalendar.from_ics(ics)
+    assert list(cal) == [] and len(cal) == 1      # one rule, no stored occurrences
+    assert cal.on(DAY) == [(_at(9, 30), _at(10))]
+    assert cal.on(DAY + timedelta(days=2)) == []  # excluded Wednesday
+    assert cal.is_busy(_at(9, 45, DAY + timedelta(days=7))) and not cal.is_busy(_at(10, 0))
+
+    daily = BusyCalendar.from_intervals([{"start": "2030-01-07T09:00", "end": "2030-01-07T12:00", "rrule": "FREQ=DAILY"}])
+    plan = greedy_schedule([Task(title="deep", est_minutes=60, effort="high")], DAY + timedelta(days=400),
+                           busy=daily, use_llm=False)
+    assert plan.blocks and all(b.start.hour >= 12 for b in plan.blocks)
+
+
+def test_plan_endpoint_accepts_recurring_busy():
+    from fastapi.testclient import TestClient
+    from api import app
+
+    busy = [{"start": "2030-01-01T09:00:00", "end": "2030-01-01T13:00:00", "rrule": "FREQ=DAILY"}]
+    r = TestClient(app).post("/plan", json={"tasks": ["Write report; 1h"], "day": DAY.isoformat(), "busy": busy})
+    assert r.status_code == 200
+    assert all(b["start"] >= _at(13).isoformat() for b in r.json()["plan"]["blocks"])
+
+    bad = [{"start": "2030-01-01T09:00:00", "end": "2030-01-01T10:00:00", "rrule": "FREQ=SOMETIMES"}]
+    assert TestClient(app).post("/plan", json={"tasks": ["x; 1h"], "busy": bad}).status_code == 400
+
+
+def test_long_running_rules_query_from_the_window():
+    from dateutil.rrule import rrulestr
+    import time as _t
+
+    cal = BusyCalendar()
+    rules = ("FREQ=DAILY", "FREQ=DAILY;INTERVAL=3", "FREQ=WEEKLY;BYDAY=MO,WE,FR", "FREQ=WEEKLY;COUNT=5000")
+    for i in range(1000):
+        start = datetime(2000, 1, 3, 8) + timedelta(minutes=15 * (i % 40))
+        cal.add_rule(rules[i % len(rules)], start, start + timedelta(minutes=15))
+
+    t0 = _t.perf_counter()
+    week = [cal.on(DAY + timedelta(days=d)) for d in range(7)]
+    assert _t.perf_counter() - t0 < 5.0   # ~30 years of occurrences are never walked
+
+    day_start = _at(0)
+    for rule in rules:
+        first = datetime(2000, 1, 3, 8)
+        occ = rrulestr(rule, dtstart=first).between(day_start - timedelta(minutes=15), day_start + timedelta(days=1))
+        assert all(any(s <= o < e for s, e in week[0]) for o in occ), rule
+    assert week[0] and all(s.date() == DAY for s, _e in week[0])
+
+
+def test_replan_endpoint_uses_request_busy():
+    from fastapi.testclient import TestClient
+    from api import app
+
+    busy = [{"start": "2030-01-01T09:00:00", "end": "2030-01-01T14:00:00", "rrule": "FREQ=DAILY"}]
+    body = {"plan": {"date": DAY.isoformat(), "blocks": []}, "tasks": [], "add_lines": ["Call mom; 1h"], "busy": busy}
+    r = TestClient(app).post("/plan/replan", json=body)
+    assert r.status_code == 200
+    blocks = r.json()["plan"]["blocks"]
+    assert blocks and all(b["start"] >= _at(14).isoformat() for b in blocks)
+
+
+def test_plan_endpoint_imports_ics_text_only():
+    from fastapi.testclient import TestClient
+    from api import app
+
+    ics = "\r\n".join([
+        "BEGIN:VCALENDAR",
+        "BEGIN:VEVENT", "DTSTART:20300101T090000", "DTEND:20300101T120000",
+        "RRULE:FREQ=DAILY;COUNT=30", "END:VEVENT",
+        "END:VCALENDAR",
+    ])
+    busy = [{"start": _at(12).isoformat(), "end": _at(14).isoformat()}]
+    body = {"tasks": ["Write report; 1h"], "day": DAY.isoformat(), "busy": busy, "busy_ics": ics}
+    r = TestClient(app).post("/plan", json=body)
+    assert r.status_code == 200
+    assert all(b["start"] >= _at(14).isoformat() for b in r.json()["plan"]["blocks"])
+
+    body["busy_ics"] = os.path.abspath(__file__)   # a path is not iCalendar text
+    assert TestClient(app).post("/plan", json=body).status_code == 400
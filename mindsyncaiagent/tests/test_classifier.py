@@ -0,0 +1,65 @@
+import sys
+import os
+from types import SimpleNamespace
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from agents import classifier
+from core.models import Task
+
+
+class FakeChat:
+    def __init__(self, reply):
+        self.reply = reply
+        self.calls = 0
+
+    def invoke(self, _messages):
+        self.calls += 1
+        return SimpleNamespace(content=self.reply)
+
+
+@pytest.fixture
+def chat(monkeypatch):
+    fake = FakeChat("high")
+    monkeypatch.setattr(classifier, "get_llm", lambda *a, **k: fake)
+    monkeypatch.setattr(classifier, "CLASSIFIER_SHORT_CIRCUIT", True)
+    classifier.clear_classify_cache()
+    yield fake
+    classifier.clear_classify_cache()
+
+
+def test_keywords_short_circuit_the_llm(chat):
+    t = classifier.classify_effort(Task(title="Write quarterly report"))
+    assert (t.effort, t.confidence) == ("high", 0.85)
+    t = classifier.classify_effort(Task(title="Reply to email"))
+    assert (t.effort, t.confidence) == ("low", 0.75)
+    assert chat.calls == 0
+
+
+def test_llm_verdicts_are_cached(chat):
+    first = classifier.classify_effort(Task(title="Plan offsite", notes="venue"))
+    second = classifier.classify_effort(Task(title="Plan offsite", notes="venue"))
+    assert first.effort == second.effort == "high"
+    assert chat.calls == 1
+    classifier.classify_effort(Task(title="Plan offsite", notes="budget"))
+    assert chat.calls == 2
+
+
+def test_low_keywords_defer_to_llm_without_short_circuit(chat, monkeypatch):
+    monkeypatch.setattr(classifier, "CLASSIFIER_SHORT_CIRCUIT", False)
+    t = classifier.classify_effort(Task(title="Call with investors"))
+    assert (t.effort, t.confidence) == ("high", 0.8) and chat.calls == 1
+
+
+def test_added_keywords_use_substring_matching(monkeypatch):
+    monkeypatch.setattr(classifier, "EFFORT_KEYWORDS", {k: list(v) for k, v in classifier.EFFORT_KEYWORDS.items()})
+    classifier.add_keywords("high", ["refactor"])
+    try:
+        assert "high" in classifier._keyword_hits(Task(title="Refactoring the parser"))
+    finally:
+        monkeypatch.undo()
+        classifier._compile_keywords()
@@ -0,0 +1,29 @@
+import sys
+import os
+from datetime import date, datetime, time, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from core.energy import EnergyCurve, energy_curve_for
+
+DAY = date(2030, 1, 7)
+
+
+def test_curve_behaves_like_point_list():
+    curve = energy_curve_for(DAY, "morning_lark")
+    points = list(curve)
+    assert len(points) == 96 and points[0] == (datetime.combine(DAY, time(6)), 0.3)
+    assert points[-1][0] == datetime.combine(DAY + timedelta(days=1), time(5, 45))
+    lookup = dict(points)
+    for m in range(0, 36 * 60, 5):
+        t = datetime.combine(DAY, time(0)) + timedelta(minutes=m)
+        assert curve.get(t, 0.0) == lookup.get(t, 0.0)
+
+
+def test_curves_share_memoized_values_across_days():
+    a = energy_curve_for(DAY, "night_owl")
+    b = energy_curve_for(DAY + timedelta(days=3), "night_owl")
+    assert a.values is b.values and isinstance(b, EnergyCurve)
+    origin = datetime.combine(DAY + timedelta(days=3), time(9))
+    assert a.values_for(origin, 15, 4) == [0.5] * 4          # anchored to DAY: no points there
+    assert a.values_for(origin, 15, 4, anchored=False) == b.values_for(origin, 15, 4)
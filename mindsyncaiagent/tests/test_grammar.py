@@ -0,0 +1,68 @@
+import sys
+import os
+from datetime import date, datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from core.grammar import parse_line
+
+WED = date(2030, 1, 9)
+
+
+def test_durations_are_not_times():
+    for line, minutes in [("Write report; 2h", 120), ("Email; 45m", 45), ("Deep work; 1h30m", 90),
+                          ("Analysis; ~1.5 hours", 90)]:
+        task, conf = parse_line(line, WED)
+        assert task.est_minutes == minutes and task.fixed_start is None and conf == 1.0
+
+
+def test_windows_due_phrases_and_tags():
+    task, conf = parse_line("Finish report; ~2h; due Fri 5pm #deep", WED)
+    assert (task.title, task.deadline, task.tags, conf) == ("Finish report", datetime(2030, 1, 11, 17), ["deep"], 1.0)
+
+    task, conf = parse_line("Lunch 1-2pm", WED)
+    assert (task.fixed_start, task.fixed_end, task.est_minutes) == (datetime(2030, 1, 9, 13), datetime(2030, 1, 9, 14), 60)
+
+    task, _ = parse_line("Call mom tomorrow 3pm", WED)
+    assert task.title == "Call mom" and task.fixed_start == datetime(2030, 1, 10, 15)
+
+    task, _ = parse_line("Quick email; 15m; due today", WED)
+    assert task.deadline == datetime(2030, 1, 9, 17)
+
+
+def test_confidence_drops_for_unplaced_text():
+    assert parse_line("Read chapter 2", WED)[1] == 1.0
+    assert parse_line("Stand by me", WED)[1] == 1.0
+    for line in ("Meet at 9", "Dentist; 3/4 10am", "Gym; tonight", "Plan; tomorrow", "Q1 review; 2-3h", "2h"):
+        assert parse_line(line, WED)[1] < 0.9, line
+
+
+def test_bare_hours_are_placed_at_low_confidence():
+    task, conf = parse_line("Call mom tomorrow at 10", WED)
+    assert (task.title, task.fixed_start, conf < 0.9) == ("Call mom", datetime(2030, 1, 10, 10), True)
+    task, conf = parse_line("Gym 6-7", WED)
+    assert (task.title, task.fixed_start, task.fixed_end, conf < 0.9) == (
+        "Gym", datetime(2030, 1, 9, 6), datetime(2030, 1, 9, 7), True)
+    assert parse_line("Pages 7-3", WED)[0].fixed_start is None
+
+
+def test_calendar_dates_after_due_are_deadlines_not_windows():
+    for line, deadline in [("Rent; due 2030-02-01 9am", datetime(2030, 2, 1, 9)),
+                           ("Submit form by Feb 3 at 2pm", datetime(2030, 2, 3, 14)),
+                           ("Report; due 1/20", datetime(2030, 1, 20, 17)),
+                           ("Taxes; 1h; due Apr 15", datetime(2030, 4, 15, 17)),
+                           ("Taxes; due 5 Jan", datetime(2031, 1, 5, 17))]:   # past this year -> next
+        task, conf = parse_line(line, WED)
+        assert (task.deadline, task.fixed_start, task.fixed_end, conf) == (deadline, None, None, 1.0), line
+
+    task, _ = parse_line("Dentist; 3/15 10am", WED)
+    assert task.fixed_start == datetime(2030, 3, 15, 10) and task.deadline is None
+    assert parse_line("Report; due 2/30", WED)[0].deadline is None
+
+
+def test_bare_end_hour_stays_on_the_same_day():
+    task, conf = parse_line("Call 9am-5", WED)
+    assert (task.fixed_start, task.fixed_end, task.est_minutes, conf) == (
+        datetime(2030, 1, 9, 9), datetime(2030, 1, 9, 17), 480, 1.0)
+    task, _ = parse_line("Shift 10pm-1am", WED)
+    assert task.fixed_end == datetime(2030, 1, 10, 1)
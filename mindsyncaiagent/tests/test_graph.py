@@ -0,0 +1,67 @@
+import sys
+import os
+import asyncio
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from graph import plan_graph as pg
+
+
+def test_pipeline_runs_each_node_once(monkeypatch):
+    calls = []
+    real_parse, real_aparse = pg.parse_task, pg.aparse_task
+
+    def counting_parse(raw):
+        calls.append(raw)
+        return real_parse(raw)
+
+    async def counting_aparse(raw):
+        calls.append(raw)
+        return await real_aparse(raw)
+
+    monkeypatch.setattr(pg, "parse_task", counting_parse)
+    monkeypatch.setattr(pg, "aparse_task", counting_aparse)
+
+    state = pg.run_once("Quick email; 15m")
+    assert {"task", "plan", "summary"} <= set(state) and calls == ["Quick email; 15m"]
+
+    state = asyncio.run(pg.arun_once("Review PR; 45m"))
+    assert state["task"].title == "Review PR" and calls[-1] == "Review PR; 45m" and len(calls) == 2
+
+    states = pg.run_batch(["a; 15m", "b; 30m"])
+    assert [s["task"].title for s in states] == ["a", "b"] and len(calls) == 4
+
+
+def test_sequential_fallback_matches_compiled_graph():
+    seq = pg.SequentialGraph()
+    a = seq.invoke({"raw_text": "Quick email; 15m"})
+    b = asyncio.run(seq.abatch([{"raw_text": "Quick email; 15m"}]))[0]
+    assert a.keys() >= {"task", "plan", "summary"}
+    assert a["task"] == b["task"] == pg.run_once("Quick email; 15m")["task"]
+
+
+def test_run_many_plans_all_tasks_together():
+    from datetime import date
+
+    lines = ["Write analysis", "Quick email", "Review PR"]
+    events = list(pg.stream_many(lines, day=date(2030, 1, 7)))
+    kinds = [e["type"] for e in events]
+    assert kinds[:3] == ["parsed"] * 3 and sorted(kinds[3:6]) == ["classified"] * 3
+    assert kinds[6:] == ["plan", "summary"]
+    plan = events[6]["plan"]
+    assert plan.date == date(2030, 1, 7)
+    assert {b.task_title for b in plan.blocks} == {"Write analysis", "Quick email", "Review PR"}
+
+    state = pg.run_many(lines, day=date(2030, 1, 7))
+    assert state["plan"] == plan and len(state["tasks"]) == 3
+
+
+def test_plan_stream_endpoint_emits_ndjson():
+    import json
+    from fastapi.testclient import TestClient
+    from api import app
+
+    with TestClient(app) as client:
+        r = client.post("/plan/stream", json={"tasks": ["Write analysis", "Quick email"], "day": "2030-01-07"})
+    kinds = [json.loads(line)["type"] for line in r.text.strip().splitlines()]
+    assert r.status_code == 200 and kinds[-2:] == ["plan", "summary"] and kinds.count("parsed") == 2
@@ -0,0 +1,85 @@
+import sys
+import os
+from datetime import date, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from core.history import HistoryStore
+from core.models import Task
+from agents.scheduler import greedy_schedule
+from agents.summarizer import summarize
+
+DAY = date(2030, 1, 7)   # a Monday
+
+
+def _save(store: HistoryStore, user: str, day: date, titles):
+    plan = greedy_schedule([Task(title=t, est_minutes=60, effort="high") for t in titles], day,
+                           use_llm=False, packed=True)
+    summary = summarize(plan, completed_titles=store.completed_titles(user, day))
+    store.save_plan(user, plan, summary, "balanced")
+    return summary
+
+
+def test_store_aggregates_weeks_and_months_in_sql(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.db"))
+    for d in range(14):
+        _save(store, "u1", DAY + timedelta(days=d), ["write", "review"])
+    _save(store, "u2", DAY, ["other"])
+    store.record_completions("u1", DAY, ["write", "write", "review"])
+    store.record_completions("u1", DAY + timedelta(days=8), ["review", "not planned"])
+
+    # saving a day again replaces it (and now sees the completions)
+    assert _save(store, "u1", DAY, ["write", "review"]).completion_rate == 1.0
+    assert len(store.plan_blocks("u1", DAY)) == len(store.plan_blocks("u1", DAY + timedelta(days=1)))
+
+    weeks = HistoryStore(str(tmp_path / "history.db")).aggregates("u1", "week", DAY, DAY + timedelta(days=30))
+    assert [(w["period_start"], w["days"]) for w in weeks] == [("2030-01-07", 7), ("2030-01-14", 7)]
+    assert weeks[0]["completion_rate"] == round(1 / 7, 3) and weeks[1]["completion_rate"] == round(0.5 / 7, 3)
+    assert weeks[0]["flow_minutes"] == 7 * 120 and weeks[0]["avg_flow_minutes"] == 120.0
+
+    months = store.aggregates("u1", "month", DAY - timedelta(days=30), DAY + timedelta(days=3))
+    assert [(m["period_start"], m["days"]) for m in months] == [("2030-01-01", 4)]
+
+
+def test_api_feeds_completions_into_summaries_and_history():
+    from fastapi.testclient import TestClient
+    from api import app
+
+    client = TestClient(app)
+    body = {"tasks": ["Write report; 1h", "Email team; 30m"], "day": DAY.isoformat(), "user_id": "hist-api"}
+    assert client.post("/plan", json=body).json()["summary"]["completion_rate"] == 0.0
+
+    r = client.post("/history/completions", json={"user_id": "hist-api", "day": DAY.isoformat(), "titles": ["Write report"]})
+    assert r.json() == {"recorded": 1}
+    assert client.post("/plan", json=body).json()["summary"]["completion_rate"] == 0.5
+
+    weekly = client.get("/history/hist-api/weekly", params={"start": DAY.isoformat(), "end": DAY.isoformat()}).json()
+    assert [(a["period_start"], a["days"], a["completion_rate"]) for a in weekly["aggregates"]] == [("2030-01-07", 1, 0.5)]
+    assert client.get("/history/hist-api/monthly", params={"start": "2030-02-01", "end": "2030-01-01"}).status_code == 400
+
+    quiz = {"wake_time": "7", "peak_block_start": "10", "night_alert": 1, "post_lunch_slump": 2,
+            "ideal_meeting_time": "11", "tasks": body["tasks"], "day": "2030-01-08", "user_id": "hist-api"}
+    client.post("/history/completions", json={"user_id": "hist-api", "day": "2030-01-08", "titles": ["Email team"]})
+    assert client.post("/plan/with_quiz", json=quiz).json()["summary"]["completion_rate"] == 0.5
+    weekly = client.get("/history/hist-api/weekly", params={"start": DAY.isoformat(), "end": "2030-01-08"}).json()
+    assert weekly["aggregates"][0]["days"] == 2
+
+
+def test_history_failures_never_fail_a_plan(monkeypatch):
+    from fastapi.testclient import TestClient
+    import api
+
+    class Broken:
+        def __getattr__(self, name):
+            def fail(*_a, **_k):
+                raise RuntimeError("history db is gone")
+            return fail
+
+    monkeypatch.setattr(api, "history_store", lambda: Broken())
+    client = TestClient(api.app)
+    body = {"tasks": ["Write report; 1h"], "day": DAY.isoformat(), "user_id": "hist-down"}
+    assert client.post("/plan", json=body).status_code == 200
+    assert client.post("/plan/horizon", json={**body, "days": 2}).status_code == 200
+    replan = {"plan": {"date": DAY.isoformat(), "blocks": []}, "tasks": [], "add_lines": ["Call mom; 30m"],
+              "user_id": "hist-down"}
+    assert client.post("/plan/replan", json=replan).status_code == 200
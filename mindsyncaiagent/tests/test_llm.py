@@ -0,0 +1,129 @@
+import sys
+import os
+import asyncio
+import time
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from core import llm as llm_mod
+
+
+class FakeChat:
+    built = 0
+
+    def __init__(self, model, temperature, google_api_key, client_args=None):
+        FakeChat.built += 1
+        self.model = model
+        self.temperature = temperature
+        self.client_args = client_args
+
+
+def test_get_llm_reuses_clients_per_model(monkeypatch):
+    monkeypatch.setenv("GOOGLE_API_KEY", "test-key")
+    monkeypatch.setattr(llm_mod, "ChatGoogleGenerativeAI", FakeChat)
+    llm_mod.reset_llm_clients()
+    try:
+        a = llm_mod.get_llm("model-a")
+        assert llm_mod.get_llm("model-a") is a
+        assert llm_mod.get_llm("model-b") is not a
+        assert FakeChat.built == 2
+        assert a.client_args is None or "limits" in a.client_args
+    finally:
+        llm_mod.reset_llm_clients()
+
+
+def test_get_llm_without_key_is_none(monkeypatch):
+    monkeypatch.delenv("GOOGLE_API_KEY", raising=False)
+    assert llm_mod.get_llm("model-a") is None
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    monkeypatch.setattr(llm_mod, "LLM_HEDGE_MIN_SAMPLES", 5)
+    monkeypatch.setattr(llm_mod, "LLM_BREAKER_FAILURES", 2)
+    llm_mod.reset_call_state()
+    yield llm_mod
+    llm_mod.reset_call_state()
+
+
+def test_call_deadline_and_budget(calls):
+    t0 = time.monotonic()
+    with pytest.raises(TimeoutError):
+        calls.call_llm("fake", lambda: time.sleep(0.5), timeout_s=0.05)
+    assert time.monotonic() - t0 < 0.3
+
+    with calls.llm_budget(0.01):
+        time.sleep(0.02)
+        with pytest.raises(calls.LLMUnavailable):
+            calls.call_llm("fake", lambda: "never")
+
+
+def test_slow_call_is_hedged(calls):
+    for _ in range(5):
+        assert calls.call_llm("fake", lambda: "ok") == "ok"
+    attempts = []
+
+    def fn():
+        attempts.append(1)
+        if len(attempts) == 1:
+            time.sleep(0.5)
+            return "slow"
+        return "fast"
+
+    t0 = time.monotonic()
+    assert calls.call_llm("fake", fn, timeout_s=2) == "fast"
+    assert len(attempts) == 2 and time.monotonic() - t0 < 0.4
+
+
+def test_async_hedge_cancels_the_loser(calls):
+    for _ in range(5):
+        asyncio.run(calls.acall_llm("fake", lambda: asyncio.sleep(0, "ok")))
+    started = []
+
+    async def afn():
+        started.append(1)
+        await asyncio.sleep(1.0 if len(started) == 1 else 0)
+        return len(started)
+
+    assert asyncio.run(calls.acall_llm("fake", afn, timeout_s=2)) == 2
+
+
+def test_breaker_opens_then_recovers(calls, monkeypatch):
+    def boom():
+        raise ConnectionError("down")
+
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            calls.call_llm("fake", boom)
+    assert calls.breaker().state == "open"
+    with pytest.raises(calls.LLMUnavailable):
+        calls.call_llm("fake", lambda: "not called")
+
+    calls.breaker().cooldown_s = 0.0
+    assert calls.call_llm("fake", lambda: "ok") == "ok"
+    assert calls.breaker().state == "closed"
+
+
+def test_budget_cut_timeouts_do_not_trip_the_breaker(calls):
+    for _ in range(3):
+        with calls.llm_budget(0.05):
+            with pytest.raises(TimeoutError):
+                calls.call_llm("fake", lambda: time.sleep(0.3))
+    assert calls.breaker().state == "closed"
+
+    for _ in range(2):
+        with pytest.raises(TimeoutError):
+            calls.call_llm("fake", lambda: time.sleep(0.3), timeout_s=0.05)
+    assert calls.breaker().state == "open"
+
+
+def test_fresh_budget_replaces_the_outer_one(calls):
+    with calls.llm_budget(0.01):
+        time.sleep(0.02)
+        with calls.llm_budget(5.0, fresh=True):
+            assert calls.call_llm("fake", lambda: "ok") == "ok"
+            assert calls.budget_remaining() > 4.0
+        with pytest.raises(calls.LLMUnavailable):
+            calls.call_llm("fake", lambda: "never")
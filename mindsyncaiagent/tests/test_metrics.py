@@ -0,0 +1,49 @@
+import sys
+import os
+from datetime import date, datetime, time, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from core import metrics
+from core.metrics import plan_metrics, metrics_for
+from core.models import Task
+from core.plan import PackedPlan
+from core.energy import energy_curve_for
+from agents.scheduler import greedy_schedule, energy_alignment
+
+DAY = date(2030, 1, 7)
+
+
+def _at(h: int, m: int = 0) -> datetime:
+    return datetime.combine(DAY, time(h, m))
+
+
+def test_metrics_for_one_plan():
+    plan = PackedPlan(DAY)
+    plan.add("deep", _at(9), _at(10))        # peak: 4 high steps
+    plan.add("inbox", _at(13), _at(13, 30))  # dip: 2 low steps
+    plan.add("deep", _at(16), _at(16, 30))
+    curve = energy_curve_for(DAY, "balanced")
+    m = metrics_for(plan, curve, completed=["inbox", "not planned"])
+    assert m.completion_rate == 0.5 and m.flow_minutes == 60 and m.fragmentation == 0.33
+    assert m.energy_alignment == metrics_for(plan, list(curve)).energy_alignment
+    assert metrics_for(plan).energy_alignment == 0.0 and metrics_for(PackedPlan(DAY), curve).fragmentation == 0.0
+    # scheduler.energy_alignment scores against the mock curve: 9-10 and 16-16:30 are peaks
+    assert energy_alignment(plan.to_day_plan()) == round(6 / 8, 2)
+
+
+def test_vectorized_pass_matches_per_plan_loop(monkeypatch):
+    plans, curves, done = [], [], []
+    for i in range(40):
+        day = DAY + timedelta(days=i % 3)
+        curve = energy_curve_for(day, ("morning_lark", "balanced", "night_owl")[i % 3])
+        tasks = [Task(title=f"t{j}", est_minutes=(30, 60, 95)[j % 3], effort=("high", "low", "medium")[j % 3])
+                 for j in range(i % 9 + 1)]
+        plans.append(greedy_schedule(tasks, day, energy_curve=curve, use_llm=False, packed=i % 2 == 0))
+        curves.append(None if i % 7 == 0 else curve)
+        done.append([f"t{j}" for j in range(0, i % 9, 2)])
+
+    vectorized = plan_metrics(plans, curves, done)
+    monkeypatch.setattr(metrics, "_VECTOR_MIN_BLOCKS", 10 ** 9)
+    assert plan_metrics(plans, curves, done) == vectorized
+    assert any(m.energy_alignment for m in vectorized) and any(m.fragmentation for m in vectorized)
@@ -0,0 +1,185 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import pytest
+
+pytest.importorskip("langchain_core")
+from langchain_core.runnables import RunnableLambda
+
+from agents import parser
+from core.llm import reset_call_state
+from agents.parser import TaskDraft, TaskDraftBatch
+
+
+@pytest.fixture(autouse=True)
+def _fresh_parse_cache(monkeypatch):
+    # these tests exercise the LLM paths; the grammar short-circuit has its own test
+    monkeypatch.setattr(parser, "PARSER_SHORT_CIRCUIT", False)
+    parser.clear_parse_cache()
+    reset_call_state()  # fakes that raise would otherwise trip the shared breaker
+    yield
+    parser.clear_parse_cache()
+    reset_call_state()
+
+
+class FakeLLM:
+    """Answers batch requests from a canned list; single-line requests fail."""
+
+    def __init__(self, drafts):
+        self.drafts = drafts
+        self.calls = []
+
+    def with_structured_output(self, schema):
+        def run(_prompt):
+            self.calls.append(schema)
+            if schema is TaskDraftBatch:
+                return TaskDraftBatch(items=self.drafts)
+            raise RuntimeError("single-line parse unavailable")
+        return RunnableLambda(run)
+
+
+def test_parse_tasks_uses_one_batch_call(monkeypatch):
+    fake = FakeLLM([
+        TaskDraft(title="Write report", est_minutes=120),
+        TaskDraft(title="", est_minutes=15),
+        TaskDraft(title="Review PR", est_minutes=45, tags=["dev"]),
+    ])
+    monkeypatch.setattr(parser, "_get_llm", lambda: fake)
+    tasks = parser.parse_tasks(["Write report; 2h", "Quick email; 15m", "Review PR; 45m"])
+
+    assert [t.title for t in tasks] == ["Write report", "Quick email", "Review PR"]
+    assert tasks[0].est_minutes == 120 and tasks[2].tags == ["dev"]
+    # one batch call, plus lenient + strict retries for the invalid middle line only
+    assert fake.calls == [TaskDraftBatch, TaskDraft, TaskDraft]
+
+
+def test_parse_tasks_falls_back_on_count_mismatch(monkeypatch):
+    fake = FakeLLM([TaskDraft(title="only one")])
+    monkeypatch.setattr(parser, "_get_llm", lambda: fake)
+    tasks = parser.parse_tasks(["Quick email; 15m", "Read paper; 45m"])
+    assert [t.title for t in tasks] == ["Quick email", "Read paper"]
+
+
+def test_aparse_tasks_matches_sync(monkeypatch):
+    import asyncio
+
+    drafts = [TaskDraft(title="Write report", est_minutes=120), TaskDraft(title="Review PR", est_minutes=45)]
+    monkeypatch.setattr(parser, "_get_llm", lambda: FakeLLM(drafts))
+    lines = ["Write report; 2h", "Review PR; 45m"]
+    sync = parser.parse_tasks(lines)
+    out = asyncio.run(parser.aparse_tasks(lines))
+    assert [t.model_dump() for t in out] == [t.model_dump() for t in sync]
+
+
+def test_parse_cache_reanchors_relative_dates(monkeypatch, tmp_path):
+    from datetime import datetime, timedelta
+    from core.cache import TieredCache
+
+    monkeypatch.setattr(parser, "_parse_cache", TieredCache("parse", 16, db_path=str(tmp_path / "c.db")))
+    calls = []
+
+    class Chat:
+        def with_structured_output(self, schema):
+            def run(_prompt):
+                calls.append(schema)
+                return TaskDraft(title="Standup", est_minutes=15, fixed_start="tomorrow")
+            return RunnableLambda(run)
+
+    monkeypatch.setattr(parser, "_get_llm", lambda: Chat())
+    first = parser.parse_task("Standup  tomorrow")
+    assert parser.parse_task("Standup tomorrow") == first and len(calls) == 1
+
+    # a week later the cached entry (same weekday) resolves against the new date
+    class Later(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime.now(tz) + timedelta(days=7)
+
+    monkeypatch.setattr(parser, "datetime", Later)
+    later = parser.parse_task("Standup tomorrow")
+    assert len(calls) == 1
+    assert later.fixed_start == first.fixed_start + timedelta(days=7)
+
+
+def test_confident_lines_skip_the_llm(monkeypatch):
+    monkeypatch.setattr(parser, "PARSER_SHORT_CIRCUIT", True)
+    fake = FakeLLM([TaskDraft(title="Gym")])
+    monkeypatch.setattr(parser, "_get_llm", lambda: fake)
+    tasks = parser.parse_tasks(["Write report; 2h; due Fri 5pm", "Review PR; 45m #dev", "Gym; tonight"])
+
+    assert [t.title for t in tasks] == ["Write report", "Review PR", "Gym"]
+    assert tasks[0].est_minutes == 120 and tasks[0].fixed_start is None
+    assert tasks[1].tags == ["dev"]
+    # only the line the grammar could not place goes to the LLM
+    assert fake.calls == [TaskDraft, TaskDraft]
+
+
+def test_due_dates_never_become_fixed_windows():
+    # the LLM gets the deadline right; the time after "by"/"due" must not pin a block today
+    draft = TaskDraft(title="Submit form", deadline="2030-11-03T14:00:00")
+    task = parser._finalize_task("Submit form by Nov 3 at 2pm", draft)
+    assert (task.deadline.month, task.deadline.day, task.deadline.hour) == (11, 3, 14)
+    assert (task.fixed_start, task.fixed_end) == (None, None)
+
+    task = parser._parse_deterministic("Taxes; 1h; due Apr 15")
+    assert (task.deadline.month, task.deadline.day, task.fixed_start) == (4, 15, None)
+
+
+def test_time_windows_are_cached_per_weekday():
+    from datetime import date, timedelta
+
+    monday = date(2030, 1, 7)
+    for line in ("Standup 9:30-9:45", "Sync 14:00-14:30", "Read paper; 1.5 hours"):
+        assert parser._cache_key(line, monday) == parser._cache_key(line, monday + timedelta(days=7)), line
+    for line in ("Rent; due 2030-02-01", "Report; due 1/20", "Taxes; due Apr 15"):
+        assert parser._cache_key(line, monday) != parser._cache_key(line, monday + timedelta(days=7)), line
+
+
+def test_bare_hours_survive_without_an_llm(monkeypatch):
+    from datetime import datetime
+
+    class Today(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime(2026, 10, 17, 8)
+
+    monkeypatch.setattr(parser, "datetime", Today)
+    monkeypatch.setattr(parser, "_get_llm", lambda: None)
+    task = parser.parse_task("Call mom tomorrow at 10")
+    assert task.title == "Call mom"
+    assert (task.fixed_start, task.fixed_end) == (datetime(2026, 10, 18, 10), datetime(2026, 10, 18, 10, 30))
+    task = parser.parse_task("Gym 6-7")
+    assert task.title == "Gym"
+    assert (task.fixed_start, task.fixed_end) == (datetime(2026, 10, 17, 6), datetime(2026, 10, 17, 7))
+
+
+def test_shared_gate_bounds_llm_calls_across_callers(monkeypatch):
+    import asyncio
+    import threading
+    import time as _t
+
+    lock, live, peak = threading.Lock(), [0], [0]
+
+    class Chat:
+        def with_structured_output(self, schema):
+            def run(_prompt):
+                with lock:
+                    live[0] += 1
+                    peak[0] = max(peak[0], live[0])
+                _t.sleep(0.05)
+                with lock:
+                    live[0] -= 1
+                raise RuntimeError("unavailable")
+            return RunnableLambda(run)
+
+    monkeypatch.setattr(parser, "_get_llm", lambda: Chat())
+
+    async def main():
+        gate = asyncio.Semaphore(2)
+        users = [[f"Task {u}-{i} soon" for i in range(3)] for u in range(4)]
+        return await asyncio.gather(*(parser.aparse_tasks(lines, concurrency=8, gate=gate) for lines in users))
+
+    assert all(len(ts) == 3 for ts in asyncio.run(main()))
+    assert peak[0] <= 2
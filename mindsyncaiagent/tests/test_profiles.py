@@ -0,0 +1,48 @@
+import sys
+import os
+from datetime import date, datetime, time, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from core.models import CompletionRecord, Task
+from core.profiles import ProfileStore, POINTS, curve_from_blob, fit_energy_values, pack_values
+from agents.scheduler import greedy_schedule
+
+DAY = date(2030, 1, 7)
+ANSWERS = {"wake_time": "8", "peak_block_start": 14, "night_alert": 1,
+           "post_lunch_slump": 0, "ideal_meeting_time": "11"}
+
+
+def _idx(h: int, m: int = 0) -> int:
+    return ((h * 60 + m) - 6 * 60) // 15
+
+
+def test_fit_follows_quiz_then_history():
+    prior = fit_energy_values(ANSWERS)
+    assert len(prior) == POINTS
+    assert prior[_idx(14)] >= 0.9 and prior[_idx(7)] <= 0.1
+
+    missed = [
+        CompletionRecord(start=datetime.combine(DAY - timedelta(days=d), time(14)),
+                         end=datetime.combine(DAY - timedelta(days=d), time(15)), completed=False)
+        for d in range(1, 9)
+    ]
+    fitted = fit_energy_values(ANSWERS, missed)
+    assert fitted[_idx(14)] < 0.4 and fitted[_idx(16)] == prior[_idx(16)]
+
+
+def test_store_roundtrip_bulk_load_and_schedule(tmp_path):
+    db = str(tmp_path / "profiles.db")
+    values = fit_energy_values(ANSWERS)
+    ProfileStore(db).put_many([(f"u{i}", pack_values(values)) for i in range(50)])
+
+    fresh = ProfileStore(db, max_items=10)
+    assert fresh.load() == 10 and fresh.load(["u3", "u4"]) == 2
+    blob = fresh.get("u42")
+    assert blob is not None and len(blob) == POINTS and fresh.get("nobody") is None
+
+    curve = curve_from_blob(blob, DAY)
+    assert abs(curve.get(datetime.combine(DAY, time(14))) - values[_idx(14)]) < 0.005
+    plan = greedy_schedule([Task(title="deep", est_minutes=60, effort="high")], DAY,
+                           energy_curve=curve, use_llm=False)
+    assert 14 <= plan.blocks[0].start.hour < 16  # the learned peak, not the preset's 9-11
@@ -0,0 +1,266 @@
+import sys
+import os
+from datetime import date, datetime, time, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from core.models import Task, PlanDelta, BusyInterval
+from core.slots import SlotGrid
+from agents.scheduler import greedy_schedule, plan_horizon, replan
+from agents.solver import optimal_schedule
+
+DAY = date(2030, 1, 7)
+
+
+def _at(h: int, m: int = 0) -> datetime:
+    return datetime.combine(DAY, time(h, m))
+
+
+def test_slot_grid_masks():
+    grid = SlotGrid(DAY, start_h=9, end_h=12)
+    assert grid.n == 12
+    grid.mark_busy([(_at(9, 30), _at(9, 50))])
+    assert not grid.is_free(2) and not grid.is_free(3) and grid.is_free(4)
+    assert grid.fits(4, 4) and not grid.fits(1, 2) and not grid.fits(10, 3)
+    grid.occupy(4, 4)
+    assert grid.run_starts(2) == 1 | (1 << 8) | (1 << 9) | (1 << 10)
+
+
+def test_greedy_blocks_never_overlap():
+    tasks = [
+        Task(title=f"task {i}", est_minutes=est, effort=eff)
+        for i, (est, eff) in enumerate([(120, "high"), (45, "medium"), (20, "low"), (90, "high"), (15, "low")])
+    ]
+    tasks.append(Task(title="standup", fixed_start=_at(9, 30), fixed_end=_at(9, 45)))
+    plan = greedy_schedule(tasks, DAY, busy=[(_at(12), _at(13))], use_llm=False)
+    blocks = sorted(plan.blocks, key=lambda b: b.start)
+    for a, b in zip(blocks, blocks[1:]):
+        assert a.end <= b.start
+    assert all(not (b.start < _at(13) and _at(12) < b.end) for b in blocks)
+    assert any(b.task_title == "standup" and b.start == _at(9, 30) for b in blocks)
+
+
+def test_plan_horizon_respects_deadlines_and_spreads():
+    due = datetime.combine(DAY + timedelta(days=1), time(12))
+    tasks = [Task(title=f"deep {i}", est_minutes=120, effort="high") for i in range(6)]
+    tasks.append(Task(title="proposal", est_minutes=240, effort="high", deadline=due))
+    horizon = plan_horizon(tasks, DAY, days=4, busy=[(_at(12), _at(13))])
+    assert [p.date for p in horizon.days] == [DAY + timedelta(days=d) for d in range(4)]
+    proposal = [b for p in horizon.days for b in p.blocks if b.task_title == "proposal"]
+    assert proposal and all(b.end <= due for b in proposal)
+    assert all(p.blocks for p in horizon.days)
+    assert not horizon.unscheduled
+
+
+def test_optimal_schedule_reports_both_alignments():
+    tasks = [
+        Task(title="spec", est_minutes=90, effort="high", deadline=_at(12)),
+        Task(title="inbox", est_minutes=30, effort="low"),
+        Task(title="review", est_minutes=60, effort="medium"),
+    ]
+    plan, report = optimal_schedule(tasks, DAY, use_llm=False, time_budget_s=5)
+    assert report.solver == "optimal" and report.completed
+    assert report.optimal_alignment is not None and 0.0 <= report.greedy_alignment <= 1.0
+    blocks = sorted(plan.blocks, key=lambda b: b.start)
+    for a, b in zip(blocks, blocks[1:]):
+        assert a.end <= b.start
+    spec = [b for b in blocks if b.task_title == "spec"]
+    assert sum((b.end - b.start).seconds for b in spec) == 90 * 60
+    assert all(b.end <= _at(12) for b in spec)
+
+
+def test_optimal_schedule_falls_back_to_greedy_over_budget():
+    tasks = [
+        Task(title=f"t{i}", est_minutes=(30, 45, 60, 90, 120)[i % 5], effort=("high", "low", "medium")[i % 3],
+             deadline=_at(11 + i % 7) if i % 4 == 0 else None)
+        for i in range(30)
+    ]
+    plan, report = optimal_schedule(tasks, DAY, use_llm=False, time_budget_s=0.001)
+    assert report.solver == "greedy" and not report.completed
+    assert plan == greedy_schedule(tasks, DAY, use_llm=False)
+
+
+def test_optimal_schedule_places_deadline_work_greedy_drops():
+    # greedy splits "form" around 9:00/10:00, leaving no hour for "slides" before 11:00
+    tasks = [
+        Task(title="form", est_minutes=45, effort="low", deadline=_at(10, 30)),
+        Task(title="slides", est_minutes=60, effort="high", deadline=_at(11)),
+        Task(title="inbox", est_minutes=20, effort="low"),
+    ]
+    busy = [(_at(11), _at(18))]
+    greedy = greedy_schedule([t.model_copy() for t in tasks], DAY, busy=busy, use_llm=False)
+    assert not any(b.task_title == "slides" for b in greedy.blocks)
+
+    plan, report = optimal_schedule(tasks, DAY, busy=busy, use_llm=False, time_budget_s=5)
+    minutes = {t.title: sum((b.end - b.start).seconds // 60 for b in plan.blocks if b.task_title == t.title)
+               for t in tasks}
+    assert report.solver == "optimal" and minutes == {"form": 45, "slides": 60, "inbox": 0}
+    assert all(b.end <= _at(11) for b in plan.blocks)
+
+
+def test_replan_keeps_unaffected_blocks():
+    tasks = [
+        Task(title="deep work", est_minutes=120, effort="high"),
+        Task(title="inbox", est_minutes=30, effort="low"),
+        Task(title="review", est_minutes=45, effort="medium"),
+    ]
+    plan = greedy_schedule([t.model_copy() for t in tasks], DAY, busy=[(_at(12), _at(13))], use_llm=False)
+    hit = next(b for b in plan.blocks if b.task_title == "deep work")
+    delta = PlanDelta(
+        busy=[BusyInterval(start=hit.start, end=hit.start + timedelta(minutes=15))],
+        remove=["inbox"],
+        add=[Task(title="call mom", est_minutes=30, effort="low")],
+    )
+    new = replan(plan, tasks, delta, busy=[(_at(12), _at(13))])
+
+    untouched = [b for b in plan.blocks if b.task_title == "review"]
+    assert all(b in new.blocks for b in untouched)
+    assert not any(b.task_title == "inbox" for b in new.blocks)
+    assert any(b.task_title == "call mom" for b in new.blocks)
+    deep = [b for b in new.blocks if b.task_title == "deep work"]
+    assert sum((b.end - b.start).seconds for b in deep) == 120 * 60
+    assert all(not (b.start < hit.start + timedelta(minutes=15) and hit.start < b.end) for b in new.blocks)
+
+
+def test_replan_shrinks_estimate_from_latest_block():
+    tasks = [Task(title="essay", est_minutes=180, effort="high")]
+    plan = greedy_schedule([t.model_copy() for t in tasks], DAY, busy=[(_at(12), _at(13))], use_llm=False)
+    new = replan(plan, tasks, PlanDelta(estimates={"essay": 60}), busy=[(_at(12), _at(13))])
+    assert sum((b.end - b.start).seconds for b in new.blocks) == 60 * 60
+    assert min(b.start for b in new.blocks) == min(b.start for b in plan.blocks)
+
+
+def _advice_llm(delay_s, calls):
+    import pytest
+    RunnableLambda = pytest.importorskip("langchain_core.runnables").RunnableLambda
+    from agents.scheduler import PlanAdvice
+    import time as _t
+
+    class Chat:
+        def with_structured_output(self, schema):
+            def run(_prompt):
+                calls.append(schema)
+                _t.sleep(delay_s)
+                return PlanAdvice(defer=["task 1"])
+            return RunnableLambda(run)
+
+    return Chat()
+
+
+def test_greedy_honors_use_llm_and_races_advice(monkeypatch):
+    from agents import scheduler
+    import time as _t
+
+    tasks = [Task(title=f"task {i}", est_minutes=30, effort="medium") for i in range(3)]
+    calls = []
+    scheduler.clear_advice_cache()
+    monkeypatch.setattr(scheduler, "_get_llm_for_scheduler", lambda: _advice_llm(0.3, calls))
+
+    assert greedy_schedule([t.model_copy() for t in tasks], DAY, use_llm=False) and calls == []
+
+    # advice misses the deadline: the deterministic plan comes back without waiting
+    t0 = _t.monotonic()
+    plan = greedy_schedule([t.model_copy() for t in tasks], DAY, use_llm=True, advice_wait_s=0.05)
+    assert _t.monotonic() - t0 < 0.25
+    assert {b.task_title for b in plan.blocks} == {"task 0", "task 1", "task 2"}
+
+    # ...but still lands in the cache, so the next identical request applies it with no new call
+    _t.sleep(0.4)
+    plan = greedy_schedule([t.model_copy() for t in tasks], DAY, use_llm=True, advice_wait_s=0.05)
+    assert {b.task_title for b in plan.blocks} == {"task 0", "task 2"} and len(calls) == 1
+    scheduler.clear_advice_cache()
+
+
+def test_packed_plan_matches_the_pydantic_boundary():
+    from core.plan import PackedPlan
+    from agents.summarizer import summarize
+
+    packed = PackedPlan(DAY)
+    packed.add("b", _at(10), _at(10, 30))
+    packed.add("a", _at(9), _at(9, 45))
+    packed.add("a", _at(9, 45), _at(10))
+    packed.merge_adjacent()
+    assert list(packed.blocks()) == [("a", _at(9), _at(10)), ("b", _at(10), _at(10, 30))]
+    assert list(PackedPlan.from_day_plan(packed.to_day_plan()).blocks()) == list(packed.blocks())
+
+    tasks = [Task(title=f"t{i}", est_minutes=(30, 60, 90)[i % 3], effort=("high", "low", "medium")[i % 3]) for i in range(8)]
+    fast = greedy_schedule([t.model_copy() for t in tasks], DAY, use_llm=False, packed=True)
+    plan = greedy_schedule([t.model_copy() for t in tasks], DAY, use_llm=False)
+    assert isinstance(fast, PackedPlan) and fast.to_day_plan() == plan
+    assert summarize(fast, completed_titles=["t1"]) == summarize(plan, completed_titles=["t1"])
+
+
+def test_replan_repacks_evicted_blocks_of_unlisted_tasks():
+    plan = greedy_schedule([Task(title="essay", est_minutes=60, effort="high")], DAY,
+                           busy=[(_at(12), _at(13))], use_llm=False)
+    hit = plan.blocks[0]
+    delta = PlanDelta(busy=[BusyInterval(start=hit.start, end=hit.end)])
+    new = replan(plan, [], delta, busy=[(_at(12), _at(13))])   # "essay" not in tasks
+    moved = [b for b in new.blocks if b.task_title == "essay"]
+    assert sum((b.end - b.start).seconds for b in moved) == 60 * 60
+    assert all(b.end <= hit.start or b.start >= hit.end for b in moved)
+
+
+def test_async_advice_is_in_flight_while_packing(monkeypatch):
+    import asyncio
+    import time as _t
+    from agents import scheduler
+    from agents.scheduler import agreedy_schedule, PlanAdvice
+
+    events = []
+    real_pack = scheduler._pack_day
+
+    def slow_pack(*args):
+        events.append("pack start")
+        _t.sleep(0.2)
+        events.append("pack end")
+        return real_pack(*args)
+
+    async def fetch(_inputs):
+        events.append("advice start")
+        return PlanAdvice(defer=["task 1"])
+
+    scheduler.clear_advice_cache()
+    monkeypatch.setattr(scheduler, "_pack_day", slow_pack)
+    monkeypatch.setattr(scheduler, "_afetch_advice", fetch)
+    tasks = [Task(title=f"task {i}", est_minutes=30, effort="medium") for i in range(3)]
+    plan = asyncio.run(agreedy_schedule(tasks, DAY, use_llm=True, advice_wait_s=1.0))
+    assert events.index("advice start") < events.index("pack end")
+    assert {b.task_title for b in plan.blocks} == {"task 0", "task 2"}
+
+    # precomputed advice skips the LLM entirely
+    events.clear()
+    plan = asyncio.run(agreedy_schedule(tasks, DAY, use_llm=True, advice=PlanAdvice(defer=["task 0"])))
+    assert "advice start" not in events and {b.task_title for b in plan.blocks} == {"task 1", "task 2"}
+
+
+def test_plan_endpoint_follows_scheduler_use_llm(monkeypatch):
+    from fastapi.testclient import TestClient
+    from agents import scheduler
+    from api import app
+
+    fetched = []
+
+    async def fetch(inputs):
+        fetched.append(inputs)
+        return None
+
+    scheduler.clear_advice_cache()
+    monkeypatch.setattr(scheduler, "_afetch_advice", fetch)
+    body = {"tasks": ["Write report; 1h", "Email team; 30m"], "day": DAY.isoformat()}
+    client = TestClient(app)
+
+    monkeypatch.setattr(scheduler, "SCHEDULER_USE_LLM", False)
+    assert client.post("/plan", json=body).status_code == 200 and fetched == []
+    monkeypatch.setattr(scheduler, "SCHEDULER_USE_LLM", True)
+    assert client.post("/plan", json=body).status_code == 200 and len(fetched) == 1
+
+
+def test_plan_horizon_reports_overdue_tasks_as_unscheduled():
+    tasks = [
+        Task(title="overdue", est_minutes=60, effort="high", deadline=datetime.combine(DAY - timedelta(days=2), time(17))),
+        Task(title="fresh", est_minutes=60, effort="medium"),
+    ]
+    horizon = plan_horizon(tasks, DAY, days=3, use_llm=False)
+    assert horizon.unscheduled == {"overdue": 60}
+    assert not any(b.task_title == "overdue" for p in horizon.days for b in p.blocks)
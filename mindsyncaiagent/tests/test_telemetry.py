@@ -0,0 +1,35 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from fastapi.testclient import TestClient
+
+from api import app
+from core import telemetry
+
+
+def test_plan_timings_and_metrics(monkeypatch):
+    monkeypatch.setattr(telemetry, "TELEMETRY_ENABLED", True)
+    telemetry.reset()
+    with TestClient(app) as client:
+        r = client.post("/plan?timings=true", json={"tasks": ["Write analysis", "Quick email"], "day": "2030-01-07"})
+        assert r.status_code == 200
+        t = r.json()["timings"]
+        assert {"request", "parse", "classify", "schedule", "pack", "summarize"} <= set(t["stages_ms"])
+        assert t["counts"]["slots_examined"] > 0
+
+        assert client.post("/plan", json={"tasks": ["Quick email"], "day": "2030-01-07"}).json()["timings"] is None
+
+        text = client.get("/metrics").text
+    assert "# TYPE mindsync_stage_seconds summary" in text
+    assert 'mindsync_stage_seconds_count{stage="pack"} 2' in text
+    assert "mindsync_slots_examined_total" in text
+
+
+def test_disabled_telemetry_records_nothing(monkeypatch):
+    monkeypatch.setattr(telemetry, "TELEMETRY_ENABLED", False)
+    telemetry.reset()
+    with telemetry.collect() as trace, telemetry.span("pack"), telemetry.llm_call("x"):
+        telemetry.count("slots_examined", 5)
+    assert trace is None and telemetry.render_prometheus() == "\n"